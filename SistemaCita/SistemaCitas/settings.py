@@ -1,180 +0,0 @@
-"""
-Django settings for SistemaCitas project.
-
-Generated by 'django-admin startproject' using Django 5.2.7.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.2/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/5.2/ref/settings/
-"""
-
-from pathlib import Path
-import os  # 👈 agrega esto al inicio
-import re
-from django.core.exceptions import ValidationError
-from django.utils.translation import gettext as _
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-)k+62@o4%m8iqlb^9@@ote0f5hmlu^z0-ll%c1h!&9b=lekj(3'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
-
-AUTH_USER_MODEL = 'core.Usuario'
-
-# Application definition
-
-INSTALLED_APPS = [
-    'gestion_citas',
-    'core', # App creada por David
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'widget_tweaks', # Para personalizar formularios en templates
-]
-
-# 🔹 Aquí agregamos la ruta global para templates
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR, 'templates')],  # 👈 agrega esta línea
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-# 🔹 Configuración del login/logout
-LOGIN_URL = 'login'               # Si el usuario no ha iniciado sesión
-LOGIN_REDIRECT_URL = 'home'       # A dónde redirige después del login
-LOGOUT_REDIRECT_URL = 'home'     # A dónde redirige después del logout
-
-# 🔹 (Opcional) Si quieres idioma español
-LANGUAGE_CODE = 'es'
-
-USE_TZ = True
-TIME_ZONE = 'America/El_Salvador'  # o la tuya
-
-USE_I18N = True
-
-# Archivos estáticos
-STATIC_URL = 'static/'
-STATICFILES_DIRS = [os.path.join(BASE_DIR, 'core', 'static')]  # 👈 agrega esta línea
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') # Carpeta para collectstatic
-
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'SistemaCitas.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR, 'templates')],  # <-- aquí
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'SistemaCitas.wsgi.application'
-
-
-# Database
-# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-# SistemaCitas/settings.py
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'mssql', 
-        'NAME': 'SistemaCitasDB', 
-        'HOST': 'localhost', 
-        'PORT': '1433',
-        'USER': '', # Dejar vacío para autenticación de Windows
-        'PASSWORD': '', # Dejar vacío para autenticación de Windows
-        'OPTIONS': {
-            'driver': 'ODBC Driver 17 for SQL Server',
-            'MARS_Connection': True,
-            # AGREGAR ESTO para Autenticación de Windows
-            'trusted_connection': 'yes', 
-        },
-    }
-}
-
-# 🔹 Validador personalizado para contraseñas
-class LettersOnlyValidator:
-    def validate(self, password, user=None):
-        if not re.search(r'[A-Z]', password) or not re.search(r'[a-z]', password):
-            raise ValidationError(
-                _("La contraseña debe contener al menos una letra mayúscula y una minúscula."),
-                code='password_no_letters'
-            )
-
-    def get_help_text(self):
-        return _("Su contraseña debe contener al menos una letra mayúscula y una minúscula.")
-
-# Password validation
-# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'SistemaCitas.settings.LettersOnlyValidator',  # Solo mayúsculas y minúsculas
-    },
-]
-
-
-# Internationalization
-# https://docs.djangoproject.com/en/5.2/topics/i18n/
-
-LANGUAGE_CODE = 'es'
-
-TIME_ZONE = 'America/El_Salvador'
-
-USE_I18N = True  # Soporte para internacionalización (idiomas)
-
-USE_L10N = True  # Soporte para localización (fechas y números)
-
-USE_TZ = True
-
-
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/5.2/howto/static-files/
-
-STATIC_URL = 'static/'
-
-# Default primary key field type
-# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
-
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
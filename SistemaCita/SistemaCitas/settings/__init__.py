@@ -0,0 +1,21 @@
+"""
+Settings de SistemaCitas por perfil.
+
+DJANGO_ENTORNO elige el perfil: dev (por defecto), test o prod. Los tres
+parten de base.py; DJANGO_SETTINGS_MODULE sigue siendo SistemaCitas.settings.
+`manage.py test` usa el perfil test si no se indica otro.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENTORNO = os.environ.get('DJANGO_ENTORNO', 'dev')
+
+if ENTORNO == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif ENTORNO == 'test':
+    from .test import *  # noqa: F401,F403
+elif ENTORNO == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"DJANGO_ENTORNO='{ENTORNO}' no es válido (dev, test o prod)")
@@ -0,0 +1,240 @@
+"""
+Django settings for SistemaCitas project: configuración común a todos los perfiles.
+
+Generated by 'django-admin startproject' using Django 5.2.7.
+
+Los perfiles dev.py, test.py y prod.py parten de este archivo; cuál se usa lo
+decide la variable de entorno DJANGO_ENTORNO (ver __init__.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+from pathlib import Path
+import os
+import re
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+# La clave de desarrollo solo sirve para dev y test; prod exige DJANGO_SECRET_KEY
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-)k+62@o4%m8iqlb^9@@ote0f5hmlu^z0-ll%c1h!&9b=lekj(3')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+# Solo el perfil dev lo activa
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+AUTH_USER_MODEL = 'core.Usuario'
+
+# Application definition
+
+INSTALLED_APPS = [
+    'gestion_citas',
+    'core', # App creada por David
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'widget_tweaks', # Para personalizar formularios en templates
+]
+
+# 🔹 Configuración del login/logout
+LOGIN_URL = 'login'               # Si el usuario no ha iniciado sesión
+LOGIN_REDIRECT_URL = 'home'       # A dónde redirige después del login
+LOGOUT_REDIRECT_URL = 'home'     # A dónde redirige después del logout
+
+# Archivos estáticos
+STATIC_URL = 'static/'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'core', 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') # Carpeta para collectstatic
+
+
+MIDDLEWARE = [
+    'core.middleware.MedicionMiddleware',  # Primero: mide también al resto de middlewares
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'SistemaCitas.urls'
+
+# 🔹 Plantillas
+# Se listan los loaders para envolverlos en el cargador con caché: cada plantilla se
+# compila una vez por proceso. El perfil dev los usa sin caché para ver los cambios sin
+# reiniciar el servidor.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+            'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'SistemaCitas.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+# SQL Server; los valores por defecto son los de la instalación local con autenticación
+# de Windows. Con DB_ENGINE=sqlite se usa db.sqlite3 (útil en Linux sin SQL Server).
+if os.environ.get('DB_ENGINE', 'mssql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'mssql',
+            'NAME': os.environ.get('DB_NAME', 'SistemaCitasDB'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '1433'),
+            'USER': os.environ.get('DB_USER', ''), # Vacío para autenticación de Windows
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''), # Vacío para autenticación de Windows
+            'OPTIONS': {
+                'driver': os.environ.get('DB_DRIVER', 'ODBC Driver 17 for SQL Server'),
+                'MARS_Connection': True,
+            },
+        }
+    }
+    if not DATABASES['default']['USER']:
+        # Autenticación de Windows
+        DATABASES['default']['OPTIONS']['trusted_connection'] = 'yes'
+
+# 🔹 Caché
+# Por defecto una caché local en memoria (por proceso). Si se define la variable de
+# entorno CACHE_REDIS_URL (ej. redis://localhost:6379/1) se usa Redis o cualquier
+# servidor compatible con su protocolo; en ese caso hace falta el paquete `redis`.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'sistemacitas',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sistemacitas',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# 🔹 Sesiones: se leen de la caché y solo se escriben en la base de datos
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# 🔹 Vistas async (ASGI)
+# Con VISTAS_ASYNC=1 la agenda, las citas del paciente, el directorio de médicos y los
+# cambios de estado usan las versiones async de core/views_async.py (servir con uvicorn).
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC') == '1'
+# Con CONSULTAS_PARALELAS=1 las consultas independientes de esas vistas se ejecutan a la
+# vez, cada una en su propio hilo y conexión; si no, comparten la conexión de la solicitud.
+CONSULTAS_PARALELAS = os.environ.get('CONSULTAS_PARALELAS') == '1'
+
+# 🔹 Conexiones a la base de datos
+# Cada worker WSGI reutiliza su conexión durante DB_CONN_MAX_AGE segundos (por defecto 60;
+# el perfil dev usa 0) en vez de abrir una conexión ODBC nueva por solicitud; con
+# CONN_HEALTH_CHECKS se verifica antes de reutilizarla, así un reinicio de SQL Server no deja
+# solicitudes fallando. Bajo ASGI Django no recomienda conexiones persistentes: con
+# VISTAS_ASYNC cada solicitud cierra la suya y el costo de abrirla lo absorbe el pooling de
+# ODBC (activo por defecto en pyodbc).
+DATABASES['default']['CONN_MAX_AGE'] = 0 if VISTAS_ASYNC else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# 🔹 Medición de solicitudes (core/middleware.py)
+# Con MEDICION=1 se mide una muestra de las solicitudes (MEDICION_MUESTREO, 0.01 = 1 %):
+# tiempo total, consultas SQL, consultas repetidas y render de plantillas. Cada solicitud
+# medida responde con la cabecera Server-Timing, deja una línea JSON en el logger
+# 'core.medicion' y suma al panel de rendimiento (/admin/rendimiento/). Apagada, el
+# middleware se quita de la cadena y las plantillas usan el backend normal.
+MEDICION_ACTIVA = os.environ.get('MEDICION') == '1'
+MEDICION_MUESTREO = float(os.environ.get('MEDICION_MUESTREO', 0.01))
+MEDICION_SERVER_TIMING = True
+if MEDICION_ACTIVA:
+    TEMPLATES[0]['BACKEND'] = 'core.medicion.DjangoTemplatesMedidas'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.medicion': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# 🔹 Validador personalizado para contraseñas
+class LettersOnlyValidator:
+    def validate(self, password, user=None):
+        if not re.search(r'[A-Z]', password) or not re.search(r'[a-z]', password):
+            raise ValidationError(
+                _("La contraseña debe contener al menos una letra mayúscula y una minúscula."),
+                code='password_no_letters'
+            )
+
+    def get_help_text(self):
+        return _("Su contraseña debe contener al menos una letra mayúscula y una minúscula.")
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'SistemaCitas.settings.base.LettersOnlyValidator',  # Solo mayúsculas y minúsculas
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'es'
+
+TIME_ZONE = 'America/El_Salvador'
+
+USE_I18N = True  # Soporte para internacionalización (idiomas)
+
+USE_TZ = True
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
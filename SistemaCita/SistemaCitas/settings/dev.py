@@ -0,0 +1,16 @@
+"""Perfil de desarrollo: DEBUG y plantillas leídas del disco en cada solicitud."""
+import os
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# Sin el cargador con caché los cambios en las plantillas se ven sin reiniciar
+TEMPLATES[0]['OPTIONS']['loaders'] = TEMPLATE_LOADERS
+
+# runserver atiende cada solicitud en un hilo nuevo: las conexiones persistentes no se
+# reutilizarían y quedarían abiertas
+DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# En desarrollo, con MEDICION=1 se mide cada solicitud
+MEDICION_MUESTREO = float(os.environ.get('MEDICION_MUESTREO', 1))
@@ -0,0 +1,18 @@
+"""Perfil de producción: sin DEBUG, plantillas con caché y conexiones persistentes."""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = False
+
+if SECRET_KEY.startswith('django-insecure-'):
+    raise ImproperlyConfigured("En producción hay que definir DJANGO_SECRET_KEY")
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured("En producción hay que definir DJANGO_ALLOWED_HOSTS (separados por comas)")
+
+# El cargador con caché (base.py) y CONN_MAX_AGE/CONN_HEALTH_CHECKS ya vienen de la base
+
+SESSION_COOKIE_SECURE = os.environ.get('DJANGO_HTTPS') == '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
@@ -0,0 +1,44 @@
+"""
+Perfil de tests: SQLite en memoria, sin migraciones y con un hasher rápido.
+
+La suite corre sin SQL Server (por ejemplo en CI con Linux):
+    DJANGO_ENTORNO=test python manage.py test
+"""
+from .base import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        # Sin conexiones persistentes: cada test abre y cierra la suya
+        'CONN_MAX_AGE': 0,
+    }
+}
+
+
+class _SinMigraciones:
+    """Las tablas se crean directamente desde los modelos (las migraciones solo mueven datos)."""
+    def __contains__(self, app):
+        return True
+
+    def __getitem__(self, app):
+        return None
+
+
+MIGRATION_MODULES = _SinMigraciones()
+
+# El hasher por defecto es lento a propósito; en los tests solo agrega tiempo
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Caché en memoria aunque esté definida CACHE_REDIS_URL: cada corrida empieza vacía
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sistemacitas-tests',
+    }
+}
+
+# Las líneas de la medición de solicitudes no se imprimen durante la suite (assertLogs las sigue viendo)
+LOGGING['loggers']['core.medicion']['handlers'] = []
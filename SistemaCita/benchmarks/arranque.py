@@ -0,0 +1,66 @@
+"""
+Benchmark del arranque de un proceso Django (worker, comando o test).
+
+Lanza varios subprocesos que solo ejecutan django.setup() y mide cuánto tardan
+y si abrieron una conexión a la base de datos. Con --con-crear-admin se agrega
+la llamada a crear_admin() que antes hacía CoreConfig.ready(), para comparar.
+
+Uso (desde SistemaCita/):
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --con-crear-admin --settings SistemaCitas.settings
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO = """
+import os, sys, time
+sys.path.insert(0, {raiz!r})
+os.environ['DJANGO_SETTINGS_MODULE'] = {settings!r}
+inicio = time.perf_counter()
+import django
+django.setup()
+if {con_crear_admin!r}:
+    from core.utils import crear_admin
+    crear_admin()
+from django.db import connections
+abrio_conexion = any(c.connection is not None for c in connections.all(initialized_only=True))
+print(time.perf_counter() - inicio, int(abrio_conexion))
+"""
+
+
+def medir(settings, repeticiones, con_crear_admin):
+    tiempos, conexiones = [], 0
+    codigo = CODIGO.format(raiz=RAIZ, settings=settings, con_crear_admin=con_crear_admin)
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True)
+        if salida.returncode:
+            sys.exit(salida.stderr)
+        segundos, abrio = salida.stdout.split()[-2:]
+        tiempos.append(float(segundos) * 1000)
+        conexiones += int(abrio)
+    return tiempos, conexiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--con-crear-admin', action='store_true', help="Simula el arranque anterior (consultas en ready()).")
+    args = parser.parse_args()
+
+    tiempos, conexiones = medir(args.settings, args.repeticiones, args.con_crear_admin)
+    tiempos.sort()
+    print(f"settings:          {args.settings}")
+    print(f"repeticiones:      {args.repeticiones}")
+    print(f"mediana (ms):      {statistics.median(tiempos):.1f}")
+    print(f"máximo (ms):       {tiempos[-1]:.1f}")
+    print(f"abrieron conexión: {conexiones}/{args.repeticiones}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Prueba de carga: vistas async bajo uvicorn (ASGI) frente a las vistas sync bajo
+gunicorn (WSGI).
+
+Levanta cada servidor con la base de datos configurada en los settings,
+inicia sesión con un médico y un paciente existentes (crea las sesiones con
+SessionStore, sin pasar por el login) y lanza solicitudes concurrentes a la
+agenda, las citas del paciente y el directorio de médicos. Informa las
+solicitudes por segundo y los percentiles 50/95/99 de la latencia en
+milisegundos.
+
+uvicorn arranca con VISTAS_ASYNC=1 (y CONSULTAS_PARALELAS=1 si se pasa
+--paralelas). Requiere `pip install uvicorn gunicorn`; si falta alguno se
+omite ese servidor.
+
+Uso (desde SistemaCita/):
+    python benchmarks/carga.py --medico medico1 --paciente paciente1
+    python benchmarks/carga.py --medico medico1 --paciente paciente1 --concurrencia 64 --duracion 30 --paralelas
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def crear_cookies(medico, paciente):
+    """Cookie de sesión de cada rol, guardada con el motor de sesiones configurado."""
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from importlib import import_module
+
+    from core.models import Usuario
+
+    SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+    cookies = {}
+    for rol, username in (('medico', medico), ('paciente', paciente)):
+        usuario = Usuario.objects.filter(username=username, rol=rol).first()
+        if usuario is None:
+            sys.exit(f"No existe el {rol} '{username}'")
+        sesion = SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.save()
+        cookies[rol] = f"{settings.SESSION_COOKIE_NAME}={sesion.session_key}"
+    return cookies
+
+
+def urls(cookies):
+    """(cookie, ruta) de las páginas de lectura más pedidas."""
+    return [
+        (cookies['medico'], '/medico/agenda/?vista=semana'),
+        (cookies['paciente'], '/paciente/citas/'),
+        (cookies['paciente'], '/medicos/'),
+    ]
+
+
+def esperar_puerto(puerto, proceso, segundos=30):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            sys.exit(f"El servidor terminó al arrancar (código {proceso.returncode})")
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    sys.exit(f"El servidor no abrió el puerto {puerto} en {segundos} s")
+
+
+def generar_carga(puerto, paginas, concurrencia, duracion):
+    """Cada hilo repite las páginas en ronda con una conexión keep-alive propia."""
+    fin = time.monotonic() + duracion
+    tiempos, errores = [], []
+    lock = threading.Lock()
+
+    def cliente(numero):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+        propios, fallidos, i = [], 0, numero
+        while time.monotonic() < fin:
+            cookie, ruta = paginas[i % len(paginas)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', ruta, headers={'Cookie': cookie, 'Host': 'localhost'})
+                response = conexion.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                fallidos += 1
+                conexion.close()
+                conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+                continue
+            if response.status != 200:
+                fallidos += 1
+            propios.append((time.perf_counter() - inicio) * 1000)
+        conexion.close()
+        with lock:
+            tiempos.extend(propios)
+            errores.append(fallidos)
+
+    with ThreadPoolExecutor(concurrencia) as pool:
+        list(pool.map(cliente, range(concurrencia)))
+    return tiempos, sum(errores)
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--medico', required=True, help="username de un médico existente")
+    parser.add_argument('--paciente', required=True, help="username de un paciente existente")
+    parser.add_argument('--concurrencia', type=int, default=32)
+    parser.add_argument('--duracion', type=float, default=15, help="Segundos de carga por servidor.")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=4, help="Hilos por worker de gunicorn.")
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--paralelas', action='store_true', help="Arranca uvicorn con CONSULTAS_PARALELAS=1.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    import django
+    django.setup()
+
+    paginas = urls(crear_cookies(args.medico, args.paciente))
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [RAIZ, os.environ.get('PYTHONPATH')])))
+    servidores = {
+        'uvicorn (ASGI, async)': (
+            'uvicorn',
+            ['uvicorn', 'SistemaCitas.asgi:application', '--port', str(args.puerto),
+             '--workers', str(args.workers), '--log-level', 'warning'],
+            dict(entorno, VISTAS_ASYNC='1', CONSULTAS_PARALELAS='1' if args.paralelas else '0'),
+        ),
+        'gunicorn (WSGI, sync)': (
+            'gunicorn',
+            ['gunicorn', 'SistemaCitas.wsgi:application', '--bind', f'127.0.0.1:{args.puerto}',
+             '--workers', str(args.workers), '--threads', str(args.hilos), '--log-level', 'warning'],
+            dict(entorno, VISTAS_ASYNC='0'),
+        ),
+    }
+
+    print(f"concurrencia: {args.concurrencia}   duración: {args.duracion:.0f} s   workers: {args.workers}\n")
+    print(f"{'servidor':<24} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errores':>8}")
+    for nombre, (modulo, comando, env) in servidores.items():
+        if importlib.util.find_spec(modulo) is None:
+            print(f"{nombre:<24} omitido: falta el paquete '{modulo}' (pip install {modulo})")
+            continue
+        proceso = subprocess.Popen([sys.executable, '-m', *comando], cwd=RAIZ, env=env)
+        try:
+            esperar_puerto(args.puerto, proceso)
+            # Calentamiento: plantillas compiladas y cachés llenas antes de medir
+            generar_carga(args.puerto, paginas, 2, 1)
+            tiempos, errores = generar_carga(args.puerto, paginas, args.concurrencia, args.duracion)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        tiempos.sort()
+        if not tiempos:
+            print(f"{nombre:<24} sin respuestas ({errores} errores)")
+            continue
+        print(
+            f"{nombre:<24} {len(tiempos) / args.duracion:>8.1f} {statistics.median(tiempos):>8.1f} "
+            f"{percentil(tiempos, 0.95):>8.1f} {percentil(tiempos, 0.99):>8.1f} {errores:>8}"
+        )
+
+
+if __name__ == '__main__':
+    main()
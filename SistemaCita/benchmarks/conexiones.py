@@ -0,0 +1,127 @@
+"""
+Benchmark del costo de abrir una conexión a la base de datos por solicitud.
+
+Crea una base de datos de prueba, inicia sesión con un paciente y pide varias
+veces la misma página con CONN_MAX_AGE=0 (una conexión nueva por solicitud,
+como antes) y con conexiones persistentes (CONN_MAX_AGE > 0 y
+CONN_HEALTH_CHECKS). Informa el tiempo por solicitud y cuántas conexiones se
+abrieron.
+
+Con SQLite abrir una conexión es casi gratis; --latencia-conexion agrega una
+espera a cada conexión nueva para simular el handshake ODBC con SQL Server
+(20-50 ms con autenticación de Windows). Con los settings de producción se
+mide la conexión real.
+
+Uso (desde SistemaCita/):
+    python benchmarks/conexiones.py --settings local_settings --latencia-conexion 30
+    python benchmarks/conexiones.py --solicitudes 500 --conn-max-age 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def simular_latencia(connection, milisegundos):
+    """Agrega una espera fija a cada conexión nueva (sustituto local del handshake ODBC)."""
+    original = connection.get_new_connection
+
+    def get_new_connection(conn_params):
+        time.sleep(milisegundos / 1000)
+        return original(conn_params)
+
+    connection.get_new_connection = get_new_connection
+
+
+def medir(cliente, url, solicitudes):
+    from django.db import close_old_connections
+    from django.db.backends.signals import connection_created
+
+    abiertas = []
+
+    def contar(sender, connection, **kwargs):
+        abiertas.append(connection.alias)
+
+    connection_created.connect(contar)
+    tiempos = []
+    try:
+        for _ in range(solicitudes):
+            inicio = time.perf_counter()
+            # El cliente de pruebas no cierra conexiones: se hace como el servidor, al inicio y al fin
+            close_old_connections()
+            response = cliente.get(url)
+            close_old_connections()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code != 200:
+                sys.exit(f"{url} respondió {response.status_code}")
+    finally:
+        connection_created.disconnect(contar)
+    return tiempos, len(abiertas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--solicitudes', type=int, default=200)
+    parser.add_argument('--conn-max-age', type=int, default=60, help="Valor persistente a comparar con 0.")
+    parser.add_argument('--latencia-conexion', type=float, default=0, help="ms extra por conexión nueva.")
+    parser.add_argument('--url', default=None, help="Página a pedir (por defecto las citas del paciente).")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    import django
+    django.setup()
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+
+    from core.models import Usuario
+    from gestion_citas.models import Paciente
+
+    if connection.vendor == 'sqlite':
+        # Una base SQLite en memoria no se puede cerrar y reabrir: se usa un archivo temporal
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'conexiones.sqlite3')
+    if args.latencia_conexion:
+        simular_latencia(connection, args.latencia_conexion)
+
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        usuario = Usuario.objects.create_user(username='bench_paciente', password='bench', rol='paciente')
+        Paciente.objects.create(usuario=usuario, telefono='7777-7777', direccion='Calle 1')
+        url = args.url or reverse('paciente_cita_list')
+
+        print(f"motor:             {connection.vendor}")
+        print(f"url:               {url}")
+        print(f"solicitudes:       {args.solicitudes}")
+        print(f"latencia simulada: {args.latencia_conexion:.0f} ms por conexión")
+        for max_age in (0, args.conn_max_age):
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            connection.settings_dict['CONN_HEALTH_CHECKS'] = bool(max_age)
+            connection.close()
+            cache.clear()
+            cliente = Client()
+            cliente.force_login(usuario)
+            cliente.get(url)  # Calienta plantillas y caché de sesión
+            tiempos, abiertas = medir(cliente, url, args.solicitudes)
+            tiempos.sort()
+            print(f"\nCONN_MAX_AGE={max_age}{' + CONN_HEALTH_CHECKS' if max_age else ''}")
+            print(f"  mediana (ms):    {statistics.median(tiempos):.2f}")
+            print(f"  p95 (ms):        {tiempos[int(len(tiempos) * 0.95) - 1]:.2f}")
+            print(f"  conexiones:      {abiertas} ({abiertas / args.solicitudes:.2f} por solicitud)")
+    finally:
+        connection.close()
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
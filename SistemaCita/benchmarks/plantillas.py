@@ -0,0 +1,155 @@
+"""
+Benchmark del renderizado de las diez plantillas más usadas.
+
+Crea una base de datos de prueba con médicos, pacientes y citas, pide cada
+página una vez para obtener su contexto real y luego renderiza solo la
+plantilla varias veces, con el cargador con caché (producción) y sin él
+(cada render vuelve a leer y compilar la plantilla y las que extiende).
+Informa la mediana y el p95 en milisegundos.
+
+Uso (desde SistemaCita/):
+    python benchmarks/plantillas.py
+    python benchmarks/plantillas.py --repeticiones 500 --sin-fragmentos
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def crear_datos(n_medicos=10, n_pacientes=60, citas_por_paciente=4):
+    from django.utils import timezone
+
+    from core.models import Usuario
+    from gestion_citas.models import Cita, Especialidad, Medico, Paciente
+
+    especialidades = [Especialidad.objects.create(nombre=f'Especialidad {i}') for i in range(5)]
+    medicos = []
+    for i in range(n_medicos):
+        usuario = Usuario.objects.create(username=f'bench_medico{i}', rol='medico', first_name=f'Medico{i}', last_name='Bench')
+        medico = Medico.objects.create(usuario=usuario, matricula=f'B-{i:04d}', telefono='7777-7777')
+        medico.especialidades.set(especialidades[:1 + i % 3])
+        medicos.append(medico)
+    pacientes = []
+    for i in range(n_pacientes):
+        usuario = Usuario.objects.create(username=f'bench_paciente{i}', rol='paciente', first_name=f'Paciente{i}', last_name='Bench')
+        pacientes.append(Paciente.objects.create(usuario=usuario, telefono='7777-7777', direccion='Calle 1'))
+    ahora = timezone.now()
+    for i, paciente in enumerate(pacientes):
+        for j in range(citas_por_paciente):
+            # create() y no bulk_create() para que las señales marquen la agenda de cada médico
+            Cita.objects.create(
+                medico=medicos[(i + j) % n_medicos],
+                paciente=paciente,
+                motivo='Control',
+                fecha_hora=ahora + timedelta(hours=i * citas_por_paciente + j),
+            )
+    admin = Usuario.objects.create(username='bench_admin', rol='admin')
+    return medicos[0].usuario, pacientes[0].usuario, admin
+
+
+def paginas(medico, paciente, admin):
+    """(usuario, url) de las diez páginas más visitadas."""
+    from django.urls import reverse
+    return [
+        (medico, reverse('medico_agenda') + '?vista=semana'),
+        (medico, reverse('pacientes_medico')),
+        (medico, reverse('medico_perfil')),
+        (paciente, reverse('paciente_cita_list')),
+        (paciente, reverse('paciente_cita_create')),
+        (paciente, reverse('medicos_paciente')),
+        (paciente, reverse('paciente_perfil')),
+        (admin, reverse('admin_dashboard')),
+        (admin, reverse('gestion_citas:cita-list')),
+        (admin, reverse('gestion_citas:medico-list')),
+    ]
+
+
+def capturar(usuario, url):
+    """Nombre de la plantilla, contexto y request de la página."""
+    from django.core.cache import cache
+    from django.test import Client
+
+    cache.clear()
+    cliente = Client()
+    cliente.force_login(usuario)
+    response = cliente.get(url)
+    if response.status_code != 200:
+        sys.exit(f"{url} respondió {response.status_code}")
+    # Con {% include %} se registran varios contextos; el primero es el de la plantilla principal
+    contexto = response.context[0] if isinstance(response.context, list) else response.context
+    return response.templates[0].name, contexto.flatten(), response.wsgi_request
+
+
+def medir(engine, nombre, contexto, request, repeticiones, sin_fragmentos):
+    from django.core.cache import cache
+    from django.template import RequestContext
+
+    tiempos = []
+    for _ in range(repeticiones):
+        if sin_fragmentos:
+            cache.clear()
+        inicio = time.perf_counter()
+        engine.get_template(nombre).render(RequestContext(request, contexto))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--sin-fragmentos', action='store_true', help="Vacía la caché antes de cada render ({% cache %} siempre falla).")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.template import Engine, engines
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    base = engines['django'].engine
+    motores = {
+        'con caché': Engine(
+            dirs=base.dirs, context_processors=base.context_processors, libraries=base.libraries,
+            loaders=[('django.template.loaders.cached.Loader', LOADERS)],
+        ),
+        'sin caché': Engine(
+            dirs=base.dirs, context_processors=base.context_processors, libraries=base.libraries,
+            loaders=LOADERS,
+        ),
+    }
+
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        capturas = [capturar(usuario, url) for usuario, url in paginas(*crear_datos())]
+        print(f"repeticiones:      {args.repeticiones}")
+        print(f"fragmentos:        {'sin caché' if args.sin_fragmentos else 'con caché'}\n")
+        print(f"{'plantilla':<40} " + ' '.join(f"{titulo + ' p50/p95 (ms)':>26}" for titulo in motores))
+        for nombre, contexto, request in capturas:
+            columnas = []
+            for engine in motores.values():
+                mediana, p95 = medir(engine, nombre, contexto, request, args.repeticiones, args.sin_fragmentos)
+                columnas.append(f"{mediana:>17.2f} / {p95:>6.2f}")
+            print(f"{nombre:<40} " + ' '.join(columnas))
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark de sesiones y caché por rol.
+
+Crea una base de datos de prueba, inicia sesión con un paciente y pide varias
+veces la misma página con SESSION_ENGINE 'db' y 'cached_db'. Informa el tiempo
+por solicitud y cuántas consultas SQL hizo cada una (las de django_session
+aparte). Usa el backend de caché configurado: LocMem por defecto o Redis si
+CACHE_REDIS_URL está definida.
+
+Uso (desde SistemaCita/):
+    python benchmarks/sesiones.py
+    python benchmarks/sesiones.py --solicitudes 500 --url /paciente/medicos/
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOTORES = ['django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db']
+
+
+def medir(cliente, url, solicitudes):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    tiempos, consultas, de_sesion = [], 0, 0
+    for _ in range(solicitudes):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = cliente.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        if response.status_code != 200:
+            sys.exit(f"{url} respondió {response.status_code}")
+        consultas += len(capturadas.captured_queries)
+        de_sesion += sum('django_session' in q['sql'] for q in capturadas.captured_queries)
+    return tiempos, consultas / solicitudes, de_sesion / solicitudes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--solicitudes', type=int, default=200)
+    parser.add_argument('--url', default=None, help="Página a pedir (por defecto el perfil del paciente).")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+    from django.db import connection
+
+    from core.models import Usuario
+    from gestion_citas.models import Paciente
+
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        usuario = Usuario.objects.create_user(username='bench_paciente', password='bench', rol='paciente')
+        Paciente.objects.create(usuario=usuario, telefono='7777-7777', direccion='Calle 1')
+        url = args.url or reverse('paciente_perfil')
+
+        print(f"caché:             {settings.CACHES['default']['BACKEND']}")
+        print(f"url:               {url}")
+        print(f"solicitudes:       {args.solicitudes}")
+        for motor in MOTORES:
+            with override_settings(SESSION_ENGINE=motor):
+                cache.clear()
+                cliente = Client()
+                cliente.force_login(usuario)
+                cliente.get(url)  # Calienta la caché de sesión y de plantillas
+                tiempos, consultas, de_sesion = medir(cliente, url, args.solicitudes)
+            print(f"\n{motor.rsplit('.', 1)[-1]}")
+            print(f"  mediana (ms):    {statistics.median(tiempos):.2f}")
+            print(f"  solicitudes/s:   {len(tiempos) / (sum(tiempos) / 1000):.0f}")
+            print(f"  consultas/sol.:  {consultas:.2f} ({de_sesion:.2f} de django_session)")
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Suite de benchmarks de las vistas más pedidas, de punta a punta.
+
+Crea una base de datos de prueba (por defecto el perfil test: SQLite en
+memoria), la llena con `manage.py generar_datos` y pide cada vista con el
+cliente de pruebas como el usuario que más datos tiene. Por vista informa:
+
+- latencia p50/p95/p99 en milisegundos (con la caché ya caliente),
+- consultas SQL por solicitud,
+- memoria asignada por solicitud (pico de tracemalloc, en KB).
+
+Con --guardar se escribe el resultado en un JSON que sirve de línea base; con
+--comparar se mide de nuevo y el script termina con código 1 si alguna vista
+empeora más que --umbral (latencia p95 y memoria) o hace más consultas.
+
+Uso (desde SistemaCita/):
+    python benchmarks/vistas.py --guardar benchmarks/linea_base.json
+    python benchmarks/vistas.py --comparar benchmarks/linea_base.json --umbral 0.25
+    python benchmarks/vistas.py --citas 1000000 --solo agenda_medico cita_list
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Métricas que se comparan contra la línea base (las consultas se comparan exactas)
+METRICAS_CON_UMBRAL = ['p95_ms', 'memoria_kb']
+
+
+class Escenario:
+    """Una vista a medir: quién la pide y cómo se arma cada solicitud."""
+
+    def __init__(self, nombre, usuario, solicitud, despues=None):
+        self.nombre = nombre
+        self.usuario = usuario
+        self.solicitud = solicitud  # i -> (método, url, datos)
+        self.despues = despues      # (i, response) -> None, fuera de la medición
+
+    def pedir(self, cliente, i):
+        metodo, url, datos = self.solicitud(i)
+        if metodo == 'get':
+            return cliente.get(url, datos)
+        return cliente.post(url, datos)
+
+
+def preparar_escenarios():
+    from django.db.models import Count
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from core.models import Usuario
+    from gestion_citas.disponibilidad import turnos_libres_medico
+    from gestion_citas.models import Cita, Medico, Paciente
+
+    admin = Usuario.objects.create(username='bench_admin', rol='admin')
+    medico = Medico.objects.annotate(n=Count('citas_medico')).order_by('-n', 'pk').select_related('usuario').first()
+    paciente = Paciente.objects.annotate(n=Count('citas_paciente')).order_by('-n', 'pk').select_related('usuario').first()
+    if medico is None or paciente is None:
+        sys.exit("No hay médicos o pacientes: revise los parámetros de generar_datos")
+
+    # Cambio de estado: una cita futura del médico alterna entre pendiente y confirmada
+    cita = Cita.objects.filter(medico=medico, fecha_hora__gt=timezone.now(), estado=Cita.PENDIENTE).first()
+    estados = [Cita.CONFIRMADA, Cita.PENDIENTE]
+
+    # Reserva: siempre el mismo turno libre; la cita creada se borra después de cada medición
+    hoy = timezone.localdate()
+    turnos = turnos_libres_medico(medico, hoy + timedelta(days=1), hoy + timedelta(days=30))
+    if not turnos:
+        sys.exit("El médico más ocupado no tiene turnos libres en los próximos 30 días")
+    reserva = {
+        'medico': medico.pk,
+        'fecha_hora': timezone.localtime(turnos[0]).strftime('%Y-%m-%dT%H:%M'),
+        'motivo': 'Control general',
+    }
+
+    def borrar_reserva(i, response):
+        if response.status_code != 302:
+            sys.exit(f"La reserva no se creó (respondió {response.status_code})")
+        Cita.objects.filter(medico=medico, fecha_hora=turnos[0]).delete()
+
+    escenarios = [
+        Escenario('agenda_medico', medico.usuario, lambda i: ('get', reverse('medico_agenda'), {'vista': 'semana'})),
+        Escenario('cita_list', admin, lambda i: ('get', reverse('gestion_citas:cita-list'), {})),
+        Escenario('paciente_cita_list', paciente.usuario, lambda i: ('get', reverse('paciente_cita_list'), {})),
+        Escenario('medicos_paciente', paciente.usuario, lambda i: ('get', reverse('medicos_paciente'), {})),
+        Escenario('pacientes_medico', medico.usuario, lambda i: ('get', reverse('pacientes_medico'), {})),
+        Escenario('reserva_cita', paciente.usuario, lambda i: ('post', reverse('paciente_cita_create'), reserva), borrar_reserva),
+    ]
+    if cita is not None:
+        escenarios.insert(5, Escenario(
+            'actualizar_estado_cita', medico.usuario,
+            lambda i: ('post', reverse('medico-actualizar-estado'), {'cita_id': cita.pk, 'estado': estados[i % 2]}),
+        ))
+    return escenarios
+
+
+def medir(escenario, repeticiones, repeticiones_memoria):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    cliente = Client()
+    cliente.force_login(escenario.usuario)
+
+    def pedir(i):
+        response = escenario.pedir(cliente, i)
+        if response.status_code not in (200, 302):
+            sys.exit(f"{escenario.nombre} respondió {response.status_code}")
+        return response
+
+    # Calentamiento: plantillas compiladas, sesión y fragmentos en caché
+    for i in range(2):
+        response = pedir(i)
+        if escenario.despues:
+            escenario.despues(i, response)
+
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        response = pedir(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if escenario.despues:
+            escenario.despues(i, response)
+
+    # Consultas y memoria en una pasada aparte: instrumentar altera los tiempos
+    consultas, memoria = [], []
+    tracemalloc.start()
+    try:
+        for i in range(repeticiones_memoria):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            with CaptureQueriesContext(connection) as capturadas:
+                response = pedir(i)
+            memoria.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+            consultas.append(len(capturadas.captured_queries))
+            if escenario.despues:
+                escenario.despues(i, response)
+    finally:
+        tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+        'p99_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))], 3),
+        'consultas': max(consultas),
+        'memoria_kb': round(statistics.median(memoria), 1),
+    }
+
+
+def comparar(linea_base, actual, umbral):
+    """Lista de regresiones de `actual` respecto de `linea_base`."""
+    regresiones = []
+    if linea_base.get('datos') != actual['datos']:
+        print("⚠ La línea base se midió con otros datos; la comparación es orientativa.")
+    for nombre, metricas in actual['vistas'].items():
+        base = linea_base['vistas'].get(nombre)
+        if base is None:
+            continue
+        if metricas['consultas'] > base['consultas']:
+            regresiones.append(f"{nombre}: {base['consultas']} -> {metricas['consultas']} consultas")
+        for metrica in METRICAS_CON_UMBRAL:
+            if base[metrica] and metricas[metrica] > base[metrica] * (1 + umbral):
+                regresiones.append(
+                    f"{nombre}: {metrica} {base[metrica]} -> {metricas[metrica]} "
+                    f"(+{(metricas[metrica] / base[metrica] - 1) * 100:.0f}%)"
+                )
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings'))
+    parser.add_argument('--pacientes', type=int, default=2000)
+    parser.add_argument('--medicos', type=int, default=40)
+    parser.add_argument('--citas', type=int, default=100000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--repeticiones-memoria', type=int, default=3)
+    parser.add_argument('--solo', nargs='+', metavar='VISTA', help="Medir solo estas vistas.")
+    parser.add_argument('--guardar', metavar='JSON', help="Escribe el resultado como línea base.")
+    parser.add_argument('--comparar', metavar='JSON', help="Compara con una línea base y falla si hay regresiones.")
+    parser.add_argument('--umbral', type=float, default=0.25, help="Empeoramiento tolerado (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    # Por defecto SQLite en memoria y sin migraciones (ver SistemaCitas/settings/test.py)
+    os.environ.setdefault('DJANGO_ENTORNO', 'test')
+    import django
+    django.setup()
+
+    from io import StringIO
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    datos = {'pacientes': args.pacientes, 'medicos': args.medicos, 'citas': args.citas, 'semilla': args.semilla}
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        inicio = time.perf_counter()
+        call_command('generar_datos', sin_indice=True, stdout=StringIO(), **datos)
+        print(f"datos:        {datos} ({time.perf_counter() - inicio:.0f} s)")
+        print(f"motor:        {connection.vendor}")
+        print(f"repeticiones: {args.repeticiones}\n")
+        print(f"{'vista':<24} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>10} {'memoria KB':>11}")
+
+        resultado = {
+            'datos': datos,
+            'entorno': {'python': platform.python_version(), 'django': django.get_version(), 'motor': connection.vendor},
+            'vistas': {},
+        }
+        for escenario in preparar_escenarios():
+            if args.solo and escenario.nombre not in args.solo:
+                continue
+            metricas = medir(escenario, args.repeticiones, args.repeticiones_memoria)
+            resultado['vistas'][escenario.nombre] = metricas
+            print(
+                f"{escenario.nombre:<24} {metricas['p50_ms']:>8.2f} {metricas['p95_ms']:>8.2f} "
+                f"{metricas['p99_ms']:>8.2f} {metricas['consultas']:>10} {metricas['memoria_kb']:>11.1f}"
+            )
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.guardar}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(json.load(archivo), resultado, args.umbral)
+        if regresiones:
+            print("\n❌ Regresiones:\n  " + "\n  ".join(regresiones))
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones respecto de {args.comparar} (umbral {args.umbral:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from django.apps import AppConfig  # Importa la clase base para configurar apps
+from django.db.models.signals import post_migrate  # Señal emitida al terminar migrate
 
 
 class CoreConfig(AppConfig):
@@ -8,12 +9,11 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         """
-        Este método se ejecuta cuando Django carga la app.
-        Ideal para inicializaciones que necesitan el ORM cargado.
+        Este método se ejecuta cuando Django carga la app (en cada worker,
+        comando o corrida de tests), por eso no debe consultar la base de datos.
         """
-        # 🔹 Importa la función crear_admin desde utils
-        # Esto se hace aquí y no al inicio para evitar problemas de importación circular
-        from .utils import crear_admin
-        # 🔹 Crea automáticamente un usuario admin si no existe
-        crear_admin()
-        
+        # 🔹 Los grupos y el usuario admin se crean al terminar `migrate`
+        # (o con `manage.py crear_admin`), no en cada arranque del proceso.
+        # Se importa aquí y no al inicio para evitar problemas de importación circular
+        from .utils import crear_admin_post_migrate
+        post_migrate.connect(crear_admin_post_migrate, sender=self, dispatch_uid='core_crear_admin')
@@ -1,6 +1,9 @@
 from functools import wraps  # Para mantener metadata de la función original
+from asgiref.sync import iscoroutinefunction  # Para distinguir vistas async
 from django.shortcuts import redirect  # Para redirigir a otra página
 from django.contrib import messages  # Para mostrar mensajes al usuario
+from django.utils.cache import patch_vary_headers  # Clave de caché por cookie
+from django.views.decorators.cache import cache_control, cache_page  # Caché de respuestas completas
 
 
 # ==============================
@@ -26,29 +29,77 @@ def admin_required(view_func):
 # DECORADOR: Solo médico
 # ==============================
 def medico_required(view_func):
-    """Permite solo a usuarios con rol=medico"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if getattr(request.user, 'rol', None) != 'medico':
-            messages.error(request, "No tienes permiso para acceder al panel de médico.")
-            return redirect('home')
-        return view_func(request, *args, **kwargs)
-    return wrapper
+    """Permite solo a usuarios con rol=medico (también vistas async)"""
+    return _rol_required(view_func, 'medico', "No tienes permiso para acceder al panel de médico.")
 
 
 # ==============================
 # DECORADOR: Solo paciente
 # ==============================
 def paciente_required(view_func):
-    """Permite solo a usuarios con rol=paciente"""
+    """Permite solo a usuarios con rol=paciente (también vistas async)"""
+    return _rol_required(view_func, 'paciente', "No tienes permiso para acceder al panel de paciente.")
+
+
+# ==============================
+# Verificación de rol común (vistas sync y async)
+# ==============================
+def _rechazo_rol(request, rol, mensaje):
+    """Redirección si el usuario no tiene el rol; None si puede continuar."""
+    if not request.user.is_authenticated:
+        return redirect('login')
+    if getattr(request.user, 'rol', None) != rol:
+        messages.error(request, mensaje)
+        return redirect('home')
+    return None
+
+
+def _rol_required(view_func, rol, mensaje):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # En async el usuario se carga con auser(); se deja en request.user para
+            # que las plantillas y el resto de la vista no vuelvan a consultarlo
+            request.user = await request.auser()
+            return _rechazo_rol(request, rol, mensaje) or await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if getattr(request.user, 'rol', None) != 'paciente':
-            messages.error(request, "No tienes permiso para acceder al panel de paciente.")
-            return redirect('home')
-        return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+        return _rechazo_rol(request, rol, mensaje) or view_func(request, *args, **kwargs)
+    return wrapper
+
+
+# ==============================
+# DECORADOR: Caché de la vista por rol
+# ==============================
+def cache_por_rol(segundos, por_usuario=True):
+    """
+    Guarda la respuesta GET de la vista en la caché con una clave que incluye el
+    rol (y por defecto el usuario), así las respuestas de pacientes, médicos y
+    administradores nunca se mezclan. Va debajo de los decoradores de rol.
+    Si la vista usó el token CSRF (ej. el formulario de cerrar sesión de los
+    layouts), la respuesta varía además por la cookie: se guarda por sesión y
+    nadie recibe el token de otra. No usar en páginas con mensajes de `messages`.
+    `por_usuario=False` comparte la respuesta entre todos los usuarios del mismo rol.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def vista_con_token(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            # get_token() marca la cookie CSRF para enviarla con la respuesta
+            if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                patch_vary_headers(response, ['Cookie'])
+            return response
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            rol = getattr(request.user, 'rol', None) or 'anonimo'
+            prefijo = f"rol-{rol}"
+            if por_usuario and request.user.is_authenticated:
+                prefijo += f"-usuario-{request.user.pk}"
+            vista = cache_page(segundos, key_prefix=prefijo)(vista_con_token)
+            # El navegador puede guardarla, pero nunca un proxy compartido
+            return cache_control(private=True)(vista)(request, *args, **kwargs)
+        return wrapper
+    return decorator
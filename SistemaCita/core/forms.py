@@ -1,10 +1,48 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import Usuario
-from gestion_citas.models import Paciente, Cita, Medico
+from gestion_citas.models import Paciente, Cita, Medico, SerieCita
+from gestion_citas.disponibilidad import verificar_disponibilidad
+from gestion_citas.series import MAX_REPETICIONES, fechas_libres, fechas_serie
+from gestion_citas.opciones import opciones_medicos, usar_opciones
 from django.utils import timezone
 import re
 
+# ==============================
+# REGLAS DE FORMATO DEL REGISTRO
+# ==============================
+# Sin consultas a la base de datos: la importación por CSV (gestion_citas/importacion.py)
+# las reutiliza y comprueba la unicidad contra conjuntos precargados
+def validar_username(username):
+    username = (username or '').strip()
+    if not username:
+        raise forms.ValidationError("El nombre de usuario es obligatorio.")
+    if len(username) < 4:
+        raise forms.ValidationError("El nombre de usuario debe tener al menos 4 caracteres.")
+    if re.search(r'\s', username):
+        raise forms.ValidationError("El nombre de usuario no puede contener espacios.")
+    return username
+
+
+def validar_email(email):
+    email = (email or '').strip()
+    if not email:
+        raise forms.ValidationError("El correo electrónico es obligatorio.")
+    if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
+        raise forms.ValidationError("Ingrese un correo electrónico válido.")
+    return email
+
+
+def validar_password(password):
+    if not password:
+        raise forms.ValidationError("La contraseña es obligatoria.")
+    if len(password) < 8:
+        raise forms.ValidationError("La contraseña debe tener al menos 8 caracteres.")
+    if not re.match(r'^[A-Za-z]+$', password):
+        raise forms.ValidationError("La contraseña solo puede contener letras (mayúsculas y minúsculas).")
+    return password
+
+
 # ==============================
 # FORMULARIO DE REGISTRO DE PACIENTE
 # ==============================
@@ -49,36 +87,19 @@ class RegistroForm(UserCreationForm):
         return last_name
 
     def clean_username(self):
-        username = self.cleaned_data.get('username', '').strip()
-        if not username:
-            raise forms.ValidationError("El nombre de usuario es obligatorio.")
-        if len(username) < 4:
-            raise forms.ValidationError("El nombre de usuario debe tener al menos 4 caracteres.")
-        if re.search(r'\s', username):
-            raise forms.ValidationError("El nombre de usuario no puede contener espacios.")
+        username = validar_username(self.cleaned_data.get('username', ''))
         if Usuario.objects.filter(username=username).exists():
             raise forms.ValidationError("Este nombre de usuario ya está en uso.")
         return username
 
     def clean_email(self):
-        email = self.cleaned_data.get('email', '').strip()
-        if not email:
-            raise forms.ValidationError("El correo electrónico es obligatorio.")
-        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-            raise forms.ValidationError("Ingrese un correo electrónico válido.")
+        email = validar_email(self.cleaned_data.get('email', ''))
         if Usuario.objects.filter(email=email).exists():
             raise forms.ValidationError("Este correo ya está registrado.")
         return email
 
     def clean_password1(self):
-        password = self.cleaned_data.get('password1', '')
-        if not password:
-            raise forms.ValidationError("La contraseña es obligatoria.")
-        if len(password) < 8:
-            raise forms.ValidationError("La contraseña debe tener al menos 8 caracteres.")
-        if not re.match(r'^[A-Za-z]+$', password):
-            raise forms.ValidationError("La contraseña solo puede contener letras (mayúsculas y minúsculas).")
-        return password
+        return validar_password(self.cleaned_data.get('password1', ''))
 
     def clean(self):
         cleaned_data = super().clean()
@@ -148,10 +169,16 @@ class PacienteCitaForm(forms.ModelForm):
         fields = ['medico', 'fecha_hora', 'motivo']
         widgets = {
             'medico': forms.Select(attrs={'class': 'form-select'}),
-            'fecha_hora': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+            'fecha_hora': forms.DateTimeInput(format='%Y-%m-%dT%H:%M', attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'motivo': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Describe el motivo de tu cita'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Lista de médicos cacheada; el queryset solo se usa para validar el médico elegido
+        self.fields['medico'].queryset = Medico.objects.select_related('usuario')
+        usar_opciones(self.fields['medico'], opciones_medicos())
+
     def clean_medico(self):
         medico = self.cleaned_data.get('medico')
         if not medico:
@@ -173,3 +200,85 @@ class PacienteCitaForm(forms.ModelForm):
         if len(motivo) < 5:
             raise forms.ValidationError("El motivo debe tener al menos 5 caracteres.")
         return motivo
+
+    def clean(self):
+        cleaned_data = super().clean()
+        medico = cleaned_data.get('medico')
+        fecha_hora = cleaned_data.get('fecha_hora')
+        # El turno debe estar dentro del horario del médico y libre
+        if medico and fecha_hora:
+            try:
+                self.verificar_turno(medico, fecha_hora)
+            except forms.ValidationError as e:
+                self.add_error('fecha_hora', e)
+        return cleaned_data
+
+    def verificar_turno(self, medico, fecha_hora):
+        verificar_disponibilidad(medico, fecha_hora, excluir=self.instance.pk)
+
+
+# ==============================
+# FORMULARIO DE RESERVA (CITA O SERIE DE CITAS)
+# ==============================
+class PacienteReservaForm(PacienteCitaForm):
+    """Reserva una cita o, con más de una repetición, una serie de citas periódicas."""
+    campos_serie = ('repeticiones', 'intervalo_semanas', 'omitir_ocupadas')
+
+    repeticiones = forms.IntegerField(
+        min_value=1,
+        max_value=MAX_REPETICIONES,
+        initial=1,
+        required=False,
+        label='Cantidad de citas',
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    intervalo_semanas = forms.TypedChoiceField(
+        choices=SerieCita.INTERVALOS,
+        coerce=int,
+        initial=1,
+        required=False,
+        label='Repetir',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    omitir_ocupadas = forms.BooleanField(
+        required=False,
+        label='Reservar solo las fechas libres',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_repeticiones(self):
+        return self.cleaned_data.get('repeticiones') or 1
+
+    def clean_intervalo_semanas(self):
+        return self.cleaned_data.get('intervalo_semanas') or 1
+
+    def es_serie(self):
+        return self.cleaned_data.get('repeticiones', 1) > 1
+
+    def verificar_turno(self, medico, fecha_hora):
+        if not self.es_serie():
+            return super().verificar_turno(medico, fecha_hora)
+        # Todas las fechas de la serie en una pasada
+        fechas = fechas_serie(fecha_hora, self.cleaned_data['repeticiones'], self.cleaned_data['intervalo_semanas'])
+        fechas_libres(medico, fechas, omitir_ocupadas=self.cleaned_data.get('omitir_ocupadas'))
+
+
+# ==============================
+# FORMULARIO DE SERIE DE CITAS
+# ==============================
+class SerieCitaForm(forms.Form):
+    """Cambios que se aplican a todas las citas pendientes de una serie."""
+    hora = forms.TimeField(
+        label='Hora',
+        widget=forms.TimeInput(format='%H:%M', attrs={'class': 'form-control', 'type': 'time'}),
+    )
+    motivo = forms.CharField(
+        label='Motivo',
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+    )
+
+    def clean_motivo(self):
+        motivo = self.cleaned_data.get('motivo', '').strip()
+        if len(motivo) < 5:
+            raise forms.ValidationError("El motivo debe tener al menos 5 caracteres.")
+        return motivo
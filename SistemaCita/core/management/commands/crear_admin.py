@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core.utils import crear_admin
+
+
+class Command(BaseCommand):
+    help = "Crea los grupos de roles y el usuario admin si no existen (idempotente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Base de datos donde crear el admin.")
+
+    def handle(self, *args, **options):
+        if crear_admin(using=options['database']):
+            self.stdout.write(self.style.SUCCESS("✅ Usuario admin creado"))
+        else:
+            self.stdout.write("⚠ Usuario admin ya existe")
@@ -0,0 +1,237 @@
+"""
+Medición por solicitud: tiempo total, tiempo y cantidad de consultas SQL,
+consultas repetidas y tiempo de render de plantillas.
+
+MedicionMiddleware (ver middleware.py) crea una Medicion para una muestra de
+las solicitudes y la deja en un ContextVar mientras se atiende. Las consultas
+se cuentan con un execute_wrapper de cada conexión; las plantillas, con el
+backend DjangoTemplatesMedidas (settings.TEMPLATES lo usa si la medición está
+activa); y el código puede marcar tramos propios con medir('nombre'), como
+bloque `with` o como decorador. Fuera de una solicitud medida medir() no hace nada.
+
+Las consultas repetidas se agrupan por huella: el SQL sin valores literales y
+con las listas IN (...) colapsadas, así un N+1 aparece como una sola huella
+ejecutada N veces.
+
+El acumulado para el panel de rendimiento se guarda en la caché por defecto
+(compartida entre workers si es Redis). Las actualizaciones no son atómicas:
+con solicitudes simultáneas alguna muestra puede perderse, lo que no cambia
+el orden de las vistas más lentas.
+"""
+import hashlib
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+CLAVE_RESUMEN = 'core:medicion:resumen'
+DURACION_RESUMEN = 60 * 60 * 24 * 7
+# Topes del acumulado para que la entrada de caché no crezca sin límite
+MAX_VISTAS = 300
+MAX_HUELLAS = 100
+MAX_RECIENTES = 200
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+_LISTA_IN = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r'\s+')
+_NOMBRE_TRAMO = re.compile(r'[^0-9A-Za-z_-]')
+
+
+def normalizar_sql(sql):
+    """SQL sin literales ni largo variable de IN (...), para agrupar consultas iguales."""
+    sql = _ESPACIOS.sub(' ', sql).strip()
+    sql = _LITERALES.sub('?', sql).replace('%s', '?')
+    return _LISTA_IN.sub('IN (...)', sql)
+
+
+def huella_sql(sql):
+    return hashlib.sha1(normalizar_sql(sql).encode()).hexdigest()[:12]
+
+
+class Medicion:
+    """Datos de una solicitud medida; se instala como execute_wrapper de las conexiones."""
+
+    def __init__(self):
+        self.inicio = perf_counter()
+        self.total_ms = None
+        self.db_ms = 0.0
+        self.consultas = 0
+        self.plantillas_ms = 0.0
+        self.tramos = Counter()
+        self.huellas = Counter()
+        self.sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (perf_counter() - inicio) * 1000
+            self.consultas += 1
+            huella = huella_sql(sql)
+            self.huellas[huella] += 1
+            if huella not in self.sql:
+                self.sql[huella] = normalizar_sql(sql)[:500]
+
+    def terminar(self):
+        self.total_ms = (perf_counter() - self.inicio) * 1000
+
+    def duplicadas(self):
+        """{huella: veces} de las consultas ejecutadas más de una vez."""
+        return {huella: veces for huella, veces in self.huellas.items() if veces > 1}
+
+    def server_timing(self):
+        partes = [
+            f'total;dur={self.total_ms:.1f}',
+            f'db;dur={self.db_ms:.1f};desc="{self.consultas} consultas"',
+            f'plantillas;dur={self.plantillas_ms:.1f}',
+        ]
+        partes += [f'{_NOMBRE_TRAMO.sub("_", nombre)};dur={ms:.1f}' for nombre, ms in self.tramos.items()]
+        return ', '.join(partes)
+
+    def como_dict(self):
+        return {
+            'total_ms': round(self.total_ms, 2),
+            'db_ms': round(self.db_ms, 2),
+            'consultas': self.consultas,
+            'duplicadas': sum(self.duplicadas().values()),
+            'plantillas_ms': round(self.plantillas_ms, 2),
+            'tramos': {nombre: round(ms, 2) for nombre, ms in self.tramos.items()},
+        }
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medir(nombre):
+    """Suma el tiempo del bloque al tramo `nombre` de la solicitud medida (si la hay)."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = perf_counter()
+    try:
+        yield
+    finally:
+        medicion.tramos[nombre] += (perf_counter() - inicio) * 1000
+
+
+@contextmanager
+def activar(medicion):
+    token = _medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+
+
+# ==============================
+# TIEMPO DE RENDER DE PLANTILLAS
+# ==============================
+class PlantillaMedida:
+    """Envuelve la plantilla del backend y suma su render a la solicitud medida."""
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return self.plantilla.render(context, request)
+        inicio = perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            # Solo el render de nivel superior pasa por aquí: los {% include %} no se cuentan dos veces
+            medicion.plantillas_ms += (perf_counter() - inicio) * 1000
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    def from_string(self, template_code):
+        return PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name))
+
+
+# ==============================
+# ACUMULADO PARA EL PANEL DE RENDIMIENTO
+# ==============================
+def registrar(vista, medicion):
+    """Agrega la solicitud medida al acumulado por vista y de consultas repetidas."""
+    resumen = cache.get(CLAVE_RESUMEN) or {'desde': timezone.now(), 'vistas': {}, 'huellas': {}}
+
+    datos = resumen['vistas'].get(vista)
+    if datos is None:
+        if len(resumen['vistas']) >= MAX_VISTAS:
+            return
+        datos = resumen['vistas'][vista] = {'n': 0, 'suma_ms': 0.0, 'max_ms': 0.0, 'suma_db_ms': 0.0, 'suma_consultas': 0, 'recientes': []}
+    datos['n'] += 1
+    datos['suma_ms'] += medicion.total_ms
+    datos['max_ms'] = max(datos['max_ms'], medicion.total_ms)
+    datos['suma_db_ms'] += medicion.db_ms
+    datos['suma_consultas'] += medicion.consultas
+    datos['recientes'] = (datos['recientes'] + [medicion.total_ms])[-MAX_RECIENTES:]
+
+    for huella, veces in medicion.duplicadas().items():
+        repetida = resumen['huellas'].get(huella)
+        if repetida is None:
+            if len(resumen['huellas']) >= MAX_HUELLAS:
+                # Se descarta la huella menos repetida para dejar lugar a la nueva
+                menor = min(resumen['huellas'], key=lambda h: resumen['huellas'][h]['veces'])
+                if resumen['huellas'][menor]['veces'] >= veces:
+                    continue
+                del resumen['huellas'][menor]
+            repetida = resumen['huellas'][huella] = {'sql': medicion.sql[huella], 'veces': 0, 'solicitudes': 0, 'vistas': []}
+        repetida['veces'] += veces
+        repetida['solicitudes'] += 1
+        if vista not in repetida['vistas']:
+            repetida['vistas'].append(vista)
+
+    cache.set(CLAVE_RESUMEN, resumen, DURACION_RESUMEN)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] if ordenados else 0
+
+
+def resumen_medicion(limite=20):
+    """Vistas más lentas (por p95 de las muestras recientes) y consultas más repetidas."""
+    resumen = cache.get(CLAVE_RESUMEN)
+    if not resumen:
+        return {'desde': None, 'vistas': [], 'duplicadas': []}
+    vistas = [
+        {
+            'vista': vista,
+            'solicitudes': datos['n'],
+            'promedio_ms': datos['suma_ms'] / datos['n'],
+            'p95_ms': _percentil(datos['recientes'], 0.95),
+            'max_ms': datos['max_ms'],
+            'db_ms': datos['suma_db_ms'] / datos['n'],
+            'consultas': datos['suma_consultas'] / datos['n'],
+        }
+        for vista, datos in resumen['vistas'].items()
+    ]
+    vistas.sort(key=lambda v: v['p95_ms'], reverse=True)
+    duplicadas = sorted(
+        ({'huella': huella, **datos} for huella, datos in resumen['huellas'].items()),
+        key=lambda d: d['veces'], reverse=True,
+    )
+    return {'desde': resumen['desde'], 'vistas': vistas[:limite], 'duplicadas': duplicadas[:limite]}
+
+
+def reiniciar_medicion():
+    cache.delete(CLAVE_RESUMEN)
@@ -0,0 +1,92 @@
+import json  # Línea de log estructurada
+import logging
+import random  # Muestreo de solicitudes
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .medicion import Medicion, activar, registrar
+
+logger = logging.getLogger('core.medicion')
+
+
+# ==============================
+# MIDDLEWARE: Medición de solicitudes
+# ==============================
+class MedicionMiddleware:
+    """
+    Mide una muestra de las solicitudes (MEDICION_MUESTREO, 0.01 = 1 %): tiempo
+    total, tiempo y cantidad de consultas, consultas repetidas y render de
+    plantillas (ver medicion.py). Agrega la cabecera Server-Timing, escribe una
+    línea JSON en el logger 'core.medicion' y acumula los datos para el panel
+    de rendimiento. Con MEDICION_ACTIVA apagado Django lo quita de la cadena.
+    Va primero en MIDDLEWARE para incluir el tiempo del resto de middlewares.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MEDICION_ACTIVA:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = settings.MEDICION_MUESTREO
+        # Bajo ASGI la cadena sigue siendo async y no anula las vistas async
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Las solicitudes fuera de la muestra solo pagan esta comparación
+        if random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion = Medicion()
+        with activar(medicion), ExitStack() as conexiones:
+            self.instalar(conexiones, medicion)
+            response = self.get_response(request)
+        return self.informar(request, response, medicion)
+
+    async def __acall__(self, request):
+        if random.random() >= self.muestreo:
+            return await self.get_response(request)
+
+        # Las conexiones son propias de cada hilo: el wrapper se instala en el hilo
+        # donde sync_to_async (thread_sensitive) ejecuta las consultas de la solicitud.
+        # Las consultas en hilos propios (CONSULTAS_PARALELAS) no se cuentan
+        medicion = Medicion()
+        with activar(medicion), ExitStack() as conexiones:
+            await sync_to_async(self.instalar)(conexiones, medicion)
+            response = await self.get_response(request)
+        # registrar() escribe en la caché (Redis es E/S bloqueante)
+        return await sync_to_async(self.informar)(request, response, medicion)
+
+    @staticmethod
+    def instalar(conexiones, medicion):
+        for conexion in connections.all():
+            conexiones.enter_context(conexion.execute_wrapper(medicion))
+
+    def informar(self, request, response, medicion):
+        medicion.terminar()
+        vista = self.nombre_vista(request)
+        if settings.MEDICION_SERVER_TIMING:
+            response['Server-Timing'] = medicion.server_timing()
+        logger.info(json.dumps({
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': vista,
+            'estado': response.status_code,
+            **medicion.como_dict(),
+        }, ensure_ascii=False))
+        registrar(vista, medicion)
+        return response
+
+    @staticmethod
+    def nombre_vista(request):
+        match = getattr(request, 'resolver_match', None)
+        nombre = match.view_name if match else 'sin_ruta'
+        return f'{request.method} {nombre}'
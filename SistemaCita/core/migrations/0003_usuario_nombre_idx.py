@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0002_alter_usuario_password_alter_usuario_username'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['first_name', 'last_name', 'id'], name='usuario_nombre_idx'),
+        ),
+    ]
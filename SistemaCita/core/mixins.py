@@ -1,6 +1,18 @@
+import json  # Para serializar los cursores de paginación
+from base64 import urlsafe_b64decode, urlsafe_b64encode  # Cursores seguros para URL
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
 from django.contrib.auth.mixins import LoginRequiredMixin  # Para proteger vistas de clases
+from django.core.exceptions import ValidationError  # Error al convertir valores de un cursor
+from django.db import IntegrityError, transaction  # Reserva atómica de turnos
+from django.db.models import Q  # Condiciones de la paginación por cursor
 from django.shortcuts import redirect  # Para redirigir usuarios no autorizados
 
+from gestion_citas.disponibilidad import verificar_disponibilidad  # Control de turnos
+from gestion_citas.models import Cita, Medico
+
 
 # ==============================
 # Mixin para restringir vistas por rol
@@ -26,4 +38,147 @@ class RolRequiredMixin(LoginRequiredMixin):
             return redirect('home')  # Redirige si el rol del usuario no está en la lista
 
         # 🔹 Si pasa todas las verificaciones, continua con la vista
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        return super().dispatch(request, *args, **kwargs)
+
+
+# ==============================
+# Mixin para reservar turnos sin choques
+# ==============================
+class ReservaCitaMixin:
+    """
+    Guarda la cita dentro de una transacción que bloquea la fila del médico, de
+    modo que dos pacientes que reservan al mismo médico a la vez se serializan y
+    el segundo ve el turno ocupado. La restricción única de Cita cubre lo que
+    escape al bloqueo (por ejemplo, motores sin SELECT ... FOR UPDATE).
+    """
+
+    def form_valid(self, form):
+        cita = form.instance
+        try:
+            with transaction.atomic():
+                list(Medico.objects.select_for_update().filter(pk=cita.medico_id).values_list('pk'))
+                # Se vuelve a verificar con el bloqueo tomado: otra reserva pudo entrar tras validar el formulario
+                if form.cleaned_data.get('estado') != Cita.CANCELADA:
+                    verificar_disponibilidad(cita.medico, cita.fecha_hora, excluir=cita.pk)
+                return super().form_valid(form)
+        except ValidationError as e:
+            form.add_error('fecha_hora', e)
+        except IntegrityError:
+            form.add_error('fecha_hora', "Ese turno acaba de ser reservado. Elige otro horario.")
+        return self.form_invalid(form)
+
+# ==============================
+# Paginación por cursor (keyset)
+# ==============================
+class PaginaKeyset:
+    """Página de resultados obtenida por cursor; expone la misma interfaz básica que Page."""
+
+    def __init__(self, object_list, cursor_anterior=None, cursor_siguiente=None):
+        self.object_list = object_list
+        self.cursor_anterior = cursor_anterior    # Cursor para pedir la página previa (?antes=)
+        self.cursor_siguiente = cursor_siguiente  # Cursor para pedir la página siguiente (?despues=)
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _serializar_valor(valor):
+    # isoformat conserva los microsegundos (DjangoJSONEncoder los recorta y rompería la comparación)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (Decimal, UUID)):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable en el cursor: {type(valor).__name__}")
+
+
+class PaginacionKeysetMixin:
+    """
+    Reemplaza la paginación por OFFSET de ListView por paginación por cursor:
+    cada página se pide con ?despues=<cursor> o ?antes=<cursor> y se resuelve con
+    un WHERE sobre las columnas de orden, de modo que las páginas profundas
+    cuestan lo mismo que la primera.
+    """
+    paginate_by = 20       # Tamaño de página; cada vista puede cambiarlo
+    orden_keyset = ()      # Columnas de orden, ej. ('-fecha_hora', '-id_cita'); la última debe ser única
+
+    def get_ordering(self):
+        return self.orden_keyset
+
+    def _campos_keyset(self):
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in self.orden_keyset]
+
+    def _campo_modelo(self, ruta):
+        # Resuelve 'usuario__first_name' o 'pk' al campo del modelo para convertir el valor del cursor
+        modelo, campo = self.model, None
+        for parte in ruta.split('__'):
+            campo = modelo._meta.pk if parte == 'pk' else modelo._meta.get_field(parte)
+            modelo = campo.related_model or modelo
+        return campo
+
+    def _codificar_cursor(self, obj):
+        valores = []
+        for ruta, _ in self._campos_keyset():
+            valor = obj
+            for parte in ruta.split('__'):
+                valor = getattr(valor, parte)
+            valores.append(valor)
+        datos = json.dumps(valores, default=_serializar_valor).encode()
+        return urlsafe_b64encode(datos).decode().rstrip('=')
+
+    def _decodificar_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            valores = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            campos = self._campos_keyset()
+            if not isinstance(valores, list) or len(valores) != len(campos):
+                return None
+            return [self._campo_modelo(ruta).to_python(valor) for (ruta, _), valor in zip(campos, valores)]
+        except (ValueError, TypeError, ValidationError):
+            return None  # Un cursor inválido se trata como la primera página
+
+    def _condicion_keyset(self, valores, hacia_atras=False):
+        # (a > x) OR (a = x AND b > y) ..., invirtiendo el operador en columnas descendentes
+        condicion, igualdad = Q(), Q()
+        for (ruta, descendente), valor in zip(self._campos_keyset(), valores):
+            operador = 'lt' if descendente != hacia_atras else 'gt'
+            condicion |= igualdad & Q(**{f'{ruta}__{operador}': valor})
+            igualdad &= Q(**{ruta: valor})
+        return condicion
+
+    def paginate_queryset(self, queryset, page_size):
+        despues = self._decodificar_cursor(self.request.GET.get('despues'))
+        antes = self._decodificar_cursor(self.request.GET.get('antes'))
+
+        if antes is not None:
+            # Página previa: se recorre en orden inverso y se da vuelta el resultado
+            orden_inverso = [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in self.orden_keyset]
+            filas = list(queryset.filter(self._condicion_keyset(antes, hacia_atras=True)).order_by(*orden_inverso)[:page_size + 1])
+            hay_mas = len(filas) > page_size
+            filas = filas[:page_size][::-1]
+            cursor_anterior = self._codificar_cursor(filas[0]) if hay_mas else None
+            cursor_siguiente = self._codificar_cursor(filas[-1]) if filas else None
+        else:
+            if despues is not None:
+                queryset = queryset.filter(self._condicion_keyset(despues))
+            filas = list(queryset.order_by(*self.orden_keyset)[:page_size + 1])
+            hay_mas = len(filas) > page_size
+            filas = filas[:page_size]
+            cursor_anterior = self._codificar_cursor(filas[0]) if despues is not None and filas else None
+            cursor_siguiente = self._codificar_cursor(filas[-1]) if hay_mas else None
+
+        pagina = PaginaKeyset(filas, cursor_anterior, cursor_siguiente)
+        # Misma tupla que MultipleObjectMixin: (paginator, page, object_list, is_paginated)
+        return (None, pagina, filas, pagina.has_other_pages())
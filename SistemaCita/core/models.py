@@ -20,6 +20,12 @@ class Usuario(AbstractUser):
         default='paciente'  # Rol por defecto al crear un usuario
     )
 
+    class Meta(AbstractUser.Meta):
+        # 🔹 Índice para ordenar y paginar listados de personas por nombre
+        indexes = [
+            models.Index(fields=['first_name', 'last_name', 'id'], name='usuario_nombre_idx'),
+        ]
+
     # 🔹 Representación en texto del objeto
     def __str__(self):
         # Muestra username y rol en formato legible
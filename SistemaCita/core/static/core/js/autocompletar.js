@@ -0,0 +1,68 @@
+// Autocompletado para los <select data-autocompletar="url"> (widget AutocompletarSelect).
+// El select llega solo con la opción elegida; al escribir en el buscador se piden
+// sugerencias al servidor y se reemplazan las opciones con los resultados.
+(function () {
+    'use strict';
+
+    const ESPERA_MS = 250;
+    const MIN_CARACTERES = 2;
+
+    function opcion(valor, texto, elegida) {
+        const op = document.createElement('option');
+        op.value = valor;
+        op.textContent = texto;
+        op.selected = elegida;
+        return op;
+    }
+
+    function iniciar(select) {
+        const buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control mb-2';
+        buscador.placeholder = `Escribe al menos ${MIN_CARACTERES} letras para buscar...`;
+        buscador.setAttribute('autocomplete', 'off');
+        select.parentNode.insertBefore(buscador, select);
+
+        let temporizador = null;
+        let peticion = null;
+
+        function mostrar(resultados) {
+            const elegida = select.selectedOptions[0];
+            const valor = select.value;
+            select.innerHTML = '';
+            select.appendChild(opcion('', resultados.length ? '-- Selecciona un resultado --' : 'Sin resultados', !valor));
+            // La opción ya elegida se conserva aunque no esté entre los resultados
+            if (valor && !resultados.some(r => String(r.id) === valor)) {
+                select.appendChild(opcion(valor, elegida.textContent, true));
+            }
+            resultados.forEach(r => select.appendChild(opcion(r.id, r.texto, String(r.id) === valor)));
+            select.size = Math.min(resultados.length + 1, 8);
+        }
+
+        function buscar() {
+            const consulta = buscador.value.trim();
+            if (consulta.length < MIN_CARACTERES) return;
+            if (peticion) peticion.abort();
+            peticion = new AbortController();
+            fetch(`${select.dataset.autocompletar}?q=${encodeURIComponent(consulta)}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                signal: peticion.signal
+            })
+            .then(response => response.json())
+            .then(data => mostrar(data.resultados || []))
+            .catch(err => { if (err.name !== 'AbortError') console.error('Error de conexión:', err); });
+        }
+
+        buscador.addEventListener('input', function () {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(buscar, ESPERA_MS);
+        });
+
+        // Al elegir un resultado la lista vuelve a su tamaño normal
+        select.addEventListener('change', function () { select.size = 1; });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();
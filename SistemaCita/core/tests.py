@@ -1,3 +1,891 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import sys
+from datetime import datetime, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock, skipUnless
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion_citas.directorio import version_directorio
+from gestion_citas.disponibilidad import problemas_turnos
+from gestion_citas.models import Paciente, Medico, Cita, Especialidad, HorarioMedico, SerieCita, TerminoBusqueda
+from gestion_citas.series import cancelar_serie, fechas_serie, modificar_serie
+from . import views_async
+from .decorators import cache_por_rol
+from .middleware import MedicionMiddleware
+from .medicion import Medicion, activar, medicion_actual, medir, registrar, resumen_medicion
+from .models import Usuario
+
+
+# ==============================
+# AGENDA DEL MÉDICO
+# ==============================
+class AgendaMedicoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario_medico = Usuario.objects.create(username='medico1', rol='medico', first_name='Ana')
+        usuario_paciente = Usuario.objects.create(username='paciente1', rol='paciente', first_name='Luis')
+        cls.medico = Medico.objects.create(usuario=cls.usuario_medico, matricula='M-0001', telefono='7777-7777')
+        cls.paciente = Paciente.objects.create(usuario=usuario_paciente, telefono='7777-7777', direccion='Calle 1')
+        cls.hoy = timezone.localdate()
+        # Una cita por día durante los últimos 90 días y los próximos 10
+        Cita.objects.bulk_create([
+            Cita(
+                medico=cls.medico,
+                paciente=cls.paciente,
+                motivo='Control',
+                fecha_hora=timezone.make_aware(datetime.combine(cls.hoy + timedelta(days=i), time(9, 0))),
+            )
+            for i in range(-90, 10)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.usuario_medico)
+
+    def test_vista_dia_solo_carga_hoy(self):
+        response = self.client.get(reverse('medico_agenda'), {'vista': 'dia'})
+        self.assertEqual(response.status_code, 200)
+        dias = response.context['dias_ordenados']
+        self.assertEqual([dia for dia, _ in dias], [self.hoy])
+        self.assertTrue(response.context['hay_anteriores'])
+
+    def test_rango_explicito(self):
+        desde = self.hoy - timedelta(days=30)
+        hasta = self.hoy - timedelta(days=24)
+        response = self.client.get(reverse('medico_agenda'), {'desde': desde.isoformat(), 'hasta': hasta.isoformat()})
+        dias = response.context['dias_ordenados']
+        self.assertEqual(len(dias), 7)
+        self.assertEqual(dias[0][0], desde)
+        self.assertEqual(response.context['anterior_hasta'], desde - timedelta(days=1))
+
+    def test_rango_limitado(self):
+        # Un rango de años se recorta a la ventana máxima
+        desde = self.hoy - timedelta(days=3650)
+        response = self.client.get(reverse('medico_agenda'), {'desde': desde.isoformat(), 'hasta': self.hoy.isoformat()})
+        self.assertEqual((response.context['hasta'] - response.context['desde']).days + 1, 62)
+
+    def test_tarjetas_cacheadas_hasta_que_cambia_la_agenda(self):
+        cache.clear()
+        Medico.objects.filter(pk=self.medico.pk).update(agenda_actualizada=timezone.now())
+        self.assertContains(self.client.get(reverse('medico_agenda')), 'Luis')
+        # Sin pasar por las señales la agenda no cambia: se reutiliza el fragmento
+        Usuario.objects.filter(username='paciente1').update(first_name='Pedro')
+        self.assertContains(self.client.get(reverse('medico_agenda')), 'Luis')
+        # Una cita nueva marca la agenda y las tarjetas se vuelven a renderizar
+        Cita.objects.create(
+            medico=self.medico,
+            paciente=self.paciente,
+            motivo='Control',
+            fecha_hora=timezone.make_aware(datetime.combine(self.hoy, time(15, 0))),
+        )
+        response = self.client.get(reverse('medico_agenda'))
+        self.assertContains(response, 'Pedro')
+        self.assertNotContains(response, 'Luis')
+
+    def test_carga_parcial(self):
+        response = self.client.get(reverse('medico_agenda'), {'vista': 'semana', 'parcial': 1})
+        self.assertTemplateUsed(response, 'medico/agenda_dias.html')
+        self.assertTemplateNotUsed(response, 'medico/agenda_medico.html')
+
+
+# ==============================
+# CONSULTAS POR VISTA (REGRESIÓN N+1)
+# ==============================
+def crear_datos(n_medicos, n_pacientes, citas_por_paciente):
+    """Crea médicos con especialidades, pacientes y citas distribuidas entre ellos."""
+    especialidades = [Especialidad.objects.create(nombre=f'Especialidad {i}') for i in range(3)]
+    medicos = []
+    for i in range(n_medicos):
+        usuario = Usuario.objects.create(username=f'medico{i}', rol='medico', first_name=f'Medico{i}')
+        medico = Medico.objects.create(usuario=usuario, matricula=f'M-{i:04d}', telefono='7777-7777')
+        medico.especialidades.set(especialidades[:1 + i % 3])
+        medicos.append(medico)
+    pacientes = []
+    for i in range(n_pacientes):
+        usuario = Usuario.objects.create(username=f'paciente{i}', rol='paciente', first_name=f'Paciente{i}')
+        pacientes.append(Paciente.objects.create(usuario=usuario, telefono='7777-7777', direccion='Calle 1'))
+    ahora = timezone.now()
+    Cita.objects.bulk_create([
+        Cita(
+            medico=medicos[(i + j) % n_medicos],
+            paciente=paciente,
+            motivo='Control',
+            fecha_hora=ahora + timedelta(hours=i * citas_por_paciente + j),
+        )
+        for i, paciente in enumerate(pacientes)
+        for j in range(citas_por_paciente)
+    ])
+    return medicos, pacientes
+
+
+class ConsultasPorVistaTests(TestCase):
+    # El número de consultas no debe depender de cuántas citas se muestran
+    # (1 consulta fija del usuario, la sesión sale de la caché, + las de cada vista)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=5, n_pacientes=20, citas_por_paciente=3)
+
+    def test_agenda_medico(self):
+        self.client.force_login(self.medicos[0].usuario)
+        hoy = timezone.localdate()
+        url = reverse('medico_agenda')
+        # Médico, citas de la ventana y existencia de días anteriores
+        with self.assertNumQueries(4):
+            self.client.get(url, {'desde': (hoy - timedelta(days=1)).isoformat(), 'hasta': (hoy + timedelta(days=7)).isoformat()})
+
+    def test_citas_paciente(self):
+        self.client.force_login(self.pacientes[0].usuario)
+        # Citas con médico y usuario + especialidades precargadas
+        with self.assertNumQueries(3):
+            self.client.get(reverse('paciente_cita_list'))
+
+    def test_pacientes_medico(self):
+        self.client.force_login(self.medicos[0].usuario)
+        # Médico del usuario y pacientes con su usuario
+        with self.assertNumQueries(3):
+            self.client.get(reverse('pacientes_medico'))
+
+
+# ==============================
+# JSON DE TURNOS LIBRES
+# ==============================
+class TurnosMedicoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medico = Medico.objects.create(
+            usuario=Usuario.objects.create(username='medico1', rol='medico'),
+            matricula='M-0001',
+            telefono='7777-7777',
+        )
+        cls.paciente = Paciente.objects.create(
+            usuario=Usuario.objects.create(username='paciente1', rol='paciente'),
+            telefono='7777-7777',
+            direccion='Calle 1',
+        )
+        hoy = timezone.localdate()
+        cls.lunes = hoy + timedelta(days=7 - hoy.weekday())
+        HorarioMedico.objects.create(medico=cls.medico, dia_semana=0, hora_inicio=time(9, 0), hora_fin=time(10, 0))
+
+    def setUp(self):
+        self.client.force_login(self.paciente.usuario)
+        self.url = reverse('turnos_medico', args=[self.medico.pk])
+
+    def test_devuelve_turnos_de_la_semana(self):
+        response = self.client.get(self.url, {'semana': self.lunes.isoformat()})
+        data = response.json()
+        self.assertTrue(data['con_horario'])
+        self.assertEqual([t['hora'] for t in data['turnos']], ['09:00', '09:30'])
+        self.assertEqual(data['turnos'][0]['valor'], f'{self.lunes.isoformat()}T09:00')
+        self.assertIn('ETag', response)
+        # Sin Last-Modified: la fecha de la agenda no refleja los turnos que ya pasaron
+        self.assertNotIn('Last-Modified', response)
+        # Se revalida en cada pedido: un turno recién reservado no se sigue ofreciendo
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_etag_responde_304_hasta_que_cambia_la_agenda(self):
+        params = {'semana': self.lunes.isoformat()}
+        etag = self.client.get(self.url, params)['ETag']
+        self.assertEqual(self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Cita.objects.create(
+            medico=self.medico,
+            paciente=self.paciente,
+            motivo='Control',
+            fecha_hora=timezone.make_aware(datetime.combine(self.lunes, time(9, 0))),
+        )
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['hora'] for t in response.json()['turnos']], ['09:30'])
+
+    def test_etag_cambia_al_pasar_un_turno_de_hoy(self):
+        hoy = timezone.localdate()
+        HorarioMedico.objects.create(medico=self.medico, dia_semana=hoy.weekday(), hora_inicio=time(14, 0), hora_fin=time(15, 0))
+        params = {'semana': hoy.isoformat()}
+        antes = timezone.make_aware(datetime.combine(hoy, time(13, 59, 30)))
+        with mock.patch('django.utils.timezone.now', return_value=antes):
+            response = self.client.get(self.url, params)
+            self.assertIn('14:00', [t['hora'] for t in response.json()['turnos']])
+            etag = response['ETag']
+            self.assertEqual(self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('django.utils.timezone.now', return_value=antes + timedelta(minutes=1)):
+            response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('14:00', [t['hora'] for t in response.json()['turnos']])
+
+    def test_medico_inexistente(self):
+        self.assertEqual(self.client.get(reverse('turnos_medico', args=[999999])).status_code, 404)
+
+
+# ==============================
+# ARRANQUE SIN CONSULTAS
+# ==============================
+class ArranqueTests(TestCase):
+
+    def test_ready_no_consulta_la_base(self):
+        with self.assertNumQueries(0):
+            apps.get_app_config('core').ready()
+
+    def test_crear_admin_es_idempotente(self):
+        # El admin ya se creó con post_migrate al preparar la base de tests
+        salida = StringIO()
+        call_command('crear_admin', stdout=salida)
+        call_command('crear_admin', stdout=salida)
+        self.assertEqual(Usuario.objects.filter(username='admin', rol='admin').count(), 1)
+        self.assertEqual(Group.objects.filter(name__in=['Administrador', 'Medico', 'Paciente']).count(), 3)
+        self.assertIn('ya existe', salida.getvalue())
+
+
+def cargar_perfil(nombre, **entorno):
+    """Importa de nuevo base.py y el perfil `nombre` con `entorno`, sin tocar los settings cargados."""
+    with mock.patch.dict(os.environ, entorno), mock.patch.dict(sys.modules):
+        for variable in ('VISTAS_ASYNC', 'DB_CONN_MAX_AGE'):
+            os.environ.pop(variable, None)
+        for modulo in ('SistemaCitas.settings.base', f'SistemaCitas.settings.{nombre}'):
+            sys.modules.pop(modulo, None)
+        return importlib.import_module(f'SistemaCitas.settings.{nombre}')
+
+
+class ConexionesTests(TestCase):
+
+    def test_produccion_conexiones_persistentes(self):
+        prod = cargar_perfil(
+            'prod', DJANGO_SECRET_KEY='clave-de-prueba', DJANGO_ALLOWED_HOSTS='citas.ejemplo.com',
+        )
+        self.assertGreater(prod.DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertIs(prod.DATABASES['default']['CONN_HEALTH_CHECKS'], True)
+
+    def test_tests_sin_conexiones_persistentes(self):
+        self.assertEqual(cargar_perfil('test').DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+
+
+# ==============================
+# PANEL DE ADMINISTRACIÓN
+# ==============================
+class PanelAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=2, n_pacientes=3, citas_por_paciente=0)
+        cls.admin = Usuario.objects.create(username='admin1', rol='admin')
+        hoy = timezone.localdate()
+        a_las = lambda dia, hora: timezone.make_aware(datetime.combine(dia, time(hora, 0)))
+        medico_a, medico_b = cls.medicos
+        for medico, fecha_hora, estado in [
+            (medico_a, a_las(hoy, 8), Cita.PENDIENTE),
+            (medico_a, a_las(hoy, 9), Cita.CANCELADA),
+            (medico_b, a_las(hoy, 10), Cita.CONFIRMADA),
+            (medico_b, a_las(hoy - timedelta(days=10), 10), Cita.PENDIENTE),
+        ]:
+            Cita.objects.create(medico=medico, paciente=cls.pacientes[0], motivo='Control', fecha_hora=fecha_hora, estado=estado)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_contadores(self):
+        resumen = self.client.get(reverse('admin_dashboard')).context['resumen']
+        self.assertEqual(resumen['citas_hoy'], 3)
+        self.assertEqual(resumen['citas_hoy_por_estado'], [('Pendiente', 1), ('Confirmada', 1), ('Cancelada', 1)])
+        # La cita cancelada no suma carga
+        self.assertEqual(resumen['carga_semana'], [{'medico': 'Medico0', 'citas': 1}, {'medico': 'Medico1', 'citas': 1}])
+        self.assertEqual(resumen['pacientes_nuevos'], 3)
+        self.assertEqual(resumen['citas_recientes'], 4)
+        self.assertEqual(resumen['tasa_cancelacion'], 25.0)
+
+    def test_usa_cache_hasta_que_cambia_una_cita(self):
+        url = reverse('admin_dashboard')
+        # Usuario, consulta agrupada de citas y conteo de pacientes
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        Cita.objects.create(
+            medico=self.medicos[0],
+            paciente=self.pacientes[1],
+            motivo='Control',
+            fecha_hora=timezone.make_aware(datetime.combine(timezone.localdate(), time(11, 0))),
+        )
+        with self.assertNumQueries(3):
+            resumen = self.client.get(url).context['resumen']
+        self.assertEqual(resumen['citas_hoy'], 4)
+
+
+# ==============================
+# CAMBIOS DE ESTADO EN LOTE
+# ==============================
+class ActualizarEstadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=2, n_pacientes=20, citas_por_paciente=2)
+        cls.propias = list(Cita.objects.filter(medico=cls.medicos[0]).order_by('pk'))
+        cls.ajena = Cita.objects.filter(medico=cls.medicos[1]).first()
+
+    def setUp(self):
+        self.client.force_login(self.medicos[0].usuario)
+        self.url = reverse('medico-actualizar-estados')
+
+    def enviar(self, cambios):
+        return self.client.post(self.url, {'cambios': cambios}, content_type='application/json')
+
+    def test_lote_en_consultas_constantes(self):
+        cambios = [{'cita_id': cita.pk, 'estado': Cita.COMPLETADA} for cita in self.propias]
+        self.assertEqual(len(cambios), 20)
+        # Usuario, médico, citas del lote, UPDATE de estados y versión de la agenda (+ savepoints)
+        with CaptureQueriesContext(connection) as consultas:
+            data = self.enviar(cambios).json()
+        sql = [q['sql'] for q in consultas.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(sql), 5)
+        self.assertEqual(sum(s.startswith('UPDATE "gestion_citas_cita"') for s in sql), 1)
+        self.assertTrue(data['ok'])
+        self.assertEqual(Cita.objects.filter(medico=self.medicos[0], estado=Cita.COMPLETADA).count(), 20)
+        self.assertIsNotNone(Medico.objects.get(pk=self.medicos[0].pk).agenda_actualizada)
+
+    def test_resultados_por_cambio(self):
+        data = self.enviar([
+            {'cita_id': self.propias[0].pk, 'estado': 'Confirmada'},  # También se acepta el nombre
+            {'cita_id': self.ajena.pk, 'estado': Cita.CONFIRMADA},
+            {'cita_id': self.propias[1].pk, 'estado': 'Perdida'},
+        ]).json()
+        self.assertFalse(data['ok'])
+        self.assertEqual([r['ok'] for r in data['resultados']], [True, False, False])
+        self.assertEqual(Cita.objects.get(pk=self.propias[0].pk).estado, Cita.CONFIRMADA)
+        self.assertEqual(Cita.objects.get(pk=self.ajena.pk).estado, Cita.PENDIENTE)
+
+    def test_reactivar_turno_ocupado(self):
+        cancelada = self.propias[0]
+        Cita.objects.filter(pk=cancelada.pk).update(estado=Cita.CANCELADA)
+        Cita.objects.create(medico=self.medicos[0], paciente=self.pacientes[5], motivo='Control', fecha_hora=cancelada.fecha_hora)
+        data = self.enviar([{'cita_id': cancelada.pk, 'estado': Cita.PENDIENTE}]).json()
+        self.assertEqual(data['resultados'][0]['error'], 'El turno ya está ocupado por otra cita')
+        self.assertEqual(Cita.objects.get(pk=cancelada.pk).estado, Cita.CANCELADA)
+
+    def test_datos_invalidos(self):
+        self.assertEqual(self.client.post(self.url, 'no es json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.enviar([]).status_code, 400)
+
+
+# ==============================
+# MÁQUINA DE ESTADOS DE LA CITA
+# ==============================
+class EstadoCitaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=1, n_pacientes=1, citas_por_paciente=1)
+        cls.cita = Cita.objects.get()
+
+    def setUp(self):
+        self.client.force_login(self.medicos[0].usuario)
+        self.url = reverse('medico-actualizar-estado')
+
+    def test_transicion_valida(self):
+        response = self.client.post(self.url, {'cita_id': self.cita.pk, 'estado': Cita.CONFIRMADA})
+        self.assertEqual(response.json()['etiqueta'], 'Confirmada')
+        self.assertEqual(Cita.objects.get(pk=self.cita.pk).estado, Cita.CONFIRMADA)
+
+    def test_transicion_invalida_sin_consultas_extra(self):
+        Cita.objects.filter(pk=self.cita.pk).update(estado=Cita.COMPLETADA)
+        # Usuario y la cita del médico
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {'cita_id': self.cita.pk, 'estado': 'pendiente'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Cita.objects.get(pk=self.cita.pk).estado, Cita.COMPLETADA)
+
+    def test_transicion_invalida_en_lote(self):
+        Cita.objects.filter(pk=self.cita.pk).update(estado=Cita.CANCELADA)
+        response = self.client.post(
+            reverse('medico-actualizar-estados'),
+            {'cambios': [{'cita_id': self.cita.pk, 'estado': Cita.COMPLETADA}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['resultados'][0]['error'], 'Una cita cancelada no puede pasar a completada')
+
+    def test_filtro_por_estado_usa_indice(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('El plan se verifica con SQLite')
+        plan = Cita.objects.filter(estado=Cita.PENDIENTE, fecha_hora__gte=timezone.now()).explain()
+        self.assertIn('cita_estado_fecha_idx', plan)
+
+
+# ==============================
+# CACHÉ POR ROL Y SESIONES
+# ==============================
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class CachePorRolTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=3, n_pacientes=2, citas_por_paciente=0)
+        cls.admin = Usuario.objects.create(username='admin1', rol='admin')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roles_no_comparten_respuesta(self):
+        @cache_por_rol(60, por_usuario=False)
+        def vista(request):
+            vista.llamadas += 1
+            return HttpResponse(request.user.rol)
+        vista.llamadas = 0
+
+        factory = RequestFactory()
+        for usuario in [self.admin, self.medicos[0].usuario, self.pacientes[0].usuario, self.pacientes[1].usuario]:
+            request = factory.get('/pagina/')
+            request.user = usuario
+            response = vista(request)
+            self.assertEqual(response.content.decode(), usuario.rol)
+            self.assertIn('private', response['Cache-Control'])
+        # Los dos pacientes comparten la entrada de su rol
+        self.assertEqual(vista.llamadas, 3)
+
+    def test_respuesta_con_token_csrf_se_guarda_por_sesion(self):
+        @cache_por_rol(60, por_usuario=False)
+        def vista(request):
+            return HttpResponse(get_token(request))
+
+        factory = RequestFactory()
+        tokens = []
+        for cookie in ['sessionid=a', 'sessionid=b', 'sessionid=a']:
+            request = factory.get('/pagina/', HTTP_COOKIE=cookie)
+            request.user = self.pacientes[0].usuario
+            tokens.append(vista(request).content)
+        self.assertNotEqual(tokens[0], tokens[1])
+        self.assertEqual(tokens[0], tokens[2])
+
+    def test_perfil_no_se_cachea(self):
+        # La página lleva el formulario de cerrar sesión con su token CSRF: se genera en cada visita
+        url = reverse('paciente_perfil')
+        self.client.force_login(self.pacientes[0].usuario)
+        self.client.get(url)
+        Paciente.objects.filter(pk=self.pacientes[0].pk).update(telefono='2222-3333')
+        self.assertContains(self.client.get(url), '2222-3333')
+        self.assertNotIn('max-age', self.client.get(url).get('Cache-Control', ''))
+
+    def test_sesion_se_lee_de_la_cache(self):
+        self.client.force_login(self.pacientes[0].usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('paciente_perfil'))
+        self.assertFalse([q for q in consultas.captured_queries if 'django_session' in q['sql']])
+
+    @skipUnless(fakeredis, "Requiere fakeredis como servidor Redis local de prueba")
+    def test_backend_redis(self):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        }}
+        with override_settings(CACHES=caches):
+            from django.core.cache import caches as conexiones
+            conexiones['default'].set('clave', {'valor': 1})
+            self.assertEqual(conexiones['default'].get('clave'), {'valor': 1})
+
+
+# ==============================
+# PLANTILLAS DE LOS PANELES
+# ==============================
+class PlantillasPanelTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=2, n_pacientes=2, citas_por_paciente=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paginas_extienden_el_panel(self):
+        paginas = [
+            (self.medicos[0].usuario, 'medico_agenda', 'medico/base_medico.html'),
+            (self.medicos[0].usuario, 'pacientes_medico', 'medico/base_medico.html'),
+            (self.medicos[0].usuario, 'medico_perfil', 'medico/base_medico.html'),
+            (self.pacientes[0].usuario, 'paciente_cita_list', 'paciente/base_paciente.html'),
+            (self.pacientes[0].usuario, 'paciente_cita_create', 'paciente/base_paciente.html'),
+            (self.pacientes[0].usuario, 'medicos_paciente', 'paciente/base_paciente.html'),
+            (self.pacientes[0].usuario, 'paciente_perfil', 'paciente/base_paciente.html'),
+        ]
+        for usuario, nombre, base in paginas:
+            with self.subTest(nombre):
+                self.client.force_login(usuario)
+                response = self.client.get(reverse(nombre))
+                self.assertTemplateUsed(response, base)
+                self.assertTemplateUsed(response, 'core/base_panel.html')
+                self.assertContains(response, 'Cerrar Sesión', count=1)
+
+    def test_enlace_activo_por_pagina(self):
+        # Los enlaces de la barra se cachean por página: cada una marca el suyo
+        self.client.force_login(self.medicos[0].usuario)
+        agenda = self.client.get(reverse('medico_agenda')).content.decode()
+        perfil = self.client.get(reverse('medico_perfil')).content.decode()
+        self.assertIn(f'active" href="{reverse("medico_agenda")}"', agenda)
+        self.assertNotIn(f'active" href="{reverse("medico_perfil")}"', agenda)
+        self.assertIn(f'active" href="{reverse("medico_perfil")}"', perfil)
+
+
+# ==============================
+# DIRECTORIO DE MÉDICOS
+# ==============================
+class DirectorioMedicosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=3, n_pacientes=1, citas_por_paciente=0)
+        cls.especialidades = list(Especialidad.objects.order_by('pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.pacientes[0].usuario)
+
+    def test_html_sin_consultas_con_fragmento_cacheado(self):
+        url = reverse('medicos_paciente')
+        self.assertContains(self.client.get(url), 'Medico2')
+        # Solo el usuario de la sesión
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_filtro_por_especialidad_desde_el_indice(self):
+        # Especialidad 1 la tienen los médicos 1 y 2 (ver crear_datos)
+        self.client.get(reverse('medicos_paciente_json'))
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('medicos_paciente_json'), {'especialidad': self.especialidades[1].pk}).json()
+        self.assertEqual({m['id'] for m in data['medicos']}, {self.medicos[1].pk, self.medicos[2].pk})
+        html = self.client.get(reverse('medicos_paciente'), {'especialidad': self.especialidades[2].pk})
+        self.assertContains(html, 'Medico2')
+        self.assertNotContains(html, 'Medico1')
+
+    def test_json_responde_304_sin_cambios(self):
+        response = self.client.get(reverse('medicos_paciente_json'))
+        response = self.client.get(reverse('medicos_paciente_json'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_senales_invalidan_el_directorio(self):
+        url = reverse('medicos_paciente_json')
+        version = version_directorio()
+        # Datos del paciente: el directorio no cambia
+        paciente = self.pacientes[0].usuario
+        paciente.first_name = 'Otro'
+        paciente.save()
+        self.assertEqual(version_directorio(), version)
+
+        usuario = self.medicos[0].usuario
+        usuario.first_name = 'Renombrado'
+        usuario.save()
+        self.assertIn('Renombrado', [m['nombre'] for m in self.client.get(url).json()['medicos']])
+
+        self.medicos[0].especialidades.add(self.especialidades[2])
+        data = self.client.get(url, {'especialidad': self.especialidades[2].pk}).json()
+        self.assertIn(self.medicos[0].pk, [m['id'] for m in data['medicos']])
+
+        self.especialidades[2].delete()
+        data = self.client.get(url).json()
+        self.assertNotIn('Especialidad 2', [e['nombre'] for e in data['especialidades']])
+
+
+# ==============================
+# VISTAS ASYNC (ASGI)
+# ==============================
+def pedir_async(vista, usuario, metodo='get', *args, **kwargs):
+    """Ejecuta una vista async como lo haría el servidor ASGI, con el usuario ya autenticado."""
+    request = getattr(AsyncRequestFactory(), metodo)(*args, **kwargs)
+
+    async def auser():
+        return usuario
+
+    request.user, request.auser = usuario, auser
+    request.session = SessionStore()
+    request._messages = FallbackStorage(request)
+    return async_to_sync(vista)(request)
+
+
+class VistasAsyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=2, n_pacientes=6, citas_por_paciente=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_agenda_igual_que_la_sync(self):
+        usuario = self.medicos[0].usuario
+        parametros = {'vista': 'semana', 'parcial': 1}
+        self.client.force_login(usuario)
+        sync = self.client.get(reverse('medico_agenda'), parametros).content.decode()
+        # Médico, citas de la ventana y existencia de días anteriores
+        with self.assertNumQueries(3):
+            response = pedir_async(views_async.agenda_medico, usuario, 'get', '/medico/agenda/', parametros)
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        for paciente in self.pacientes:
+            self.assertEqual(html.count(paciente.usuario.first_name), sync.count(paciente.usuario.first_name))
+
+    def test_rol_incorrecto_redirige(self):
+        response = pedir_async(views_async.agenda_medico, self.pacientes[0].usuario, 'get', '/medico/agenda/')
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    def test_citas_paciente(self):
+        # Citas con médico y usuario + especialidades precargadas
+        with self.assertNumQueries(2):
+            response = pedir_async(views_async.paciente_cita_list, self.pacientes[0].usuario, 'get', '/paciente/citas/')
+        self.assertContains(response, 'Medico1')
+
+    def test_directorio(self):
+        self.assertContains(pedir_async(views_async.medicos_paciente, self.pacientes[0].usuario, 'get', '/medicos/'), 'Medico1')
+
+    def test_actualizar_estado(self):
+        cita = Cita.objects.filter(medico=self.medicos[0]).first()
+        response = pedir_async(
+            views_async.actualizar_estado_cita, self.medicos[0].usuario, 'post', '/medico/actualizar-estado/',
+            {'cita_id': cita.pk, 'estado': Cita.CONFIRMADA},
+        )
+        self.assertEqual(json.loads(response.content)['etiqueta'], 'Confirmada')
+        ajena = Cita.objects.filter(medico=self.medicos[1]).first()
+        response = pedir_async(
+            views_async.actualizar_estados_citas, self.medicos[0].usuario, 'post', '/medico/actualizar-estados/',
+            {'cambios': [{'cita_id': ajena.pk, 'estado': Cita.CONFIRMADA}]}, content_type='application/json',
+        )
+        self.assertFalse(json.loads(response.content)['ok'])
+        self.assertEqual(Cita.objects.get(pk=ajena.pk).estado, Cita.PENDIENTE)
+
+
+# ==============================
+# MEDICIÓN DE SOLICITUDES
+# ==============================
+@override_settings(MEDICION_ACTIVA=True, MEDICION_MUESTREO=1)
+class MedicionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medicos, cls.pacientes = crear_datos(n_medicos=2, n_pacientes=4, citas_por_paciente=2)
+        cls.admin = Usuario.objects.create(username='admin1', rol='admin')
+
+    def setUp(self):
+        cache.clear()
+        # Cliente nuevo: la cadena de middlewares se arma con los settings de la prueba
+        self.client = Client()
+
+    def test_server_timing_y_log(self):
+        self.client.force_login(self.medicos[0].usuario)
+        with self.assertLogs('core.medicion', 'INFO') as logs:
+            response = self.client.get(reverse('pacientes_medico'))
+        self.assertRegex(response['Server-Timing'], r'total;dur=[\d.]+, db;dur=[\d.]+;desc="3 consultas"')
+        linea = json.loads(logs.records[0].getMessage())
+        self.assertEqual(linea['vista'], 'GET pacientes_medico')
+        self.assertEqual((linea['estado'], linea['consultas']), (200, 3))
+
+        resumen = resumen_medicion()
+        self.assertEqual(resumen['vistas'][0]['vista'], 'GET pacientes_medico')
+        self.assertEqual(resumen['vistas'][0]['solicitudes'], 1)
+
+    def test_consultas_repetidas(self):
+        # Un N+1: la misma consulta con distinto id se agrupa en una sola huella
+        medicion = Medicion()
+        with connection.execute_wrapper(medicion):
+            for paciente in self.pacientes:
+                Usuario.objects.get(pk=paciente.pk)
+            Usuario.objects.filter(pk__in=[1, 2]).first()
+            Usuario.objects.filter(pk__in=[1, 2, 3]).first()
+        medicion.terminar()
+        self.assertEqual(sorted(medicion.duplicadas().values()), [2, 4])
+
+        registrar('GET prueba', medicion)
+        duplicada = resumen_medicion()['duplicadas'][0]
+        self.assertEqual((duplicada['veces'], duplicada['vistas']), (4, ['GET prueba']))
+        self.assertIn('WHERE "core_usuario"."id" = ?', duplicada['sql'])
+
+    def test_middleware_async(self):
+        # Bajo ASGI el middleware no obliga a pasar la cadena a sync
+        async def vista(request):
+            await Usuario.objects.filter(pk=self.admin.pk).afirst()
+            return HttpResponse('ok')
+
+        middleware = MedicionMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('core.medicion', 'INFO'):
+            response = async_to_sync(middleware)(AsyncRequestFactory().get('/prueba/'))
+        self.assertIn('desc="1 consultas"', response['Server-Timing'])
+
+    def test_medir_fuera_de_una_solicitud(self):
+        with medir('tramo'):
+            pass
+        medicion = Medicion()
+        with activar(medicion), medir('tramo'):
+            pass
+        self.assertIn('tramo', medicion.tramos)
+        self.assertIsNone(medicion_actual())
+
+    @override_settings(MEDICION_ACTIVA=False)
+    def test_apagada(self):
+        self.client.force_login(self.medicos[0].usuario)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('pacientes_medico')))
+
+    def test_panel_rendimiento(self):
+        url = reverse('panel_rendimiento')
+        self.client.force_login(self.medicos[0].usuario)
+        self.assertRedirects(self.client.get(url), reverse('home'), fetch_redirect_response=False)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_dashboard'))
+        self.assertContains(self.client.get(url), 'GET admin_dashboard')
+        self.assertRedirects(self.client.post(url), url, fetch_redirect_response=False)
+        # Solo queda la propia solicitud de reinicio
+        self.assertEqual([v['vista'] for v in resumen_medicion()['vistas']], ['POST panel_rendimiento'])
+
+
+# ==============================
+# SERIES DE CITAS
+# ==============================
+class SerieCitasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.medico = Medico.objects.create(
+            usuario=Usuario.objects.create(username='medico1', rol='medico'),
+            matricula='M-0001',
+            telefono='7777-7777',
+        )
+        cls.paciente = Paciente.objects.create(
+            usuario=Usuario.objects.create(username='paciente1', rol='paciente'),
+            telefono='7777-7777',
+            direccion='Calle 1',
+        )
+        hoy = timezone.localdate()
+        cls.martes = hoy + timedelta(days=(1 - hoy.weekday()) % 7 or 7)
+        HorarioMedico.objects.create(medico=cls.medico, dia_semana=1, hora_inicio=time(9, 0), hora_fin=time(11, 0))
+
+    def setUp(self):
+        self.client.force_login(self.paciente.usuario)
+        self.inicio = timezone.make_aware(datetime.combine(self.martes, time(9, 0)))
+
+    def reservar(self, **datos):
+        return self.client.post(reverse('paciente_cita_create'), {
+            'medico': self.medico.pk,
+            'fecha_hora': f'{self.martes.isoformat()}T09:00',
+            'motivo': 'Terapia semanal',
+            'repeticiones': 12,
+            'intervalo_semanas': 1,
+            **datos,
+        })
+
+    def ocupar(self, semana):
+        return Cita.objects.create(
+            medico=self.medico, paciente=self.paciente, motivo='Control',
+            fecha_hora=self.inicio + timedelta(weeks=semana),
+        )
+
+    def test_reserva_con_un_solo_insert(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.reservar()
+        self.assertRedirects(response, reverse('paciente_cita_list'), fetch_redirect_response=False)
+        inserts = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "gestion_citas_cita"')]
+        self.assertEqual(len(inserts), 1)
+
+        serie = SerieCita.objects.get()
+        fechas = list(serie.citas.order_by('fecha_hora').values_list('fecha_hora', flat=True))
+        self.assertEqual(fechas, fechas_serie(self.inicio, 12))
+        self.assertEqual({timezone.localtime(f).weekday() for f in fechas}, {1})
+        # bulk_create no dispara señales: las citas se indexan igual
+        self.assertEqual(TerminoBusqueda.objects.filter(tipo='cita').values('objeto_id').distinct().count(), 12)
+
+    def test_fechas_ocupadas(self):
+        self.ocupar(2)
+        response = self.reservar()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'El médico ya tiene una cita en ese horario.')
+        self.assertFalse(SerieCita.objects.exists())
+
+        self.reservar(omitir_ocupadas='on')
+        self.assertEqual(SerieCita.objects.get().citas.count(), 11)
+
+    def test_previa(self):
+        self.ocupar(1)
+        response = self.client.get(reverse('paciente_serie_previa'), {
+            'medico': self.medico.pk, 'fecha_hora': f'{self.martes.isoformat()}T09:00', 'repeticiones': 3, 'intervalo_semanas': 2,
+        })
+        data = response.json()
+        self.assertEqual([f['dia'] for f in data['fechas']], [(self.martes + timedelta(weeks=2 * i)).isoformat() for i in range(3)])
+        self.assertEqual(data['libres'], 3)
+
+        data = self.client.get(reverse('paciente_serie_previa'), {
+            'medico': self.medico.pk, 'fecha_hora': f'{self.martes.isoformat()}T09:00', 'repeticiones': 3,
+        }).json()
+        self.assertEqual([f['libre'] for f in data['fechas']], [True, False, True])
+
+        response = self.client.get(reverse('paciente_serie_previa'), {
+            'medico': 999999, 'fecha_hora': f'{self.martes.isoformat()}T09:00', 'repeticiones': 3,
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_verifica_todas_las_fechas_en_dos_consultas(self):
+        with self.assertNumQueries(2):
+            problemas = problemas_turnos(self.medico, fechas_serie(self.inicio, 52) + [self.inicio + timedelta(minutes=10)])
+        self.assertEqual(list(problemas), [self.inicio + timedelta(minutes=10)])
+
+    def test_modificar_y_cancelar_con_un_update(self):
+        self.reservar(repeticiones=4)
+        serie = SerieCita.objects.get()
+        completada = serie.citas.order_by('fecha_hora').first()
+        Cita.objects.filter(pk=completada.pk).update(estado=Cita.COMPLETADA)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(modificar_serie(serie, 'Terapia quincenal', time(10, 0)), 3)
+        updates = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE "gestion_citas_cita"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(timezone.localtime(serie.citas.get(pk=completada.pk).fecha_hora).hour, 9)
+        self.assertEqual(
+            {timezone.localtime(c.fecha_hora).hour for c in serie.citas.exclude(pk=completada.pk)}, {10},
+        )
+        self.assertEqual(timezone.localtime(SerieCita.objects.get().inicio).hour, 10)
+        self.assertTrue(TerminoBusqueda.objects.filter(tipo='cita', termino='quincenal').exists())
+
+        # La nueva hora debe estar libre en todas las fechas
+        Cita.objects.create(
+            medico=self.medico, paciente=self.paciente, motivo='Control',
+            fecha_hora=self.inicio + timedelta(weeks=3, minutes=90),
+        )
+        with self.assertRaises(ValidationError):
+            modificar_serie(serie, 'Terapia quincenal', time(10, 30))
+
+        self.assertEqual(cancelar_serie(serie), 3)
+        self.assertEqual(
+            list(serie.citas.order_by('fecha_hora').values_list('estado', flat=True)),
+            [Cita.COMPLETADA] + [Cita.CANCELADA] * 3,
+        )
+
+    def test_solo_series_propias(self):
+        self.reservar(repeticiones=2)
+        serie = SerieCita.objects.get()
+        self.assertContains(self.client.get(reverse('paciente_cita_list')), reverse('paciente_serie_edit', args=[serie.pk]))
+        self.assertEqual(self.client.get(reverse('paciente_serie_edit', args=[serie.pk])).status_code, 200)
+
+        otro = Paciente.objects.create(
+            usuario=Usuario.objects.create(username='paciente2', rol='paciente'), telefono='7777-7777', direccion='Calle 2',
+        )
+        self.client.force_login(otro.usuario)
+        self.assertEqual(self.client.post(reverse('paciente_serie_cancelar', args=[serie.pk])).status_code, 404)
+        self.assertEqual(serie.citas.filter(estado=Cita.PENDIENTE).count(), 2)
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 from django.contrib.auth import views as auth_views
 from .views import CustomLoginView, CustomLogoutView, landing_page # Importamos la nueva vista
 
+# Con VISTAS_ASYNC=1 (servidor ASGI) las páginas de lectura más pedidas usan las vistas async
+vistas = views_async if settings.VISTAS_ASYNC else views
 
 urlpatterns = [
     # PÁGINA PRINCIPAL / LANDING PAGE (Esta es la raíz '/')
@@ -20,12 +23,16 @@ urlpatterns = [
     path('registro/', views.registro, name='registro'),
 
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/rendimiento/', views.panel_rendimiento, name='panel_rendimiento'),
     
     #Paciente URLs Citas
-    path('paciente/citas/', views.PacienteCitaListView.as_view(), name='paciente_cita_list'),
+    path('paciente/citas/', views_async.paciente_cita_list if settings.VISTAS_ASYNC else views.PacienteCitaListView.as_view(), name='paciente_cita_list'),
     path('paciente/citas/nueva/', views.PacienteCitaCreateView.as_view(), name='paciente_cita_create'),
     path('paciente/citas/<int:pk>/editar/', views.PacienteCitaUpdateView.as_view(), name='paciente_cita_edit'),
     path('paciente/citas/<int:pk>/eliminar/', views.PacienteCitaDeleteView.as_view(), name='paciente_cita_delete'),
+    path('paciente/citas/serie/previa/', views.serie_previa, name='paciente_serie_previa'),
+    path('paciente/series/<int:pk>/editar/', views.PacienteSerieUpdateView.as_view(), name='paciente_serie_edit'),
+    path('paciente/series/<int:pk>/cancelar/', views.paciente_serie_cancelar, name='paciente_serie_cancelar'),
     
     # Completar perfil paciente
     path('completar-perfil/paciente/', views.completar_perfil_paciente, name='completar_perfil_paciente'),
@@ -34,11 +41,16 @@ urlpatterns = [
     path('paciente/perfil/', views.paciente_perfil, name='paciente_perfil'),
     
      # NUEVA URL DE LISTADO DE MEDICOS
-    path('medicos/', views.medicos_paciente, name='medicos_paciente'),
+    path('medicos/', vistas.medicos_paciente, name='medicos_paciente'),
+    path('medicos/json/', views.medicos_paciente_json, name='medicos_paciente_json'),
+
+    # Turnos libres de un médico (JSON para el formulario de reserva)
+    path('medicos/<int:pk>/turnos/', views.turnos_medico, name='turnos_medico'),
     
     # Médico URLs
-    path('medico/agenda/', views.agenda_medico, name='medico_agenda'),
-    path('medico/actualizar-estado/', views.actualizar_estado_cita, name='medico-actualizar-estado'),
+    path('medico/agenda/', vistas.agenda_medico, name='medico_agenda'),
+    path('medico/actualizar-estado/', vistas.actualizar_estado_cita, name='medico-actualizar-estado'),
+    path('medico/actualizar-estados/', vistas.actualizar_estados_citas, name='medico-actualizar-estados'),
     
     # URLs de Perfil del Médico
     path('medico/perfil/', views.medico_perfil, name='medico_perfil'),
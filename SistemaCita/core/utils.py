@@ -1,8 +1,14 @@
 from django.contrib.auth import get_user_model  # Permite obtener el modelo de usuario activo
 from django.contrib.auth.models import Group  # Para manejar grupos de usuarios
+from django.db import DEFAULT_DB_ALIAS  # Base de datos por defecto
 
 
-def crear_admin():
+def crear_admin(using=DEFAULT_DB_ALIAS):
+    """
+    Crea los grupos de roles y el usuario admin si no existen.
+    Es idempotente: se puede ejecutar en cada migrate o desde `manage.py crear_admin`.
+    Devuelve True si creó el usuario admin.
+    """
     # Obtiene el modelo de usuario actual (puede ser personalizado)
     User = get_user_model()
 
@@ -10,20 +16,26 @@ def crear_admin():
     grupos = {}
     for nombre in ["Administrador", "Medico", "Paciente"]:
         # get_or_create: obtiene el grupo si existe, o lo crea si no
-        grupo, _ = Group.objects.get_or_create(name=nombre)
+        grupo, _ = Group.objects.using(using).get_or_create(name=nombre)
         grupos[nombre] = grupo  # Guarda referencia al grupo en un diccionario
 
     # 🔹 Crear usuario admin si no existe
-    if not User.objects.filter(username="admin").exists():
-        # Crea un nuevo usuario
-        admin = User(username="admin", email="admin@midominio.com")
-        admin.set_password("admin123")  # Define la contraseña
-        admin.is_superuser = True  # Marca como superusuario
-        admin.is_staff = True      # Puede entrar al admin
-        admin.is_active = True     # Usuario activo
-        admin.rol = "admin"        # Asigna rol personalizado
-        admin.save()               # Guarda en la base de datos
-        admin.groups.add(grupos["Administrador"])  # Añade al grupo Administrador
+    if User.objects.using(using).filter(username="admin").exists():
+        return False
+
+    # Crea un nuevo usuario
+    admin = User(username="admin", email="admin@midominio.com")
+    admin.set_password("admin123")  # Define la contraseña
+    admin.is_superuser = True  # Marca como superusuario
+    admin.is_staff = True      # Puede entrar al admin
+    admin.is_active = True     # Usuario activo
+    admin.rol = "admin"        # Asigna rol personalizado
+    admin.save(using=using)    # Guarda en la base de datos
+    admin.groups.add(grupos["Administrador"])  # Añade al grupo Administrador
+    return True
+
+
+def crear_admin_post_migrate(sender, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """Receptor de post_migrate: deja listos grupos y admin al terminar `migrate`."""
+    if crear_admin(using=using) and verbosity >= 1:
         print("✅ Usuario admin creado automáticamente")
-    else:
-        print("⚠ Usuario admin ya existe")  # Mensaje si ya está creado
\ No newline at end of file
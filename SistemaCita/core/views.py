@@ -1,5 +1,7 @@
 # Importa funciones para renderizar templates, redirigir URLs y obtener objetos o devolver 404 si no existe
 from django.shortcuts import render, redirect, get_object_or_404
+# Ajustes del proyecto (estado de la medición de solicitudes)
+from django.conf import settings
 # Permite iniciar sesión de un usuario
 from django.contrib.auth import login
 # Permite generar URLs inversas usando nombres de rutas, útil en redirecciones
@@ -9,31 +11,59 @@ from django.contrib.auth.decorators import login_required
 # Clases genéricas de Django para manejo de login y logout
 from django.contrib.auth.views import LoginView, LogoutView
 # Clases genéricas de vistas de Django para listar, crear, actualizar o eliminar objetos
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, FormView
 # Decorador para requerir que una vista solo acepte solicitudes POST
-from django.views.decorators.http import require_POST
+# y para responder 304 con ETag
+from django.views.decorators.http import require_POST, require_GET, condition
+# Cabeceras Cache-Control de las respuestas JSON
+from django.views.decorators.cache import cache_control
 # Proporciona utilidades para trabajar con fechas y horas considerando la zona horaria
 from django.utils import timezone 
 # Para devolver respuestas en formato JSON
 # Para devolver una respuesta HTTP de “prohibido” (403)
-from django.http import JsonResponse, HttpResponseForbidden
-# Permite crear diccionarios con valores por defecto para cada clave
-from collections import defaultdict
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
+# Utilidades para agrupar y manejar rangos de fechas de la agenda
+import calendar
+import json
+from datetime import date, datetime, time, timedelta
+from functools import cached_property, partial
+from itertools import groupby
+from operator import attrgetter
+# Truncado de fechas en la base de datos
+from django.db.models.functions import TruncDate
+# Transacción para detectar choques de turno al reactivar una cita
+from django.db import IntegrityError, transaction
+# Fechas no disponibles de una serie de citas
+from django.core.exceptions import ValidationError
 
 # Formularios importados
-from .forms import RegistroForm, PacienteCitaForm
+from .forms import RegistroForm, PacienteCitaForm, PacienteReservaForm, SerieCitaForm
 from gestion_citas.forms import PacientePerfilForm
 from django.contrib import messages
 from .forms import MedicoRegistroForm
 
 # Modelos
-from gestion_citas.models import Medico, Paciente, Cita
+from gestion_citas.models import Medico, Paciente, Cita, HorarioMedico, SerieCita
+
+# Cálculo de turnos libres
+from gestion_citas.disponibilidad import turnos_libres_medico
+# Contadores cacheados del panel de administración
+from gestion_citas.estadisticas import resumen_panel_admin
+# Directorio de médicos cacheado (HTML y JSON)
+from gestion_citas.directorio import datos_directorio, especialidad_elegida, json_directorio, medicos_directorio, version_directorio
+# Cambios de estado en lote desde la agenda
+from gestion_citas.estados import MAX_CAMBIOS, aplicar_cambios_estado, codigo_estado, error_transicion
+# Series de citas periódicas
+from gestion_citas.series import MAX_REPETICIONES, cancelar_serie, citas_pendientes, modificar_serie, previsualizar, reservar_serie
+
+# Acumulado de MedicionMiddleware para el panel de rendimiento
+from .medicion import reiniciar_medicion, resumen_medicion
 
 # Decoradores de rol
 from .decorators import admin_required, medico_required, paciente_required
 
 # Mixins para vistas basadas en clases
-from .mixins import RolRequiredMixin
+from .mixins import RolRequiredMixin, ReservaCitaMixin
 
 # ==========================================================
 # 🏠 NUEVA PÁGINA PRINCIPAL (LANDING PAGE) 
@@ -93,34 +123,118 @@ def home_page(request):
 @login_required
 @admin_required
 def admin_dashboard(request):
-    return render(request, 'admin/panel_admin.html', {}) 
+    return render(request, 'admin/panel_admin.html', {'resumen': resumen_panel_admin()})
+
+
+@login_required
+@admin_required
+def panel_rendimiento(request):
+    # Vistas más lentas y consultas repetidas según MedicionMiddleware (ver core/medicion.py)
+    if request.method == 'POST':
+        reiniciar_medicion()
+        messages.success(request, "Se reinició la medición.")
+        return redirect('panel_rendimiento')
+    return render(request, 'admin/rendimiento.html', {
+        'resumen': resumen_medicion(),
+        'activa': settings.MEDICION_ACTIVA,
+        'muestreo': settings.MEDICION_MUESTREO * 100,
+    })
+
+
+# Vistas disponibles en la agenda y tope de días por ventana
+AGENDA_VISTAS = ('dia', 'semana', 'mes')
+AGENDA_MAX_DIAS = 62
+
+
+def _rango_agenda(request):
+    """
+    Calcula la ventana de días (desde, hasta, vista) de la agenda a partir de
+    ?vista=dia|semana|mes o de un rango explícito ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD.
+    """
+    hoy = timezone.localdate()
+    vista = request.GET.get('vista', 'semana')
+    if vista not in AGENDA_VISTAS:
+        vista = 'semana'
+
+    # Ventana por defecto según la vista elegida
+    if vista == 'dia':
+        desde = hasta = hoy
+    elif vista == 'mes':
+        desde = hoy.replace(day=1)
+        hasta = desde.replace(day=calendar.monthrange(desde.year, desde.month)[1])
+    else:
+        desde = hoy - timedelta(days=hoy.weekday())
+        hasta = desde + timedelta(days=6)
+
+    # Un rango explícito tiene prioridad sobre la vista
+    try:
+        if request.GET.get('desde'):
+            desde = date.fromisoformat(request.GET['desde'])
+        if request.GET.get('hasta'):
+            hasta = date.fromisoformat(request.GET['hasta'])
+    except ValueError:
+        pass
+
+    if hasta < desde:
+        hasta = desde
+    # Limita la ventana para no volver a cargar todo el historial
+    hasta = min(hasta, desde + timedelta(days=AGENDA_MAX_DIAS - 1))
+    return desde, hasta, vista
 
 
 @medico_required
 def agenda_medico(request):
-    # Obtiene el médico logueado
+    # Obtiene el médico logueado (con su usuario, que se muestra en la barra)
     try:
-        medico = Medico.objects.get(usuario=request.user)
+        medico = Medico.objects.select_related('usuario').get(usuario=request.user)
     except Medico.DoesNotExist:
         return HttpResponseForbidden("No tienes permisos de médico para ver esta página.")
 
-    # Obtiene las citas del médico
-    citas = Cita.objects.filter(medico=medico).order_by('fecha_hora')
+    desde, hasta, vista = _rango_agenda(request)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    citas = _citas_agenda(medico.pk, inicio, fin)
+    hay_anteriores = Cita.objects.filter(medico=medico, fecha_hora__lt=inicio).exists()
 
-    # Agrupa citas por día
-    dias = defaultdict(list)
-    for c in citas:
-        dia = c.fecha_hora.date() if c.fecha_hora else None
-        dias[dia].append(c)
+    return _render_agenda(request, medico, citas, hay_anteriores, desde, hasta, vista)
+
+
+def _citas_agenda(medico_id, inicio, fin):
+    # Solo las citas de la ventana; el día se trunca en la base de datos
+    return (
+        Cita.objects.filter(medico_id=medico_id, fecha_hora__gte=inicio, fecha_hora__lt=fin)
+        .select_related('paciente__usuario')
+        .annotate(dia=TruncDate('fecha_hora'))
+        .order_by('fecha_hora')
+    )
 
-    # Ordena los días (None al final)
-    dias_ordenados = sorted(dias.items(), key=lambda x: (x[0] is None, x[0]))
+
+def _render_agenda(request, medico, citas, hay_anteriores, desde, hasta, vista):
+    """Arma el contexto de la agenda (también la usa la versión async en views_async.py)."""
+    # Las citas ya vienen ordenadas, basta con agrupar los consecutivos por día
+    dias_ordenados = [(dia, list(grupo)) for dia, grupo in groupby(citas, key=attrgetter('dia'))]
+
+    # Ventana anterior (mismo tamaño) para la carga diferida hacia atrás
+    duracion = (hasta - desde).days + 1
 
     context = {
         'medico': medico,
         'dias_ordenados': dias_ordenados,
         'now': timezone.now(),
+        'vista': vista,
+        'desde': desde,
+        'hasta': hasta,
+        'anterior_desde': desde - timedelta(days=duracion),
+        'anterior_hasta': desde - timedelta(days=1),
+        'siguiente_desde': hasta + timedelta(days=1),
+        'siguiente_hasta': hasta + timedelta(days=duracion),
+        'hay_anteriores': hay_anteriores,
     }
+
+    # Peticiones de carga diferida: solo se devuelven las tarjetas de los días
+    if request.GET.get('parcial'):
+        return render(request, 'medico/agenda_dias.html', context)
     return render(request, 'medico/agenda_medico.html', context)
 
 
@@ -228,6 +342,16 @@ def completar_perfil_paciente(request):
 # ==========================================================
 # 🔹 CRUD DE CITAS DEL PACIENTE
 # ==========================================================
+def citas_del_paciente(usuario):
+    """Citas del paciente con médico, usuario y especialidades (también para views_async.py)."""
+    return (
+        Cita.objects.filter(paciente__usuario=usuario)
+        .select_related('medico__usuario')
+        .prefetch_related('medico__especialidades')
+        .order_by('-fecha_hora')
+    )
+
+
 class PacienteCitaListView(RolRequiredMixin, ListView):
     model = Cita
     rol_permitido = 'paciente' 
@@ -237,7 +361,7 @@ class PacienteCitaListView(RolRequiredMixin, ListView):
     def get_queryset(self):
         user = self.request.user
         if user.rol == 'paciente':
-            return Cita.objects.filter(paciente__usuario=user).order_by('-fecha_hora')
+            return citas_del_paciente(user)
         return Cita.objects.none()
 
     # CORRECCIÓN PARA PASAR 'now' a la VBC, resolviendo el error de la fecha
@@ -246,20 +370,36 @@ class PacienteCitaListView(RolRequiredMixin, ListView):
         context['now'] = timezone.now()
         return context
 
-class PacienteCitaCreateView(RolRequiredMixin, CreateView):
+class PacienteCitaCreateView(RolRequiredMixin, ReservaCitaMixin, CreateView):
     model = Cita
     rol_permitido = 'paciente'
-    form_class = PacienteCitaForm
+    form_class = PacienteReservaForm
     template_name = 'paciente/paciente_cita_form.html'
     success_url = reverse_lazy('paciente_cita_list')
 
     def form_valid(self, form):
         # Asigna paciente automáticamente al crear cita
         form.instance.paciente = self.request.user.paciente
-        return super().form_valid(form)
-
-
-class PacienteCitaUpdateView(RolRequiredMixin, UpdateView):
+        if not form.es_serie():
+            return super().form_valid(form)
+
+        # Serie: todas las citas se verifican y se crean juntas (gestion_citas/series.py)
+        datos = form.cleaned_data
+        try:
+            reservar_serie(
+                form.instance.paciente, datos['medico'], datos['fecha_hora'], datos['repeticiones'],
+                datos['intervalo_semanas'], datos['motivo'], omitir_ocupadas=datos['omitir_ocupadas'],
+            )
+        except ValidationError as e:
+            form.add_error('fecha_hora', e)
+            return self.form_invalid(form)
+        except IntegrityError:
+            form.add_error('fecha_hora', "Uno de los turnos acaba de ser reservado. Revisa las fechas de la serie.")
+            return self.form_invalid(form)
+        return redirect(self.success_url)
+
+
+class PacienteCitaUpdateView(RolRequiredMixin, ReservaCitaMixin, UpdateView):
     model = Cita
     rol_permitido = 'paciente'
     form_class = PacienteCitaForm
@@ -282,36 +422,234 @@ class PacienteCitaDeleteView(RolRequiredMixin, DeleteView):
         return Cita.objects.filter(paciente__usuario=self.request.user)
 
 
+# ==========================================================
+# 🔹 SERIES DE CITAS DEL PACIENTE
+# ==========================================================
+@login_required
+@paciente_required
+@require_GET
+def serie_previa(request):
+    """
+    Fechas que tendría una serie de citas y si cada una está libre, para mostrarlas
+    en el formulario de reserva antes de enviarlo (?medico=&fecha_hora=&repeticiones=&intervalo_semanas=).
+    """
+    try:
+        medico_id = int(request.GET.get('medico', ''))
+        inicio = timezone.make_aware(datetime.strptime(request.GET.get('fecha_hora', ''), '%Y-%m-%dT%H:%M'))
+        repeticiones = int(request.GET.get('repeticiones', 1))
+        intervalo = int(request.GET.get('intervalo_semanas', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Datos incompletos'}, status=400)
+    if not 1 <= repeticiones <= MAX_REPETICIONES or intervalo not in dict(SerieCita.INTERVALOS):
+        return JsonResponse({'error': 'Datos inválidos'}, status=400)
+    medico = get_object_or_404(Medico.objects.only('pk'), pk=medico_id)
+
+    fechas = [
+        {
+            'valor': local.strftime('%Y-%m-%dT%H:%M'),
+            'dia': local.date().isoformat(),
+            'hora': local.strftime('%H:%M'),
+            'libre': mensaje is None,
+            'mensaje': mensaje or '',
+        }
+        for local, mensaje in ((timezone.localtime(f), m) for f, m in previsualizar(medico, inicio, repeticiones, intervalo))
+    ]
+    return JsonResponse({'fechas': fechas, 'libres': sum(f['libre'] for f in fechas)})
+
+
+class PacienteSerieUpdateView(RolRequiredMixin, FormView):
+    """Cambia la hora y el motivo de todas las citas pendientes de una serie."""
+    rol_permitido = 'paciente'
+    form_class = SerieCitaForm
+    template_name = 'paciente/paciente_serie_form.html'
+    success_url = reverse_lazy('paciente_cita_list')
+
+    @cached_property
+    def serie(self):
+        # Solo las series del paciente logueado
+        return get_object_or_404(
+            SerieCita.objects.select_related('medico__usuario'), pk=self.kwargs['pk'], paciente__usuario=self.request.user,
+        )
+
+    def get_initial(self):
+        return {'hora': timezone.localtime(self.serie.inicio).time(), 'motivo': self.serie.motivo}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['serie'] = self.serie
+        context['citas'] = citas_pendientes(self.serie).order_by('fecha_hora')
+        return context
+
+    def form_valid(self, form):
+        try:
+            modificar_serie(self.serie, form.cleaned_data['motivo'], form.cleaned_data['hora'])
+        except ValidationError as e:
+            form.add_error('hora', e)
+            return self.form_invalid(form)
+        except IntegrityError:
+            form.add_error('hora', "Uno de los turnos acaba de ser reservado. Elige otra hora.")
+            return self.form_invalid(form)
+        return super().form_valid(form)
+
+
+@login_required
+@paciente_required
+@require_POST
+def paciente_serie_cancelar(request, pk):
+    """Cancela todas las citas pendientes de una serie del paciente."""
+    serie = get_object_or_404(SerieCita, pk=pk, paciente__usuario=request.user)
+    cancelar_serie(serie)
+    return redirect('paciente_cita_list')
+
+
 # ==========================================================
 # 🔹 AJAX: ACTUALIZAR ESTADO DE CITA
 # ==========================================================
 @login_required
 @require_POST
 def actualizar_estado_cita(request):
-    # Verifica que sea médico
-    try:
-        medico = Medico.objects.get(usuario=request.user)
-    except Medico.DoesNotExist:
-        return JsonResponse({'error': 'No autorizado'}, status=403)
+    datos = _leer_cambio_estado(request)
+    if isinstance(datos, JsonResponse):
+        return datos
+    cita_id, nuevo_estado = datos
 
-    # Obtiene datos del POST
+    # La cita solo se obtiene si pertenece al médico logueado (una consulta)
+    cita = Cita.objects.filter(pk=cita_id, medico__usuario=request.user).first()
+    return _guardar_estado_cita(cita, nuevo_estado)
+
+
+def _leer_cambio_estado(request):
+    """(cita_id, código de estado) del POST o la respuesta de error."""
     cita_id = request.POST.get('cita_id')
-    nuevo_estado = request.POST.get('estado')
-    if not cita_id or not nuevo_estado:
+    nuevo_estado = codigo_estado(request.POST.get('estado', ''))
+    if not cita_id or not cita_id.isdigit() or nuevo_estado is None:
         return JsonResponse({'error': 'Datos incompletos'}, status=400)
+    return int(cita_id), nuevo_estado
 
-    # Obtiene la cita
-    cita = get_object_or_404(Cita, pk=cita_id)
-    if cita.medico != medico:
+
+def _guardar_estado_cita(cita, nuevo_estado):
+    if cita is None:
         return JsonResponse({'error': 'No autorizado a modificar esta cita'}, status=403)
 
-    # Actualiza estado y guarda
+    # La transición se valida con el estado ya leído, sin más consultas
+    if not cita.puede_cambiar_a(nuevo_estado):
+        return JsonResponse({'error': error_transicion(cita.estado, nuevo_estado)}, status=400)
+
+    # Actualiza solo el estado
     cita.estado = nuevo_estado
-    cita.save()
+    try:
+        with transaction.atomic():
+            cita.save(update_fields=['estado'])
+    except IntegrityError:
+        return JsonResponse({'error': 'El turno ya está ocupado por otra cita'}, status=409)
     return JsonResponse({
         'ok': True,
-        'cita_id': cita_id,
-        'nuevo_estado': nuevo_estado,
+        'cita_id': cita.pk,
+        'nuevo_estado': cita.estado,
+        'etiqueta': cita.get_estado_display(),
+    })
+
+
+@login_required
+@require_POST
+def actualizar_estados_citas(request):
+    """
+    Aplica en lote los cambios de estado que la agenda acumula.
+    Recibe JSON {"cambios": [{"cita_id": 1, "estado": 2}, ...]} (código o nombre del estado)
+    y devuelve un resultado por cambio.
+    """
+    medico = Medico.objects.filter(usuario=request.user).first()
+    if medico is None:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    cambios = _leer_cambios_estado(request)
+    if isinstance(cambios, JsonResponse):
+        return cambios
+
+    resultados = aplicar_cambios_estado(medico, cambios)
+    return JsonResponse({'ok': all(r['ok'] for r in resultados), 'resultados': resultados})
+
+
+def _leer_cambios_estado(request):
+    """Pares (cita_id, estado) del cuerpo JSON o la respuesta de error."""
+    try:
+        cambios = [(cambio['cita_id'], cambio['estado']) for cambio in json.loads(request.body)['cambios']]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Datos incompletos'}, status=400)
+    if not cambios or len(cambios) > MAX_CAMBIOS:
+        return JsonResponse({'error': f'Se aceptan entre 1 y {MAX_CAMBIOS} cambios por solicitud'}, status=400)
+    return cambios
+
+
+# ==========================================================
+# 🔹 JSON: TURNOS LIBRES DE UN MÉDICO
+# ==========================================================
+def _semana_turnos(request):
+    # Semana (lunes a domingo) que contiene ?semana=AAAA-MM-DD; por defecto la actual
+    try:
+        dia = date.fromisoformat(request.GET.get('semana', ''))
+    except ValueError:
+        dia = timezone.localdate()
+    lunes = dia - timedelta(days=dia.weekday())
+    return lunes, lunes + timedelta(days=6)
+
+
+def _medico_turnos(request, pk):
+    # Se consulta una sola vez por petición (la usan el ETag y la vista)
+    if not hasattr(request, '_medico_turnos'):
+        request._medico_turnos = get_object_or_404(Medico.objects.only('pk', 'agenda_actualizada'), pk=pk)
+    return request._medico_turnos
+
+
+def _version_agenda(request, pk):
+    return _medico_turnos(request, pk).agenda_actualizada
+
+
+def _etag_turnos(request, pk):
+    desde, hasta = _semana_turnos(request)
+    version = _version_agenda(request, pk)
+    marca = int(version.timestamp() * 1000) if version else 0
+    etag = f"{pk}-{desde:%Y%m%d}-{marca}"
+    # En la semana en curso los turnos dejan de ofrecerse al empezar: se incluye el
+    # minuto actual (los turnos empiezan en minutos exactos). Sin Last-Modified,
+    # que solo vería los cambios de la agenda y no el paso del tiempo
+    ahora = timezone.localtime()
+    if desde <= ahora.date() <= hasta:
+        etag += f"-{ahora:%Y%m%d%H%M}"
+    return etag
+
+
+@login_required
+@require_GET
+# no_cache: el navegador guarda la respuesta pero la revalida en cada pedido (304 si no cambió),
+# para no ofrecer un turno que se acaba de reservar
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_turnos)
+def turnos_medico(request, pk):
+    """
+    Turnos libres de un médico durante una semana, para el formulario de reserva.
+    Responde 304 mientras no cambien las citas ni los horarios del médico.
+    """
+    desde, hasta = _semana_turnos(request)
+    medico = _medico_turnos(request, pk)
+    turnos = turnos_libres_medico(medico, desde, hasta)
+    con_horario = bool(turnos) or HorarioMedico.objects.filter(medico_id=pk).exists()
+
+    return JsonResponse({
+        'medico': pk,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'semana_anterior': (desde - timedelta(days=7)).isoformat(),
+        'semana_siguiente': (desde + timedelta(days=7)).isoformat(),
+        'con_horario': con_horario,
+        'turnos': [
+            {
+                'valor': local.strftime('%Y-%m-%dT%H:%M'),  # Formato del input datetime-local
+                'dia': local.date().isoformat(),
+                'hora': local.strftime('%H:%M'),
+            }
+            for local in map(timezone.localtime, turnos)
+        ],
     })
 
 
@@ -346,16 +684,40 @@ def registrar_medico(request):
 def medicos_paciente(request):
     """
     Vista para que los pacientes puedan ver el listado de médicos.
+    El listado se guarda renderizado por versión del directorio y especialidad
+    (ver gestion_citas/directorio.py); los datos solo se leen si el fragmento no está en caché.
     """
-    # Obtenemos todos los médicos del sistema
-    medicos = Medico.objects.select_related('usuario').prefetch_related('especialidades').all()
+    return render(request, 'paciente/medicos_paciente.html', _contexto_directorio(request, version_directorio()))
 
-    context = {
-        'medicos': medicos,
+
+def _contexto_directorio(request, version):
+    especialidad = especialidad_elegida(request.GET.get('especialidad'))
+    return {
+        'version_directorio': version,
+        'especialidad': especialidad,
+        # Las plantillas llaman a los callables al usarlos: no se evalúan si el fragmento está cacheado
+        'medicos': partial(medicos_directorio, especialidad, version),
+        'especialidades': lambda: datos_directorio(version)['especialidades'],
         'now': timezone.now(),
     }
 
-    return render(request, 'paciente/medicos_paciente.html', context)
+
+def _etag_directorio(request):
+    return f"{version_directorio()}-{especialidad_elegida(request.GET.get('especialidad'))}"
+
+
+@login_required
+@paciente_required
+@require_GET
+@cache_control(private=True, max_age=60)
+@condition(etag_func=_etag_directorio)
+def medicos_paciente_json(request):
+    """
+    Directorio de médicos en JSON (?especialidad=<id> para filtrar).
+    Responde 304 mientras no cambie la versión del directorio.
+    """
+    especialidad = especialidad_elegida(request.GET.get('especialidad'))
+    return HttpResponse(json_directorio(especialidad), content_type='application/json')
 
 # 🔹 LISTA DE PACIENTES EN VISTA DE MEDICOS 
 @medico_required
@@ -369,8 +731,8 @@ def pacientes_medico(request):
         .distinct()
     )
 
-    # Buscar los pacientes basados en su usuario_id
-    pacientes = Paciente.objects.filter(usuario_id__in=pacientes_ids)
+    # Buscar los pacientes basados en su usuario_id (con su usuario en la misma consulta)
+    pacientes = Paciente.objects.filter(usuario_id__in=pacientes_ids).select_related('usuario')
 
     return render(request, 'medico/pacientes_medico.html', {
         'medico': medico,
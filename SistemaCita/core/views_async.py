@@ -0,0 +1,129 @@
+"""
+Versiones async (ASGI) de las vistas de lectura más pedidas del panel del
+médico y del paciente, y de los cambios de estado de la agenda.
+
+Se activan con VISTAS_ASYNC=1 (ver core/urls.py); la lógica es la misma de
+views.py, de donde se reutilizan las consultas y el armado del contexto.
+Bajo ASGI, mientras una vista espera a la base de datos el worker atiende
+otras solicitudes.
+
+Las consultas independientes de una vista se lanzan con _concurrentes(). Por
+defecto el ORM async de Django las ejecuta una tras otra en el hilo de la
+solicitud (sync_to_async con thread_sensitive=True, comparten la conexión).
+Con CONSULTAS_PARALELAS=1 cada consulta usa un hilo y una conexión propios, a
+cambio de abrir más conexiones por solicitud: solo conviene con pooling y si
+la latencia de la base es alta.
+"""
+import asyncio
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.http import HttpResponseForbidden, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from gestion_citas.directorio import version_directorio
+from gestion_citas.estados import aplicar_cambios_estado
+from gestion_citas.models import Cita, Medico
+
+from .decorators import medico_required, paciente_required
+from .views import (
+    _citas_agenda, _contexto_directorio, _guardar_estado_cita, _leer_cambio_estado,
+    _leer_cambios_estado, _rango_agenda, _render_agenda, citas_del_paciente,
+)
+
+
+def _en_hilo_propio(funcion):
+    # Conexión propia del hilo: al terminar se cierra si ya no puede reutilizarse (CONN_MAX_AGE)
+    def ejecutar():
+        try:
+            return funcion()
+        finally:
+            close_old_connections()
+    return sync_to_async(ejecutar, thread_sensitive=False)
+
+
+async def _concurrentes(*funciones):
+    """Ejecuta funciones sync con acceso a la base y devuelve sus resultados en orden."""
+    if settings.CONSULTAS_PARALELAS:
+        return await asyncio.gather(*(_en_hilo_propio(funcion)() for funcion in funciones))
+    return await asyncio.gather(*(sync_to_async(funcion)() for funcion in funciones))
+
+
+# ==========================================================
+# 🔹 AGENDA DEL MÉDICO
+# ==========================================================
+@login_required
+@medico_required
+async def agenda_medico(request):
+    desde, hasta, vista = _rango_agenda(request)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    # El médico comparte pk con su usuario: las tres consultas no dependen entre sí
+    pk = request.user.pk
+    medico, citas, hay_anteriores = await _concurrentes(
+        # La plantilla lee medico.usuario: se trae en la misma consulta y no durante el render
+        Medico.objects.filter(pk=pk).select_related('usuario').first,
+        lambda: list(_citas_agenda(pk, inicio, fin)),
+        Cita.objects.filter(medico_id=pk, fecha_hora__lt=inicio).exists,
+    )
+    if medico is None:
+        return HttpResponseForbidden("No tienes permisos de médico para ver esta página.")
+
+    return await sync_to_async(_render_agenda)(request, medico, citas, hay_anteriores, desde, hasta, vista)
+
+
+@login_required
+@require_POST
+async def actualizar_estado_cita(request):
+    datos = _leer_cambio_estado(request)
+    if isinstance(datos, JsonResponse):
+        return datos
+    cita_id, nuevo_estado = datos
+
+    user = await request.auser()
+    cita = await Cita.objects.filter(pk=cita_id, medico__usuario=user).afirst()
+    return await sync_to_async(_guardar_estado_cita)(cita, nuevo_estado)
+
+
+@login_required
+@require_POST
+async def actualizar_estados_citas(request):
+    user = await request.auser()
+    medico = await Medico.objects.filter(usuario=user).afirst()
+    if medico is None:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    cambios = _leer_cambios_estado(request)
+    if isinstance(cambios, JsonResponse):
+        return cambios
+
+    resultados = await sync_to_async(aplicar_cambios_estado)(medico, cambios)
+    return JsonResponse({'ok': all(r['ok'] for r in resultados), 'resultados': resultados})
+
+
+# ==========================================================
+# 🔹 PANEL DEL PACIENTE
+# ==========================================================
+@login_required
+@paciente_required
+async def paciente_cita_list(request):
+    # async for evalúa el queryset completo, incluido el prefetch de especialidades
+    citas = [cita async for cita in citas_del_paciente(request.user)]
+    context = {
+        'citas': citas,
+        'now': timezone.now(),
+    }
+    return await sync_to_async(render)(request, 'paciente/paciente_cita_list.html', context)
+
+
+@login_required
+@paciente_required
+async def medicos_paciente(request):
+    version = await sync_to_async(version_directorio)()
+    return await sync_to_async(render)(request, 'paciente/medicos_paciente.html', _contexto_directorio(request, version))
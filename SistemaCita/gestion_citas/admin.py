@@ -1 +1,11 @@
 from django.contrib import admin
+
+from .models import HorarioMedico
+
+
+# Los horarios de atención se cargan desde el admin de Django
+@admin.register(HorarioMedico)
+class HorarioMedicoAdmin(admin.ModelAdmin):
+    list_display = ('medico', 'dia_semana', 'hora_inicio', 'hora_fin', 'duracion_minutos')
+    list_filter = ('dia_semana',)
+    list_select_related = ('medico__usuario',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GestionCitasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestion_citas'
+
+    def ready(self):
+        # Registra las señales que mantienen el índice de búsqueda
+        from . import signals  # noqa: F401
@@ -0,0 +1,129 @@
+"""
+Índice de búsqueda de pacientes, médicos, especialidades y citas.
+
+Cada registro se descompone en términos normalizados (minúsculas y sin acentos)
+que se guardan en TerminoBusqueda al guardar el registro (ver signals.py).
+Una búsqueda exige que cada palabra escrita sea prefijo de algún término del
+registro, y cada palabra se resuelve con LIKE 'palabra%' sobre el índice
+(tipo, termino), sin comodín inicial.
+"""
+import re
+import unicodedata
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TerminoBusqueda
+
+# Largo máximo de un término (coincide con TerminoBusqueda.termino)
+LARGO_TERMINO = 50
+# Tope de términos por registro para que un motivo extenso no infle el índice
+MAX_TERMINOS = 60
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Pasa a minúsculas y quita acentos: 'José Pérez' -> 'jose perez'."""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def terminos(*textos):
+    """Términos únicos (en orden de aparición) de uno o varios textos."""
+    vistos = []
+    for texto in textos:
+        for termino in _SEPARADORES.split(normalizar(texto)):
+            termino = termino[:LARGO_TERMINO]
+            if termino and termino not in vistos:
+                vistos.append(termino)
+    return vistos[:MAX_TERMINOS]
+
+
+# ==============================
+# TEXTOS INDEXADOS POR TIPO
+# ==============================
+def textos_paciente(paciente):
+    usuario = paciente.usuario
+    return [usuario.first_name, usuario.last_name, usuario.username, usuario.email]
+
+
+def textos_medico(medico):
+    usuario = medico.usuario
+    return [usuario.first_name, usuario.last_name, usuario.username, medico.matricula] + [
+        e.nombre for e in medico.especialidades.all()
+    ]
+
+
+def textos_especialidad(especialidad):
+    return [especialidad.nombre]
+
+
+def textos_cita(cita):
+    # Los nombres de paciente y médico se buscan en sus propios índices (ver filtrar)
+    fecha = timezone.localtime(cita.fecha_hora) if timezone.is_aware(cita.fecha_hora) else cita.fecha_hora
+    return [fecha.strftime('%d/%m/%Y %Y-%m-%d %H:%M'), cita.motivo]
+
+
+TEXTOS = {
+    'paciente': textos_paciente,
+    'medico': textos_medico,
+    'especialidad': textos_especialidad,
+    'cita': textos_cita,
+}
+
+
+# ==============================
+# MANTENIMIENTO DEL ÍNDICE
+# ==============================
+def indexar(tipo, obj):
+    """Reemplaza los términos de un registro por los de su estado actual."""
+    TerminoBusqueda.objects.filter(tipo=tipo, objeto_id=obj.pk).delete()
+    TerminoBusqueda.objects.bulk_create([
+        TerminoBusqueda(tipo=tipo, objeto_id=obj.pk, termino=termino)
+        for termino in terminos(*TEXTOS[tipo](obj))
+    ])
+
+
+def desindexar(tipo, pk):
+    TerminoBusqueda.objects.filter(tipo=tipo, objeto_id=pk).delete()
+
+
+def indexar_en_lote(tipo, queryset, lote=5000):
+    """Indexa registros que aún no están en el índice (ej. creados con bulk_create, sin señales)."""
+    total, pendientes = 0, []
+    for obj in queryset.iterator(chunk_size=2000):
+        pendientes += [TerminoBusqueda(tipo=tipo, objeto_id=obj.pk, termino=t) for t in terminos(*TEXTOS[tipo](obj))]
+        if len(pendientes) >= lote:
+            total += len(TerminoBusqueda.objects.bulk_create(pendientes, batch_size=lote))
+            pendientes = []
+    return total + len(TerminoBusqueda.objects.bulk_create(pendientes, batch_size=lote))
+
+
+# ==============================
+# CONSULTAS
+# ==============================
+def ids_con_prefijo(tipo, prefijo):
+    """Subconsulta con los ids de registros que tienen algún término que empieza por `prefijo`."""
+    # LIKE 'prefijo%' (sin comodín inicial): SQL Server lo resuelve como un rango
+    # sobre el índice (tipo, termino). Un rango explícito con un tope como
+    # prefijo + U+FFFF depende de la intercalación y puede no devolver nada
+    return (
+        TerminoBusqueda.objects
+        .filter(tipo=tipo, termino__startswith=prefijo)
+        .values('objeto_id')
+    )
+
+
+def filtrar(queryset, consulta, tipo, relaciones=None):
+    """
+    Filtra `queryset` dejando los registros en los que cada palabra de `consulta`
+    es prefijo de algún término. `relaciones` permite que una palabra también
+    coincida en un registro relacionado, ej. {'paciente_id': 'paciente'} en citas.
+    """
+    for prefijo in terminos(consulta):
+        condicion = Q(pk__in=ids_con_prefijo(tipo, prefijo))
+        for campo, tipo_relacionado in (relaciones or {}).items():
+            condicion |= Q(**{f'{campo}__in': ids_con_prefijo(tipo_relacionado, prefijo)})
+        queryset = queryset.filter(condicion)
+    return queryset
@@ -0,0 +1,92 @@
+"""
+Directorio de médicos que ven los pacientes (HTML y JSON).
+
+Los datos del directorio (médicos, especialidades y el índice
+especialidad -> médicos) se calculan una vez y se guardan en caché con una
+versión; las señales la incrementan al modificar médicos, especialidades o el
+nombre de un usuario médico (ver signals.py). El HTML se guarda como fragmento
+({% cache %}) y el JSON ya serializado, ambos con la versión en la clave, así
+que nunca hace falta borrar claves viejas: dejan de usarse y expiran.
+
+Filtrar por especialidad no consulta la base: se toman los médicos del índice.
+"""
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.medicion import medir
+
+from .models import Especialidad, Medico
+from .opciones import invalidar_opciones, version_opciones
+
+# Las entradas solo cambian con la versión; el tiempo de vida es un respaldo
+DURACION_DIRECTORIO = 60 * 60 * 24
+
+
+def version_directorio():
+    return version_opciones('directorio')
+
+
+def invalidar_directorio():
+    invalidar_opciones('directorio')
+
+
+@medir('directorio')
+def _construir():
+    medicos = {}
+    for medico in Medico.objects.select_related('usuario').prefetch_related('especialidades').order_by(
+        'usuario__first_name', 'usuario__last_name', 'pk'
+    ):
+        medicos[medico.pk] = {
+            'id': medico.pk,
+            'nombre': medico.usuario.first_name,
+            'apellido': medico.usuario.last_name,
+            'telefono': medico.telefono,
+            'especialidades': [{'id': e.pk, 'nombre': e.nombre} for e in medico.especialidades.all()],
+        }
+    por_especialidad = {}
+    for medico in medicos.values():
+        for especialidad in medico['especialidades']:
+            por_especialidad.setdefault(especialidad['id'], []).append(medico['id'])
+    return {
+        'medicos': medicos,
+        'especialidades': [
+            {'id': pk, 'nombre': nombre} for pk, nombre in Especialidad.objects.order_by('nombre').values_list('pk', 'nombre')
+        ],
+        'por_especialidad': por_especialidad,
+    }
+
+
+def datos_directorio(version=None):
+    """Médicos por pk, especialidades y el índice especialidad -> [pk de médicos]."""
+    version = version or version_directorio()
+    return cache.get_or_set(f'gestion_citas:directorio:{version}', _construir, DURACION_DIRECTORIO)
+
+
+def especialidad_elegida(valor):
+    """pk de la especialidad del parámetro ?especialidad= o None si no es un número."""
+    return int(valor) if str(valor or '').isdigit() else None
+
+
+def medicos_directorio(especialidad=None, version=None):
+    """Médicos del directorio, todos o solo los de una especialidad."""
+    datos = datos_directorio(version)
+    if especialidad is None:
+        return list(datos['medicos'].values())
+    return [datos['medicos'][pk] for pk in datos['por_especialidad'].get(especialidad, [])]
+
+
+def json_directorio(especialidad=None):
+    """Cuerpo JSON del directorio ya serializado (una lectura de caché por solicitud)."""
+    version = version_directorio()
+
+    def serializar():
+        return json.dumps({
+            'version': version,
+            'especialidad': especialidad,
+            'especialidades': datos_directorio(version)['especialidades'],
+            'medicos': medicos_directorio(especialidad, version),
+        }, cls=DjangoJSONEncoder)
+
+    return cache.get_or_set(f'gestion_citas:directorio:json:{version}:{especialidad}', serializar, DURACION_DIRECTORIO)
@@ -0,0 +1,150 @@
+"""
+Motor de disponibilidad de turnos.
+
+Los turnos libres se calculan a partir de los horarios semanales del médico
+(HorarioMedico) y de sus citas activas del rango: ambos se leen en una consulta
+cada uno y el cruce de intervalos se hace en memoria.
+
+Las reservas se alinean al inicio de los turnos, así que la restricción única
+(medico, fecha_hora) de Cita basta para impedir a nivel de base de datos dos
+citas activas del mismo médico en el mismo turno.
+
+La verificación de una reserva sigue el mismo esquema: problemas_turnos
+comprueba cualquier cantidad de fechas (ej. las de una serie de citas) con una
+lectura de los horarios y una de las citas del rango.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from core.medicion import medir
+
+from .models import Cita, HorarioMedico, Medico
+
+# Duración usada para médicos que todavía no tienen horarios cargados
+DURACION_POR_DEFECTO = timedelta(minutes=30)
+
+
+def _dias(desde, hasta):
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+
+def citas_activas(medicos_ids, inicio, fin, excluir=None, excluir_serie=None):
+    """Inicios de las citas activas por médico en [inicio, fin), ordenados."""
+    citas = (
+        Cita.objects.filter(medico_id__in=medicos_ids, fecha_hora__gte=inicio, fecha_hora__lt=fin)
+        .exclude(estado=Cita.CANCELADA)
+    )
+    if excluir is not None:
+        citas = citas.exclude(pk=excluir)
+    if excluir_serie is not None:
+        citas = citas.exclude(serie_id=excluir_serie)
+    ocupados = defaultdict(list)
+    for medico_id, fecha_hora in citas.order_by('fecha_hora').values_list('medico_id', 'fecha_hora'):
+        ocupados[medico_id].append(fecha_hora)
+    return ocupados
+
+
+def _se_solapa(inicio, duracion, ocupados):
+    # Hay choque si alguna cita empieza dentro de (inicio - duracion, inicio + duracion)
+    i = bisect_left(ocupados, inicio - duracion + timedelta(microseconds=1))
+    return i < len(ocupados) and ocupados[i] < inicio + duracion
+
+
+@medir('turnos_libres')
+def turnos_libres(medicos, desde, hasta):
+    """
+    Turnos libres de cada médico entre las fechas `desde` y `hasta` (inclusive).
+    Devuelve {medico_id: [datetime, ...]} con los turnos futuros en orden.
+    """
+    medicos_ids = [m.pk if isinstance(m, Medico) else m for m in medicos]
+    horarios = defaultdict(list)
+    for horario in HorarioMedico.objects.filter(medico_id__in=medicos_ids):
+        horarios[(horario.medico_id, horario.dia_semana)].append(horario)
+
+    ocupados = citas_activas(medicos_ids, _inicio_dia(desde), _inicio_dia(hasta + timedelta(days=1)))
+    ahora = timezone.now()
+    libres = {medico_id: [] for medico_id in medicos_ids}
+    for dia in _dias(desde, hasta):
+        for medico_id in medicos_ids:
+            for horario in horarios.get((medico_id, dia.weekday()), ()):
+                duracion = timedelta(minutes=horario.duracion_minutos)
+                turno = timezone.make_aware(datetime.combine(dia, horario.hora_inicio))
+                fin = timezone.make_aware(datetime.combine(dia, horario.hora_fin))
+                while turno + duracion <= fin:
+                    if turno > ahora and not _se_solapa(turno, duracion, ocupados[medico_id]):
+                        libres[medico_id].append(turno)
+                    turno += duracion
+    for turnos in libres.values():
+        turnos.sort()
+    return libres
+
+
+def turnos_libres_medico(medico, desde, hasta):
+    return turnos_libres([medico], desde, hasta)[medico.pk]
+
+
+def turnos_libres_especialidad(especialidad, desde, hasta):
+    """Turnos libres de todos los médicos de una especialidad: {medico_id: [datetime, ...]}."""
+    medicos_ids = list(Medico.objects.filter(especialidades=especialidad).values_list('pk', flat=True))
+    return turnos_libres(medicos_ids, desde, hasta)
+
+
+def problemas_turnos(medico, fechas, excluir=None, excluir_serie=None):
+    """
+    Fechas de `fechas` que no se pueden reservar con el médico, {fecha_hora: mensaje}:
+    las que no son el inicio de uno de sus turnos o chocan con otra de sus citas
+    activas. `excluir` es la cita y `excluir_serie` la serie que se está editando.
+    """
+    if not fechas:
+        return {}
+    horarios = defaultdict(list)
+    for horario in HorarioMedico.objects.filter(medico=medico):
+        horarios[horario.dia_semana].append(horario)
+    duracion_maxima = max(
+        [timedelta(minutes=h.duracion_minutos) for lista in horarios.values() for h in lista],
+        default=DURACION_POR_DEFECTO,
+    )
+    ocupados = citas_activas(
+        [medico.pk], min(fechas) - duracion_maxima, max(fechas) + duracion_maxima,
+        excluir=excluir, excluir_serie=excluir_serie,
+    )[medico.pk]
+
+    problemas = {}
+    for fecha_hora in fechas:
+        local = timezone.localtime(fecha_hora)
+        duracion = DURACION_POR_DEFECTO
+        # Los médicos sin horarios cargados solo se controlan por choque con otras citas
+        if horarios:
+            for horario in horarios.get(local.weekday(), ()):
+                inicio = timezone.make_aware(datetime.combine(local.date(), horario.hora_inicio))
+                fin = timezone.make_aware(datetime.combine(local.date(), horario.hora_fin))
+                duracion = timedelta(minutes=horario.duracion_minutos)
+                if inicio <= fecha_hora and fecha_hora + duracion <= fin and (fecha_hora - inicio) % duracion == timedelta(0):
+                    break
+            else:
+                problemas[fecha_hora] = "El médico no atiende en ese horario. Elige uno de los turnos disponibles."
+                continue
+        if _se_solapa(fecha_hora, duracion, ocupados):
+            problemas[fecha_hora] = "El médico ya tiene una cita en ese horario."
+    return problemas
+
+
+def verificar_disponibilidad(medico, fecha_hora, excluir=None):
+    """
+    Lanza ValidationError si `fecha_hora` no es el inicio de un turno del médico
+    o si choca con otra de sus citas activas. `excluir` es la cita que se está editando.
+    """
+    problema = problemas_turnos(medico, [fecha_hora], excluir=excluir).get(fecha_hora)
+    if problema:
+        raise ValidationError(problema)
@@ -0,0 +1,91 @@
+"""
+Contadores del panel de administración.
+
+Los números de citas salen de una sola consulta agrupada por (médico, estado)
+con conteos condicionales para hoy, la semana y los últimos 30 días; el resto
+se suma en memoria. El resultado queda en caché hasta que una señal de Cita o
+Paciente lo invalida (ver signals.py) o cambia el día.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Cita, Paciente
+
+CLAVE_PANEL_ADMIN = 'gestion_citas:panel_admin'
+# Tope de vida de la caché aunque no haya cambios (las ventanas de tiempo avanzan)
+DURACION_CACHE = 300
+# Ventana usada para pacientes nuevos y tasa de cancelación
+DIAS_RECIENTES = 30
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def calcular_resumen(hoy=None):
+    """Calcula los contadores del panel (2 consultas)."""
+    hoy = hoy or timezone.localdate()
+    inicio_hoy, fin_hoy = _inicio_dia(hoy), _inicio_dia(hoy + timedelta(days=1))
+    lunes = hoy - timedelta(days=hoy.weekday())
+    inicio_semana, fin_semana = _inicio_dia(lunes), _inicio_dia(lunes + timedelta(days=7))
+    inicio_recientes = _inicio_dia(hoy - timedelta(days=DIAS_RECIENTES - 1))
+
+    filas = (
+        Cita.objects
+        .filter(fecha_hora__gte=min(inicio_semana, inicio_recientes), fecha_hora__lt=max(fin_semana, fin_hoy))
+        .values('medico_id', 'medico__usuario__first_name', 'medico__usuario__last_name', 'estado')
+        .annotate(
+            hoy=Count('pk', filter=Q(fecha_hora__gte=inicio_hoy, fecha_hora__lt=fin_hoy)),
+            semana=Count('pk', filter=Q(fecha_hora__gte=inicio_semana, fecha_hora__lt=fin_semana)),
+            recientes=Count('pk', filter=Q(fecha_hora__gte=inicio_recientes, fecha_hora__lt=fin_hoy)),
+        )
+        .order_by()
+    )
+
+    hoy_por_estado = Counter()
+    carga_semana = {}
+    recientes = canceladas = 0
+    for fila in filas:
+        cancelada = fila['estado'] == Cita.CANCELADA
+        if fila['hoy']:
+            hoy_por_estado[fila['estado']] += fila['hoy']
+        # Las citas canceladas no cuentan como carga del médico
+        if fila['semana'] and not cancelada:
+            nombre = f"{fila['medico__usuario__first_name']} {fila['medico__usuario__last_name']}".strip()
+            medico = carga_semana.setdefault(fila['medico_id'], {'medico': nombre, 'citas': 0})
+            medico['citas'] += fila['semana']
+        recientes += fila['recientes']
+        if cancelada:
+            canceladas += fila['recientes']
+
+    pacientes_nuevos = Paciente.objects.filter(usuario__date_joined__gte=inicio_recientes).count()
+
+    return {
+        'fecha': hoy,
+        'citas_hoy': sum(hoy_por_estado.values()),
+        'citas_hoy_por_estado': [(etiqueta, hoy_por_estado[codigo]) for codigo, etiqueta in Cita.ESTADOS if hoy_por_estado[codigo]],
+        'carga_semana': sorted(carga_semana.values(), key=lambda m: (-m['citas'], m['medico'])),
+        'pacientes_nuevos': pacientes_nuevos,
+        'citas_recientes': recientes,
+        'tasa_cancelacion': round(100 * canceladas / recientes, 1) if recientes else 0,
+        'dias_recientes': DIAS_RECIENTES,
+        'generado': timezone.now(),
+    }
+
+
+def resumen_panel_admin():
+    """Devuelve los contadores desde la caché, recalculándolos si no están o son de otro día."""
+    hoy = timezone.localdate()
+    resumen = cache.get(CLAVE_PANEL_ADMIN)
+    if resumen is None or resumen['fecha'] != hoy:
+        resumen = calcular_resumen(hoy)
+        cache.set(CLAVE_PANEL_ADMIN, resumen, DURACION_CACHE)
+    return resumen
+
+
+def invalidar_panel_admin():
+    cache.delete(CLAVE_PANEL_ADMIN)
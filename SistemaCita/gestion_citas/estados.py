@@ -0,0 +1,128 @@
+"""
+Cambios de estado de citas (agenda del médico).
+
+Los estados y las transiciones permitidas están en Cita.ESTADOS y
+Cita.TRANSICIONES; la transición se valida en memoria con el estado ya leído.
+
+Los cambios en lote se validan con una consulta (las citas deben ser del
+médico) y se aplican con un único UPDATE ... WHERE id_cita IN (...) que solo
+toca `estado`. Como .update() no dispara señales, aquí mismo se marca la agenda
+del médico y se invalida el panel de administración; el índice de búsqueda de
+citas no incluye el estado.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, PositiveSmallIntegerField, Value, When
+
+from .estadisticas import invalidar_panel_admin
+from .models import Cita, Medico
+from .signals import marcar_agenda_actualizada
+
+ETIQUETAS_ESTADO = dict(Cita.ESTADOS)
+# Se acepta el código o el nombre del estado (sin importar mayúsculas)
+CODIGOS_ESTADO = {etiqueta.lower(): codigo for codigo, etiqueta in Cita.ESTADOS}
+# Tope de cambios por solicitud
+MAX_CAMBIOS = 200
+
+
+def codigo_estado(valor):
+    """Convierte 2, '2' o 'Confirmada' en el código del estado; None si no existe."""
+    texto = str(valor).strip().lower()
+    if texto.isdigit():
+        return int(texto) if int(texto) in ETIQUETAS_ESTADO else None
+    return CODIGOS_ESTADO.get(texto)
+
+
+def error_transicion(actual, nuevo):
+    return f"Una cita {ETIQUETAS_ESTADO[actual].lower()} no puede pasar a {ETIQUETAS_ESTADO[nuevo].lower()}"
+
+
+def _resultado(cita_id, estado):
+    return {'cita_id': cita_id, 'ok': True, 'estado': estado, 'etiqueta': ETIQUETAS_ESTADO[estado]}
+
+
+def _error(cita_id, mensaje):
+    return {'cita_id': cita_id, 'ok': False, 'error': mensaje}
+
+
+def aplicar_cambios_estado(medico, cambios):
+    """
+    Aplica pares (cita_id, estado) a las citas del médico y devuelve un
+    resultado por par, en el mismo orden. Si una cita aparece varias veces
+    vale el último estado.
+    """
+    pedidos = {}
+    for cita_id, estado in cambios:
+        try:
+            pedidos[int(cita_id)] = codigo_estado(estado)
+        except (TypeError, ValueError):
+            pass
+
+    with transaction.atomic():
+        reactivaciones = False
+        citas = {}
+        if pedidos:
+            # Propiedad y estado actual de todas las citas en una consulta
+            citas = {
+                pk: (estado, fecha_hora)
+                for pk, estado, fecha_hora in Cita.objects.filter(medico=medico, pk__in=pedidos)
+                .values_list('pk', 'estado', 'fecha_hora')
+            }
+            reactivaciones = any(
+                actual == Cita.CANCELADA and pedidos[pk] not in (None, Cita.CANCELADA)
+                for pk, (actual, _) in citas.items()
+            )
+
+        ocupados = set()
+        if reactivaciones:
+            # Volver a activar una cita cancelada puede chocar con otra reserva del mismo turno
+            list(Medico.objects.select_for_update().filter(pk=medico.pk).values_list('pk'))
+            ocupados = set(
+                Cita.objects.filter(medico=medico, fecha_hora__in=[fecha_hora for _, fecha_hora in citas.values()])
+                .exclude(estado=Cita.CANCELADA)
+                .exclude(pk__in=[pk for pk in citas if pedidos[pk] == Cita.CANCELADA])
+                .values_list('fecha_hora', flat=True)
+            )
+
+        resultados, nuevos = [], {}
+        for cita_id, valor in cambios:
+            try:
+                pk = int(cita_id)
+            except (TypeError, ValueError):
+                resultados.append(_error(cita_id, 'Cita inválida'))
+                continue
+            estado = codigo_estado(valor)
+            if estado is None:
+                resultados.append(_error(pk, 'Estado inválido'))
+                continue
+            if pk not in citas:
+                resultados.append(_error(pk, 'No autorizado a modificar esta cita'))
+                continue
+            actual, fecha_hora = citas[pk]
+            if estado != actual and estado not in Cita.TRANSICIONES[actual]:
+                resultados.append(_error(pk, error_transicion(actual, estado)))
+                continue
+            if actual == Cita.CANCELADA and estado != Cita.CANCELADA:
+                if fecha_hora in ocupados:
+                    resultados.append(_error(pk, 'El turno ya está ocupado por otra cita'))
+                    continue
+                ocupados.add(fecha_hora)
+            if estado != actual:
+                nuevos[pk] = estado
+            resultados.append(_resultado(pk, estado))
+
+        if nuevos:
+            try:
+                with transaction.atomic():
+                    Cita.objects.filter(pk__in=nuevos).update(estado=Case(
+                        *[When(pk=pk, then=Value(estado)) for pk, estado in nuevos.items()],
+                        output_field=PositiveSmallIntegerField(),
+                    ))
+            except IntegrityError:
+                # Otra reserva ocupó un turno reactivado: no se aplica ningún cambio
+                return [
+                    _error(r['cita_id'], 'No se pudieron guardar los cambios') if r['ok'] else r
+                    for r in resultados
+                ]
+            marcar_agenda_actualizada(medico.pk)
+            invalidar_panel_admin()
+    return resultados
@@ -0,0 +1,94 @@
+"""
+Exportación de citas a CSV para reportes.
+
+El archivo se genera mientras se descarga (StreamingHttpResponse): las filas se
+leen en lotes de LOTE con values_list, sin crear instancias del modelo, y cada
+lote se escribe y se envía antes de leer el siguiente. La memoria usada no
+depende de cuántas citas se exporten y la descarga empieza con el primer lote.
+
+Los lotes se recorren por cursor sobre (fecha_hora, id_cita), que tiene índice
+(cita_fecha_id_idx), en vez de un solo .iterator(): el backend mssql declara
+can_use_chunked_reads = False, con lo que .iterator() traería todas las filas a
+memoria; además cada consulta es corta y no mantiene abierta una lectura larga.
+"""
+import csv
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Cita
+
+LOTE = 2000
+
+# (encabezado, campo de values_list)
+COLUMNAS = [
+    ('ID', 'id_cita'),
+    ('Fecha', 'fecha_hora'),
+    ('Hora', None),  # Sale de fecha_hora
+    ('Estado', 'estado'),
+    ('Paciente', 'paciente__usuario__first_name'),
+    ('Apellido paciente', 'paciente__usuario__last_name'),
+    ('Correo paciente', 'paciente__usuario__email'),
+    ('Médico', 'medico__usuario__first_name'),
+    ('Apellido médico', 'medico__usuario__last_name'),
+    ('Matrícula', 'medico__matricula'),
+    ('Especialidades', 'medico__especialidades_texto'),
+    ('Motivo', 'motivo'),
+]
+CAMPOS = [campo for _, campo in COLUMNAS if campo]
+
+ETIQUETAS_ESTADO = dict(Cita.ESTADOS)
+# Una celda que empieza con uno de estos caracteres Excel la interpreta como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito en vez de guardarlo (para csv.writer)."""
+
+    def write(self, valor):
+        return valor
+
+
+def _texto(valor):
+    valor = valor or ''
+    return "'" + valor if valor.startswith(_INICIO_FORMULA) else valor
+
+
+def lotes_citas(queryset, lote=LOTE):
+    """Filas de `queryset` (tuplas de CAMPOS) en lotes ordenados por (fecha_hora, id_cita)."""
+    queryset = queryset.order_by('fecha_hora', 'id_cita').values_list(*CAMPOS)
+    filas = list(queryset[:lote])
+    while filas:
+        yield filas
+        if len(filas) < lote:
+            return
+        fecha, id_cita = filas[-1][1], filas[-1][0]
+        filas = list(queryset.filter(Q(fecha_hora__gt=fecha) | Q(fecha_hora=fecha, id_cita__gt=id_cita))[:lote])
+
+
+def filas_csv(queryset):
+    """Líneas CSV (encabezado incluido) de las citas de `queryset`, un lote por elemento."""
+    escritor = csv.writer(_Eco())
+    # BOM: Excel abre el archivo como UTF-8 y muestra bien los acentos
+    yield '\ufeff' + escritor.writerow([encabezado for encabezado, _ in COLUMNAS])
+    zona = timezone.get_current_timezone()
+    for filas in lotes_citas(queryset):
+        lineas = []
+        for (id_cita, fecha_hora, estado, nombre_p, apellido_p, correo_p,
+             nombre_m, apellido_m, matricula, especialidades, motivo) in filas:
+            fecha_hora = fecha_hora.astimezone(zona) if timezone.is_aware(fecha_hora) else fecha_hora
+            lineas.append(escritor.writerow([
+                id_cita, fecha_hora.strftime('%d/%m/%Y'), fecha_hora.strftime('%H:%M'),
+                ETIQUETAS_ESTADO.get(estado, estado),
+                _texto(nombre_p), _texto(apellido_p), _texto(correo_p),
+                _texto(nombre_m), _texto(apellido_m), _texto(matricula), _texto(especialidades),
+                _texto(motivo),
+            ]))
+        yield ''.join(lineas)
+
+
+def respuesta_csv(queryset, nombre_archivo):
+    response = StreamingHttpResponse(filas_csv(queryset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
@@ -3,10 +3,14 @@ from .models import Paciente  # Importa el modelo Paciente
 from .models import Medico  # Importa el modelo Medico
 from .models import Cita  # Importa el modelo Cita
 from .models import Especialidad  # Importa el modelo Especialidad
+from .disponibilidad import verificar_disponibilidad  # Control de turnos libres
+from .opciones import etiqueta_usuario, opciones_especialidades, opciones_medicos, usar_opciones  # Opciones cacheadas de los select
+from .widgets import AutocompletarSelect  # Select con búsqueda para listas grandes
 from django.contrib.auth import get_user_model  # Permite obtener el modelo de usuario activo (personalizado o por defecto)
 from django.utils import timezone  # Proporciona utilidades para manejar fechas y horas con zona horaria
 import re  # Módulo para trabajar con expresiones regulares (validaciones)
 from datetime import date  # Clase date para trabajar con fechas
+from core.forms import MedicoRegistroForm, RegistroForm, validar_email, validar_password, validar_username  # Reglas del registro (importación por CSV)
 
 # Obtiene el modelo de usuario activo (puede ser el modelo User por defecto o uno personalizado)
 User = get_user_model()
@@ -36,7 +40,7 @@ class PacienteForm(forms.ModelForm):  # Formulario basado en el modelo Paciente
                 'placeholder': 'Ejemplo: Calle 5, San Salvador',
                 'required': False
             }),
-            'usuario': forms.Select(attrs={'class': 'form-select', 'required': False}),
+            'usuario': AutocompletarSelect('usuario-paciente', attrs={'class': 'form-select form-control-styled'}),
         }
         # Mensajes personalizados de error
         error_messages = {
@@ -46,12 +50,12 @@ class PacienteForm(forms.ModelForm):  # Formulario basado en el modelo Paciente
             'usuario': {'required': 'Debes indicar el paciente.'},
         }
 
-    def _init_(self, *args, **kwargs):  # Inicializador del formulario
-        super()._init_(*args, **kwargs)
-        # Muestra solo usuarios con rol paciente en el campo usuario
+    def __init__(self, *args, **kwargs):  # Inicializador del formulario
+        super().__init__(*args, **kwargs)
+        # Solo usuarios con rol paciente (se buscan con autocompletado, no se listan todos)
         self.fields['usuario'].queryset = User.objects.filter(rol='paciente')
         # Personaliza cómo se muestran los nombres en el select
-        self.fields['usuario'].label_from_instance = lambda obj: f"{obj.username} ({obj.first_name} {obj.last_name})"
+        self.fields['usuario'].label_from_instance = etiqueta_usuario
 
     def clean_fecha_nacimiento(self):  # Valida que la fecha no sea futura
         fecha = self.cleaned_data.get('fecha_nacimiento')
@@ -91,7 +95,7 @@ class MedicoForm(forms.ModelForm):  # Formulario para registrar o editar médico
             'matricula': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ejemplo: M-12345'}),
             'telefono': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ejemplo: 7777-7777'}),
             'especialidades': forms.SelectMultiple(attrs={'class': 'form-select'}),
-            'usuario': forms.Select(attrs={'class': 'form-select'}),
+            'usuario': AutocompletarSelect('usuario-medico', attrs={'class': 'form-select form-control-styled'}),
         }
         error_messages = {
             'matricula': {'required': 'Debes agregar el número de matrícula.'},
@@ -100,10 +104,11 @@ class MedicoForm(forms.ModelForm):  # Formulario para registrar o editar médico
             'usuario': {'required': 'Debes indicar el médico.'},
         }
 
-    def _init_(self, *args, **kwargs):
-        super()._init_(*args, **kwargs)
-        self.fields['usuario'].queryset = User.objects.filter(rol='medico')  # Muestra solo usuarios médicos
-        self.fields['usuario'].label_from_instance = lambda obj: f"{obj.username} ({obj.first_name} {obj.last_name})"
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['usuario'].queryset = User.objects.filter(rol='medico')  # Solo usuarios médicos (con autocompletado)
+        self.fields['usuario'].label_from_instance = etiqueta_usuario
+        usar_opciones(self.fields['especialidades'], opciones_especialidades())  # Lista cacheada
 
     def clean_matricula(self):  # Valida formato de matrícula
         matricula = self.cleaned_data.get('matricula', '').strip()
@@ -138,7 +143,7 @@ class CitaForm(forms.ModelForm):
             ),
             'motivo': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Describa brevemente el motivo de la cita'}),
             'estado': forms.Select(attrs={'class': 'form-select'}),
-            'paciente': forms.Select(attrs={'class': 'form-select'}),
+            'paciente': AutocompletarSelect('paciente', attrs={'class': 'form-select'}),
             'medico': forms.Select(attrs={'class': 'form-select'}),
         }
         error_messages = {
@@ -151,13 +156,7 @@ class CitaForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['estado'].choices = [
-            ('', '-- Seleccionar --'),
-            ('pendiente', 'Pendiente'),
-            ('confirmada', 'Confirmada'),
-            ('cancelada', 'Cancelada'),
-            ('atendida', 'Atendida'),
-        ]
+        self.fields['estado'].choices = [('', '-- Seleccionar --')] + Cita.ESTADOS
         self.initial.pop('estado', None)
 
 
@@ -167,16 +166,16 @@ class CitaForm(forms.ModelForm):
          fecha_local = timezone.localtime(self.instance.fecha_hora)
          self.fields['fecha_hora'].initial = fecha_local.strftime('%Y-%m-%dT%H:%M')
 
-        self.fields['paciente'].queryset = Paciente.objects.select_related('usuario').all()  # Pacientes con sus usuarios
+        self.fields['paciente'].queryset = Paciente.objects.select_related('usuario').all()  # Solo se consulta el paciente elegido
         self.fields['paciente'].label_from_instance = lambda obj: f"{obj.usuario.first_name} {obj.usuario.last_name}"
-        self.fields['medico'].queryset = Medico.objects.select_related('usuario').all()  # Médicos con sus usuarios
-        self.fields['medico'].label_from_instance = lambda obj: f"Dr(a). {obj.usuario.first_name} {obj.usuario.last_name}"
+        usar_opciones(self.fields['medico'], opciones_medicos())  # Lista cacheada de médicos
 
     def clean_fecha_hora(self):  # Valida que la fecha no sea pasada
         fecha_hora = self.cleaned_data.get('fecha_hora')
         if fecha_hora is None:
             raise forms.ValidationError("Debe ingresar una fecha y hora para la cita.")
-        if fecha_hora < timezone.now():
+        # Una cita pasada se puede seguir editando (ej. marcarla completada) sin mover su fecha
+        if 'fecha_hora' in self.changed_data and fecha_hora < timezone.now():
             raise forms.ValidationError("No puedes registrar una cita en una fecha u hora pasada.")
         return fecha_hora
     
@@ -204,11 +203,26 @@ class CitaForm(forms.ModelForm):
             raise forms.ValidationError("El motivo de la cita debe tener al menos 5 caracteres.")
         return motivo
 
-    def clean(self):  # Valida que no haya campos vacíos
+    def clean(self):  # Valida que no haya campos vacíos y que el turno esté libre
         cleaned_data = super().clean()
         for campo, valor in cleaned_data.items():
             if not valor:
                 raise forms.ValidationError(f"El campo '{campo}' no puede quedar vacío.")
+        estado = cleaned_data.get('estado')
+        # El instance todavía tiene el estado guardado: se valida la transición
+        if estado and self.instance.pk and not self.instance.puede_cambiar_a(estado):
+            self.add_error('estado', f"Una cita {self.instance.get_estado_display().lower()} no puede pasar a {dict(Cita.ESTADOS)[estado].lower()}.")
+        medico = cleaned_data.get('medico')
+        fecha_hora = cleaned_data.get('fecha_hora')
+        # El turno solo se vuelve a verificar si cambia o si se reactiva una cita cancelada:
+        # confirmar o completar una cita no debe fallar porque el horario del médico cambió
+        mueve_turno = 'medico' in self.changed_data or 'fecha_hora' in self.changed_data
+        reactiva = self.instance.pk and self.instance.estado == Cita.CANCELADA
+        if medico and fecha_hora and estado != Cita.CANCELADA and (mueve_turno or reactiva):
+            try:
+                verificar_disponibilidad(medico, fecha_hora, excluir=self.instance.pk)
+            except forms.ValidationError as e:
+                self.add_error('fecha_hora', e)
         return cleaned_data
 
 # ==============================
@@ -285,4 +299,85 @@ class PacientePerfilForm(forms.ModelForm):  # Formulario para que el paciente ed
         for campo, valor in cleaned_data.items():
             if not valor:
                 raise forms.ValidationError(f"El campo '{campo}' no puede quedar vacío.")
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+# ==============================
+# FILAS DE LA IMPORTACIÓN POR CSV
+# ==============================
+# Mismas reglas que el registro y los formularios de arriba, pero sin consultas por fila:
+# la unicidad de usuario, correo y matrícula se comprueba contra los conjuntos de
+# `precargado` (ver importacion.py) y las especialidades contra un diccionario.
+class FilaUsuarioForm(forms.Form):  # Datos del usuario de una fila importada
+    username = forms.CharField(max_length=150)
+    email = forms.CharField(max_length=254)
+    first_name = forms.CharField(max_length=30)
+    last_name = forms.CharField(max_length=30)
+    password = forms.CharField()
+
+    def __init__(self, *args, precargado, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precargado = precargado
+
+    clean_first_name = RegistroForm.clean_first_name
+    clean_last_name = RegistroForm.clean_last_name
+
+    def clean_username(self):
+        username = validar_username(self.cleaned_data.get('username'))
+        if username.lower() in self.precargado.usernames:
+            raise forms.ValidationError("Este nombre de usuario ya está en uso.")
+        return username
+
+    def clean_email(self):
+        email = validar_email(self.cleaned_data.get('email'))
+        if email.lower() in self.precargado.emails:
+            raise forms.ValidationError("Este correo ya está registrado.")
+        return email
+
+    def validate_unique(self):  # La unicidad ya se comprobó contra los conjuntos precargados
+        pass
+
+
+class FilaPacienteForm(FilaUsuarioForm, PacientePerfilForm):  # Usuario + perfil del paciente
+    def clean_password(self):
+        return validar_password(self.cleaned_data.get('password'))
+
+
+class FilaMedicoForm(FilaUsuarioForm, forms.ModelForm):  # Usuario + médico con sus especialidades
+    especialidades = forms.CharField()  # Nombres separados por ';'
+
+    class Meta:
+        model = Medico
+        fields = ['matricula', 'telefono']
+
+    clean_telefono = MedicoForm.clean_telefono
+
+    def clean_username(self):
+        self.cleaned_data['username'] = super().clean_username()
+        return MedicoRegistroForm.clean_username(self)
+
+    def clean_matricula(self):
+        matricula = MedicoForm.clean_matricula(self)
+        if matricula.lower() in self.precargado.matriculas:
+            raise forms.ValidationError("Ya existe un médico con esta matrícula.")
+        return matricula
+
+    def clean_especialidades(self):  # Devuelve la lista de pk de las especialidades
+        nombres = [nombre.strip() for nombre in self.cleaned_data.get('especialidades', '').split(';') if nombre.strip()]
+        desconocidas = [nombre for nombre in nombres if self.precargado.especialidad(nombre) is None]
+        if desconocidas:
+            raise forms.ValidationError(f"Especialidades inexistentes: {', '.join(desconocidas)}.")
+        if not nombres:
+            raise forms.ValidationError("Debes indicar la especialidad.")
+        return list(dict.fromkeys(self.precargado.especialidad(nombre) for nombre in nombres))
+
+
+class ImportarCSVForm(forms.Form):  # Archivo subido desde la página de importación
+    tipo = forms.ChoiceField(
+        choices=[('paciente', 'Pacientes'), ('medico', 'Médicos')],
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    archivo = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}))
+    parcial = forms.BooleanField(
+        required=False, label="Importar las filas válidas aunque otras tengan errores",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
@@ -0,0 +1,189 @@
+"""
+Importación masiva de pacientes y médicos desde CSV.
+
+Cada fila se valida con FilaPacienteForm o FilaMedicoForm (las reglas del
+registro y de los formularios de administración) sin consultar la base de
+datos: los username, correos y matrículas existentes se cargan una vez en
+conjuntos y cada fila válida se agrega a ellos, así también se detectan los
+repetidos dentro del archivo. Las especialidades se buscan por nombre, sin
+importar mayúsculas ni acentos.
+
+Si alguna fila tiene errores no se importa nada, salvo con parcial=True, que
+importa las filas válidas. La inserción va por lotes: las contraseñas del lote
+se calculan en paralelo en un pool de hilos (hashlib libera el GIL mientras
+calcula PBKDF2) y después, en una transacción por lote, bulk_create de los
+usuarios, los perfiles y las especialidades. Si un lote falla (ej. alguien se
+registró con el mismo username durante la importación) se revierte solo ese
+lote y sus filas se informan como error.
+
+bulk_create no dispara señales: al final de cada lote se indexan los registros
+para la búsqueda y al terminar se invalidan las cachés que dependen de ellos.
+"""
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import busqueda
+from .directorio import invalidar_directorio
+from .estadisticas import invalidar_panel_admin
+from .forms import FilaMedicoForm, FilaPacienteForm, FilaUsuarioForm
+from .models import Especialidad, Medico, Paciente
+from .opciones import invalidar_opciones
+
+User = get_user_model()
+
+# Filas por lote: el username__in de cada lote queda lejos del límite de 2100 parámetros de SQL Server
+LOTE = 1000
+
+FORMULARIOS = {
+    'paciente': FilaPacienteForm,
+    'medico': FilaMedicoForm,
+}
+
+
+def columnas(tipo):
+    """Columnas que debe traer el CSV: las del usuario y después las del perfil."""
+    usuario = list(FilaUsuarioForm.base_fields)
+    return usuario + [campo for campo in FORMULARIOS[tipo].base_fields if campo not in usuario]
+
+
+class Precargado:
+    """Valores únicos ya usados (en minúsculas) y especialidades por nombre normalizado."""
+
+    def __init__(self):
+        self.usernames = {u.lower() for u in User.objects.values_list('username', flat=True).iterator(chunk_size=5000)}
+        self.emails = {e.lower() for e in User.objects.exclude(email='').values_list('email', flat=True).iterator(chunk_size=5000)}
+        self.matriculas = {m.lower() for m in Medico.objects.values_list('matricula', flat=True).iterator(chunk_size=5000)}
+        self.nombres_especialidades = dict(Especialidad.objects.values_list('pk', 'nombre'))
+        self.especialidades = {busqueda.normalizar(nombre).strip(): pk for pk, nombre in self.nombres_especialidades.items()}
+
+    def especialidad(self, nombre):
+        return self.especialidades.get(busqueda.normalizar(nombre).strip())
+
+    def agregar(self, datos):
+        self.usernames.add(datos['username'].lower())
+        self.emails.add(datos['email'].lower())
+        if 'matricula' in datos:
+            self.matriculas.add(datos['matricula'].lower())
+
+
+class Resultado:
+    def __init__(self):
+        self.creados = 0
+        self.filas = 0
+        self.errores = []  # [(línea, mensaje)]
+
+    def error(self, linea, mensaje):
+        self.errores.append((linea, mensaje))
+
+
+def leer_csv(archivo, tipo):
+    """Filas del CSV como (línea, dict). Acepta ',' o ';' como separador (Excel en español usa ';')."""
+    muestra = archivo.read(4096)
+    archivo.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra.splitlines()[0] if muestra else '', delimiters=',;')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.DictReader(archivo, dialect=dialecto)
+    encabezados = [(c or '').strip().lower() for c in lector.fieldnames or []]
+    faltantes = [c for c in columnas(tipo) if c not in encabezados]
+    if faltantes:
+        raise ValidationError(f"Faltan columnas en el archivo: {', '.join(faltantes)}.")
+    lector.fieldnames = encabezados
+    for fila in lector:
+        yield lector.line_num, {campo: (valor or '').strip() for campo, valor in fila.items() if campo}
+
+
+def validar(tipo, filas, precargado, resultado):
+    """Datos limpios de las filas válidas, [(línea, cleaned_data)]."""
+    formulario, validas = FORMULARIOS[tipo], []
+    for linea, datos in filas:
+        resultado.filas += 1
+        form = formulario(datos, precargado=precargado)
+        if form.is_valid():
+            precargado.agregar(form.cleaned_data)
+            validas.append((linea, form.cleaned_data))
+        else:
+            for campo, errores in form.errors.items():
+                prefijo = '' if campo == '__all__' else f'{campo}: '
+                resultado.errores += [(linea, prefijo + error) for error in errores]
+    return validas
+
+
+def _usuarios(tipo, filas, hashes):
+    return [
+        User(
+            username=datos['username'], email=datos['email'],
+            first_name=datos['first_name'], last_name=datos['last_name'],
+            password=password, rol=tipo,
+        )
+        for (_, datos), password in zip(filas, hashes)
+    ]
+
+
+def _guardar_lote(tipo, filas, hashes, precargado):
+    """Inserta un lote ya validado en una transacción; devuelve cuántos registros creó."""
+    with transaction.atomic():
+        User.objects.bulk_create(_usuarios(tipo, filas, hashes))
+        # No todos los motores devuelven los pk de bulk_create: se leen por username
+        pks = dict(User.objects.filter(username__in=[datos['username'] for _, datos in filas]).values_list('username', 'pk'))
+        if tipo == 'paciente':
+            Paciente.objects.bulk_create([
+                Paciente(
+                    usuario_id=pks[datos['username']],
+                    fecha_nacimiento=datos['fecha_nacimiento'], telefono=datos['telefono'], direccion=datos['direccion'],
+                )
+                for _, datos in filas
+            ])
+            busqueda.indexar_en_lote('paciente', Paciente.objects.filter(usuario_id__in=list(pks.values())).select_related('usuario'))
+        else:
+            nombres = precargado.nombres_especialidades
+            Medico.objects.bulk_create([
+                Medico(
+                    usuario_id=pks[datos['username']], matricula=datos['matricula'], telefono=datos['telefono'],
+                    especialidades_texto=", ".join(sorted(nombres[pk] for pk in datos['especialidades']))[:255],
+                )
+                for _, datos in filas
+            ])
+            Medico.especialidades.through.objects.bulk_create([
+                Medico.especialidades.through(medico_id=pks[datos['username']], especialidad_id=pk)
+                for _, datos in filas for pk in datos['especialidades']
+            ])
+            busqueda.indexar_en_lote(
+                'medico',
+                Medico.objects.filter(usuario_id__in=list(pks.values())).select_related('usuario').prefetch_related('especialidades'),
+            )
+    return len(filas)
+
+
+def importar(tipo, archivo, parcial=False, lote=LOTE, hilos=None):
+    """
+    Importa pacientes o médicos (`tipo`) desde `archivo` (texto abierto). Devuelve un
+    Resultado con las filas leídas, los registros creados y los errores por línea.
+    """
+    resultado, precargado = Resultado(), Precargado()
+    validas = validar(tipo, leer_csv(archivo, tipo), precargado, resultado)
+    if resultado.errores and not parcial:
+        return resultado
+
+    with ThreadPoolExecutor(max_workers=hilos or os.cpu_count()) as pool:
+        for inicio in range(0, len(validas), lote):
+            filas = validas[inicio:inicio + lote]
+            hashes = list(pool.map(make_password, [datos['password'] for _, datos in filas]))
+            try:
+                resultado.creados += _guardar_lote(tipo, filas, hashes, precargado)
+            except IntegrityError as e:
+                resultado.error(filas[0][0], f"No se importaron las líneas {filas[0][0]} a {filas[-1][0]}: {e}")
+
+    if resultado.creados:
+        invalidar_panel_admin()
+        if tipo == 'medico':
+            invalidar_directorio()
+            invalidar_opciones('medicos')
+    return resultado
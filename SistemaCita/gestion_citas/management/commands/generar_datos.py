@@ -0,0 +1,261 @@
+"""
+Genera datos sintéticos con volumen de producción para pruebas de carga.
+
+Crea especialidades, médicos (con horario de lunes a viernes), pacientes y
+citas con bulk_create por lotes. Con la misma semilla y los mismos parámetros
+el resultado es idéntico, así cada cambio de rendimiento se mide sobre el mismo
+conjunto de datos. Ejemplo a escala de producción:
+
+    python manage.py generar_datos --pacientes 100000 --medicos 500 --citas 5000000
+
+bulk_create no dispara señales, por eso al final se completan a mano lo que
+ellas mantienen: la etiqueta de especialidades del médico, la versión de su
+agenda, el índice de búsqueda y las cachés.
+"""
+import random
+import time as reloj
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion_citas import busqueda
+from gestion_citas.directorio import invalidar_directorio
+from gestion_citas.estadisticas import invalidar_panel_admin
+from gestion_citas.models import Cita, Especialidad, HorarioMedico, Medico, Paciente
+from gestion_citas.opciones import invalidar_opciones
+
+User = get_user_model()
+
+ESPECIALIDADES = [
+    'Medicina General', 'Pediatría', 'Ginecología', 'Cardiología', 'Dermatología', 'Traumatología',
+    'Oftalmología', 'Otorrinolaringología', 'Neurología', 'Psiquiatría', 'Endocrinología',
+    'Gastroenterología', 'Neumología', 'Urología', 'Nefrología', 'Oncología', 'Reumatología',
+    'Nutrición', 'Fisioterapia', 'Odontología',
+]
+NOMBRES = [
+    'José', 'María', 'Juan', 'Ana', 'Carlos', 'Rosa', 'Luis', 'Carmen', 'Jorge', 'Sofía', 'Miguel',
+    'Gabriela', 'David', 'Daniela', 'Francisco', 'Andrea', 'Mario', 'Patricia', 'Ricardo', 'Lucía',
+    'Fernando', 'Elena', 'Roberto', 'Valeria', 'Héctor', 'Claudia', 'Óscar', 'Marta', 'Raúl', 'Beatriz',
+]
+APELLIDOS = [
+    'Hernández', 'López', 'Martínez', 'García', 'Rodríguez', 'Pérez', 'Ramírez', 'Flores', 'Rivera',
+    'Gómez', 'Cruz', 'Reyes', 'Morales', 'Sánchez', 'Castillo', 'Ortiz', 'Mejía', 'Aguilar', 'Romero',
+    'Orellana', 'Escobar', 'Menjívar', 'Portillo', 'Alvarado', 'Chávez', 'Guardado', 'Henríquez',
+]
+MOTIVOS = [
+    'Control general', 'Dolor de cabeza persistente', 'Seguimiento de tratamiento', 'Chequeo anual',
+    'Dolor abdominal', 'Resultados de laboratorio', 'Presión arterial alta', 'Tos y fiebre',
+    'Dolor de espalda', 'Revisión de receta', 'Control prenatal', 'Alergia estacional',
+    'Dolor en las articulaciones', 'Consulta de primera vez', 'Control de diabetes',
+]
+# Bloques de atención de lunes a viernes (el horario de todos los médicos generados)
+BLOQUES = [(time(8, 0), time(12, 0)), (time(13, 0), time(17, 0))]
+DURACION_TURNO = 20
+# Distribución de estados: citas pasadas y futuras
+ESTADOS_PASADAS = ([Cita.COMPLETADA, Cita.CANCELADA, Cita.CONFIRMADA], [80, 12, 8])
+ESTADOS_FUTURAS = ([Cita.PENDIENTE, Cita.CONFIRMADA, Cita.CANCELADA], [60, 30, 10])
+
+
+def turnos_del_dia():
+    """Horas de inicio de los turnos de un día de atención."""
+    turnos = []
+    for inicio, fin in BLOQUES:
+        actual = datetime.combine(date.min, inicio)
+        while actual + timedelta(minutes=DURACION_TURNO) <= datetime.combine(date.min, fin):
+            turnos.append(actual.time())
+            actual += timedelta(minutes=DURACION_TURNO)
+    return turnos
+
+
+class Command(BaseCommand):
+    help = "Genera especialidades, médicos, pacientes y citas sintéticos (deterministas según --semilla)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=1000)
+        parser.add_argument('--medicos', type=int, default=50)
+        parser.add_argument('--especialidades', type=int, default=len(ESPECIALIDADES))
+        parser.add_argument('--citas', type=int, default=20000)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--dias-pasados', type=int, default=1095, help="Historial de citas hacia atrás desde hoy.")
+        parser.add_argument('--dias-futuros', type=int, default=60, help="Citas agendadas hacia adelante desde hoy.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por bulk_create.")
+        parser.add_argument('--prefijo', default='sint', help="Prefijo de los username generados.")
+        parser.add_argument('--sin-indice', action='store_true', help="No llenar el índice de búsqueda.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.prefijo = options['prefijo']
+        self.hoy = timezone.localdate()
+        if User.objects.filter(username__startswith=f'{self.prefijo}_').exists():
+            raise CommandError(
+                f"Ya hay usuarios '{self.prefijo}_*': use otra base (manage.py flush) u otro --prefijo"
+            )
+
+        self.dias = [
+            self.hoy + timedelta(days=i)
+            for i in range(-options['dias_pasados'], options['dias_futuros'] + 1)
+            if (self.hoy + timedelta(days=i)).weekday() < 5
+        ]
+        self.turnos = turnos_del_dia()
+        capacidad = len(self.dias) * len(self.turnos)
+        if options['citas'] and options['medicos'] * capacidad < options['citas'] * 1.6:
+            # Los médicos más solicitados reciben hasta 1,5 veces el promedio
+            raise CommandError(
+                f"{options['citas']} citas no caben en {options['medicos']} médicos con "
+                f"{capacidad} turnos cada uno: aumente --dias-pasados o --medicos"
+            )
+
+        self.password = make_password(f'{self.prefijo.capitalize()}123')
+        especialidades = self.paso("especialidades", self.crear_especialidades, options['especialidades'])
+        medicos = self.paso("médicos", self.crear_medicos, options['medicos'], especialidades)
+        pacientes = self.paso("pacientes", self.crear_pacientes, options['pacientes'])
+        self.paso("citas", self.crear_citas, options['citas'], medicos, pacientes)
+        if not options['sin_indice']:
+            self.paso("términos de búsqueda", self.indexar, especialidades)
+
+        # Lo que mantienen las señales (ver signals.py)
+        self.generados(Medico).update(agenda_actualizada=timezone.now())
+        invalidar_directorio()
+        invalidar_opciones('medicos', 'especialidades')
+        invalidar_panel_admin()
+
+    def paso(self, nombre, funcion, *args):
+        inicio = reloj.perf_counter()
+        resultado = funcion(*args)
+        cantidad = resultado if isinstance(resultado, int) else len(resultado)
+        self.stdout.write(f"{nombre:<22} {cantidad:>10}  ({reloj.perf_counter() - inicio:.1f} s)")
+        return resultado
+
+    def bulk(self, modelo, objetos):
+        return len(modelo.objects.bulk_create(objetos, batch_size=self.lote))
+
+    def generados(self, modelo):
+        # Filtra por el prefijo del username: una lista de pk no cabe en los parámetros de SQL Server
+        letra = 'p' if modelo is Paciente else 'm'
+        return modelo.objects.filter(usuario__username__startswith=f'{self.prefijo}_{letra}')
+
+    # ==============================
+    # PERSONAS Y ESPECIALIDADES
+    # ==============================
+    def crear_especialidades(self, cantidad):
+        nombres = (ESPECIALIDADES + [f'Especialidad {i}' for i in range(len(ESPECIALIDADES), cantidad)])[:cantidad]
+        # Las que ya existen se reutilizan
+        existentes = set(Especialidad.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+        self.bulk(Especialidad, [Especialidad(nombre=n) for n in nombres if n not in existentes])
+        return list(Especialidad.objects.filter(nombre__in=nombres).order_by('nombre').values_list('pk', 'nombre'))
+
+    def crear_usuarios(self, rol, cantidad, letra):
+        """Crea los usuarios por lotes y devuelve sus pk en el orden de creación."""
+        desde = timezone.now() - timedelta(days=3 * 365)
+        for inicio in range(0, cantidad, self.lote):
+            usuarios = []
+            for i in range(inicio, min(inicio + self.lote, cantidad)):
+                nombre, apellido = self.rng.choice(NOMBRES), self.rng.choice(APELLIDOS)
+                username = f'{self.prefijo}_{letra}{i:07d}'
+                usuarios.append(User(
+                    username=username,
+                    first_name=nombre,
+                    last_name=f'{apellido} {self.rng.choice(APELLIDOS)}',
+                    email=f'{username}@ejemplo.com',
+                    password=self.password,
+                    rol=rol,
+                    date_joined=desde + timedelta(minutes=self.rng.randrange(3 * 365 * 24 * 60)),
+                ))
+            User.objects.bulk_create(usuarios)
+        # No todos los motores devuelven los pk de bulk_create: se leen por username
+        return list(
+            User.objects.filter(username__startswith=f'{self.prefijo}_{letra}')
+            .order_by('username').values_list('pk', flat=True)
+        )
+
+    def telefono(self):
+        return f'{self.rng.choice("267")}{self.rng.randrange(100, 1000)}-{self.rng.randrange(1000, 10000)}'
+
+    def crear_medicos(self, cantidad, especialidades):
+        pks = self.crear_usuarios('medico', cantidad, 'm')
+        relaciones, medicos, horarios = [], [], []
+        for i, pk in enumerate(pks):
+            propias = sorted(self.rng.sample(especialidades, min(len(especialidades), self.rng.choice([1, 1, 1, 2, 3]))), key=lambda e: e[1])
+            relaciones += [Medico.especialidades.through(medico_id=pk, especialidad_id=e_pk) for e_pk, _ in propias]
+            medicos.append(Medico(
+                usuario_id=pk,
+                matricula=f'{self.prefijo.upper()}-{i:06d}',
+                telefono=self.telefono(),
+                especialidades_texto=", ".join(nombre for _, nombre in propias)[:255],
+            ))
+            horarios += [
+                HorarioMedico(medico_id=pk, dia_semana=dia, hora_inicio=inicio, hora_fin=fin, duracion_minutos=DURACION_TURNO)
+                for dia in range(5) for inicio, fin in BLOQUES
+            ]
+        self.bulk(Medico, medicos)
+        self.bulk(Medico.especialidades.through, relaciones)
+        self.bulk(HorarioMedico, horarios)
+        return pks
+
+    def crear_pacientes(self, cantidad):
+        pks = self.crear_usuarios('paciente', cantidad, 'p')
+        for inicio in range(0, len(pks), self.lote):
+            self.bulk(Paciente, [
+                Paciente(
+                    usuario_id=pk,
+                    # Edades entre 0 y 90 años, más pacientes adultos que niños o ancianos
+                    fecha_nacimiento=self.hoy - timedelta(days=int(min(90, max(0, self.rng.gauss(40, 18))) * 365.25)),
+                    telefono=self.telefono(),
+                    direccion=f'Calle {self.rng.randrange(1, 200)} #{self.rng.randrange(1, 500)}, Colonia {self.rng.choice(APELLIDOS)}',
+                )
+                for pk in pks[inicio:inicio + self.lote]
+            ])
+        return pks
+
+    # ==============================
+    # CITAS
+    # ==============================
+    def citas_por_medico(self, total, cantidad):
+        """Reparte las citas: unos médicos tienen más demanda que otros (entre 0,5 y 1,5 veces el promedio)."""
+        pesos = [self.rng.uniform(0.5, 1.5) for _ in range(cantidad)]
+        suma = sum(pesos)
+        cuotas = [int(total * p / suma) for p in pesos]
+        for i in range(total - sum(cuotas)):
+            cuotas[i % cantidad] += 1
+        return cuotas
+
+    def crear_citas(self, total, medicos, pacientes):
+        if not total or not medicos or not pacientes:
+            return 0
+        # Pocos pacientes concentran muchas consultas (distribución de Pareto)
+        acumulados = list(accumulate(self.rng.paretovariate(1.5) for _ in pacientes))
+        ahora = timezone.now()
+        # Todos los turnos del período (iguales para todos los médicos), ya con zona horaria
+        fechas = [timezone.make_aware(datetime.combine(dia, turno)) for dia in self.dias for turno in self.turnos]
+        creadas, pendientes = 0, []
+        for medico, cuota in zip(medicos, self.citas_por_medico(total, len(medicos))):
+            # Turnos distintos del médico: nunca se repite (médico, fecha_hora)
+            for indice in sorted(self.rng.sample(range(len(fechas)), cuota)):
+                fecha_hora = fechas[indice]
+                estados, pesos = ESTADOS_PASADAS if fecha_hora < ahora else ESTADOS_FUTURAS
+                pendientes.append(Cita(
+                    medico_id=medico,
+                    paciente_id=self.rng.choices(pacientes, cum_weights=acumulados)[0],
+                    fecha_hora=fecha_hora,
+                    motivo=self.rng.choice(MOTIVOS),
+                    estado=self.rng.choices(estados, pesos)[0],
+                ))
+                if len(pendientes) >= self.lote:
+                    creadas += self.bulk(Cita, pendientes)
+                    pendientes = []
+        return creadas + self.bulk(Cita, pendientes)
+
+    def indexar(self, especialidades):
+        # Las especialidades pueden existir de antes: se reindexan una por una (son pocas)
+        for especialidad in Especialidad.objects.filter(pk__in=[pk for pk, _ in especialidades]):
+            busqueda.indexar('especialidad', especialidad)
+        return sum([
+            busqueda.indexar_en_lote('medico', self.generados(Medico).select_related('usuario').prefetch_related('especialidades'), self.lote),
+            busqueda.indexar_en_lote('paciente', self.generados(Paciente).select_related('usuario'), self.lote),
+            busqueda.indexar_en_lote('cita', Cita.objects.filter(medico__usuario__username__startswith=f'{self.prefijo}_m'), self.lote),
+        ])
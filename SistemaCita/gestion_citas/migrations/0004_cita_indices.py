@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0003_alter_cita_estado_alter_cita_fecha_hora_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cita',
+            options={'ordering': [], 'verbose_name': 'Cita', 'verbose_name_plural': 'Citas'},
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['medico', 'fecha_hora'], name='cita_medico_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['paciente', 'fecha_hora'], name='cita_paciente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['estado', 'fecha_hora'], name='cita_estado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0005_cita_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('paciente', 'Paciente'), ('medico', 'Médico'), ('especialidad', 'Especialidad'), ('cita', 'Cita')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('termino', models.CharField(max_length=50)),
+            ],
+            options={
+                'verbose_name': 'Término de búsqueda',
+                'verbose_name_plural': 'Términos de búsqueda',
+                'indexes': [models.Index(fields=['tipo', 'termino'], name='busqueda_tipo_termino_idx'), models.Index(fields=['tipo', 'objeto_id'], name='busqueda_tipo_objeto_idx')],
+            },
+        ),
+    ]
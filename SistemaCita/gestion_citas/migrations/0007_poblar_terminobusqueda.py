@@ -0,0 +1,89 @@
+import re
+import unicodedata
+
+from django.db import migrations
+from django.utils import timezone
+
+# Copia de las reglas de gestion_citas/busqueda.py al crear el índice: la
+# migración no debe cambiar si más adelante cambia el código de la aplicación
+LARGO_TERMINO = 50
+MAX_TERMINOS = 60
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def terminos(*textos):
+    vistos = []
+    for texto in textos:
+        for termino in _SEPARADORES.split(normalizar(texto)):
+            termino = termino[:LARGO_TERMINO]
+            if termino and termino not in vistos:
+                vistos.append(termino)
+    return vistos[:MAX_TERMINOS]
+
+
+def textos_paciente(paciente):
+    usuario = paciente.usuario
+    return [usuario.first_name, usuario.last_name, usuario.username, usuario.email]
+
+
+def textos_medico(medico):
+    usuario = medico.usuario
+    return [usuario.first_name, usuario.last_name, usuario.username, medico.matricula] + [
+        e.nombre for e in medico.especialidades.all()
+    ]
+
+
+def textos_especialidad(especialidad):
+    return [especialidad.nombre]
+
+
+def textos_cita(cita):
+    fecha = timezone.localtime(cita.fecha_hora) if timezone.is_aware(cita.fecha_hora) else cita.fecha_hora
+    return [fecha.strftime('%d/%m/%Y %Y-%m-%d %H:%M'), cita.motivo]
+
+
+TEXTOS = {
+    'paciente': textos_paciente,
+    'medico': textos_medico,
+    'especialidad': textos_especialidad,
+    'cita': textos_cita,
+}
+
+
+def poblar_indice(apps, schema_editor):
+    # Indexa los registros existentes con las reglas copiadas arriba
+    TerminoBusqueda = apps.get_model('gestion_citas', 'TerminoBusqueda')
+    modelos = {
+        'paciente': apps.get_model('gestion_citas', 'Paciente').objects.select_related('usuario'),
+        'medico': apps.get_model('gestion_citas', 'Medico').objects.select_related('usuario').prefetch_related('especialidades'),
+        'especialidad': apps.get_model('gestion_citas', 'Especialidad').objects.all(),
+        'cita': apps.get_model('gestion_citas', 'Cita').objects.all(),
+    }
+    lote = []
+    for tipo, queryset in modelos.items():
+        for obj in queryset.iterator(chunk_size=2000):
+            lote += [TerminoBusqueda(tipo=tipo, objeto_id=obj.pk, termino=t) for t in terminos(*TEXTOS[tipo](obj))]
+            if len(lote) >= 5000:
+                TerminoBusqueda.objects.bulk_create(lote)
+                lote = []
+    TerminoBusqueda.objects.bulk_create(lote)
+
+
+def vaciar_indice(apps, schema_editor):
+    apps.get_model('gestion_citas', 'TerminoBusqueda').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0006_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_indice, vaciar_indice),
+    ]
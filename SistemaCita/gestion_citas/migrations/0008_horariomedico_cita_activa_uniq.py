@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+
+# Estados que cubre la restricción única: solo las reservas vigentes. Las citas
+# completadas son historial y quedan fuera (nunca se cancelan). Se listan en
+# positivo: los índices filtrados de SQL Server no aceptan NOT en la condición
+ESTADOS_ACTIVOS = ['Pendiente', 'pendiente', 'Confirmada', 'confirmada']
+CONFIRMADAS = ['Confirmada', 'confirmada']
+
+
+def cancelar_citas_duplicadas(apps, schema_editor):
+    # Antes de crear el índice único: de cada (medico, fecha_hora) con varias citas
+    # activas se conserva la confirmada (o la más antigua) y se cancelan las demás
+    Cita = apps.get_model('gestion_citas', 'Cita')
+    activas = Cita.objects.filter(estado__in=ESTADOS_ACTIVOS).order_by()
+    repetidas = (
+        activas.values('medico_id', 'fecha_hora')
+        .annotate(cantidad=Count('id_cita'))
+        .filter(cantidad__gt=1)
+    )
+    for grupo in list(repetidas):
+        citas = activas.filter(medico_id=grupo['medico_id'], fecha_hora=grupo['fecha_hora'])
+        conservada = citas.order_by(
+            Case(When(estado__in=CONFIRMADAS, then=Value(0)), default=Value(1)), 'id_cita',
+        ).values_list('id_cita', flat=True)[0]
+        citas.exclude(id_cita=conservada).update(estado='Cancelada')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0007_poblar_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioMedico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('duracion_minutos', models.PositiveSmallIntegerField(default=30)),
+            ],
+            options={
+                'verbose_name': 'Horario de médico',
+                'verbose_name_plural': 'Horarios de médicos',
+                'ordering': ['medico', 'dia_semana', 'hora_inicio'],
+            },
+        ),
+        migrations.RunPython(cancelar_citas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cita',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ESTADOS_ACTIVOS)), fields=('medico', 'fecha_hora'), name='cita_medico_fecha_activa_uniq', violation_error_message='El médico ya tiene una cita en ese horario.'),
+        ),
+        migrations.AddField(
+            model_name='horariomedico',
+            name='medico',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='gestion_citas.medico'),
+        ),
+        migrations.AddConstraint(
+            model_name='horariomedico',
+            constraint=models.CheckConstraint(condition=models.Q(('hora_fin__gt', models.F('hora_inicio'))), name='horario_fin_posterior_inicio'),
+        ),
+        migrations.AddConstraint(
+            model_name='horariomedico',
+            constraint=models.CheckConstraint(condition=models.Q(('duracion_minutos__gt', 0)), name='horario_duracion_positiva'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0008_horariomedico_cita_activa_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medico',
+            name='agenda_actualizada',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,97 @@
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+from django.db.models.functions import Lower, Trim
+from django.db.models.lookups import Exact
+
+# Textos que se encontraron guardados en Cita.estado y su código nuevo
+# (el formulario de administración guardaba 'atendida' para las citas completadas)
+CODIGOS = {
+    'pendiente': 1,
+    'confirmada': 2,
+    'completada': 3,
+    'atendida': 3,
+    'cancelada': 4,
+}
+ETIQUETAS = {1: 'Pendiente', 2: 'Confirmada', 3: 'Completada', 4: 'Cancelada'}
+# Estados que cubre la restricción única (Pendiente y Confirmada; las completadas
+# son historial), en positivo porque los índices filtrados de SQL Server no
+# aceptan NOT en la condición
+ESTADOS_ACTIVOS = [1, 2]
+
+
+def normalizar_estados(apps, schema_editor):
+    # Un solo UPDATE; cualquier valor desconocido queda como Pendiente
+    Cita = apps.get_model('gestion_citas', 'Cita')
+    Cita.objects.update(estado_codigo=Case(
+        *[When(Exact(Lower(Trim('estado')), texto), then=Value(codigo)) for texto, codigo in CODIGOS.items()],
+        default=Value(1),
+    ))
+
+
+def restaurar_estados(apps, schema_editor):
+    Cita = apps.get_model('gestion_citas', 'Cita')
+    Cita.objects.update(estado=Case(
+        *[When(estado_codigo=codigo, then=Value(etiqueta)) for codigo, etiqueta in ETIQUETAS.items()],
+        default=Value('Pendiente'),
+    ))
+
+
+def cancelar_citas_duplicadas(apps, schema_editor):
+    # Los estados normalizados pueden dejar dos citas activas en el mismo turno:
+    # se conserva la confirmada (o la más antigua) y se cancelan las demás antes
+    # de crear el índice
+    Cita = apps.get_model('gestion_citas', 'Cita')
+    activas = Cita.objects.filter(estado__in=ESTADOS_ACTIVOS).order_by()
+    repetidas = (
+        activas.values('medico_id', 'fecha_hora')
+        .annotate(cantidad=Count('id_cita'))
+        .filter(cantidad__gt=1)
+    )
+    for grupo in list(repetidas):
+        citas = activas.filter(medico_id=grupo['medico_id'], fecha_hora=grupo['fecha_hora'])
+        # 2 = Confirmada va antes que 1 = Pendiente
+        conservada = citas.order_by('-estado', 'id_cita').values_list('id_cita', flat=True)[0]
+        citas.exclude(id_cita=conservada).update(estado=4)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0009_medico_agenda_actualizada'),
+    ]
+
+    operations = [
+        # El índice y la restricción dependen de la columna vieja
+        migrations.RemoveConstraint(
+            model_name='cita',
+            name='cita_medico_fecha_activa_uniq',
+        ),
+        migrations.RemoveIndex(
+            model_name='cita',
+            name='cita_estado_fecha_idx',
+        ),
+        migrations.AddField(
+            model_name='cita',
+            name='estado_codigo',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Pendiente'), (2, 'Confirmada'), (3, 'Completada'), (4, 'Cancelada')], default=1),
+        ),
+        migrations.RunPython(normalizar_estados, restaurar_estados),
+        migrations.RemoveField(
+            model_name='cita',
+            name='estado',
+        ),
+        migrations.RenameField(
+            model_name='cita',
+            old_name='estado_codigo',
+            new_name='estado',
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['estado', 'fecha_hora'], name='cita_estado_fecha_idx'),
+        ),
+        migrations.RunPython(cancelar_citas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cita',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ESTADOS_ACTIVOS)), fields=('medico', 'fecha_hora'), name='cita_medico_fecha_activa_uniq', violation_error_message='El médico ya tiene una cita en ese horario.'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:11
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def poblar_especialidades_texto(apps, schema_editor):
+    # Misma regla que signals.actualizar_especialidades_texto
+    Medico = apps.get_model('gestion_citas', 'Medico')
+    nombres = defaultdict(list)
+    relaciones = (
+        Medico.especialidades.through.objects.order_by('especialidad__nombre')
+        .values_list('medico_id', 'especialidad__nombre')
+    )
+    for medico_id, nombre in relaciones.iterator(chunk_size=2000):
+        nombres[medico_id].append(nombre)
+    for medico_id, lista in nombres.items():
+        Medico.objects.filter(pk=medico_id).update(especialidades_texto=", ".join(lista)[:255])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0010_cita_estado_entero'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medico',
+            name='especialidades_texto',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(poblar_especialidades_texto, migrations.RunPython.noop),
+    ]
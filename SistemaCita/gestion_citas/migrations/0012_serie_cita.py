@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_citas', '0011_medico_especialidades_texto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieCita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('intervalo_semanas', models.PositiveSmallIntegerField(choices=[(1, 'Cada semana'), (2, 'Cada 2 semanas'), (4, 'Cada 4 semanas')], default=1)),
+                ('repeticiones', models.PositiveSmallIntegerField()),
+                ('motivo', models.TextField()),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='gestion_citas.medico')),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='gestion_citas.paciente')),
+            ],
+            options={
+                'verbose_name': 'Serie de citas',
+                'verbose_name_plural': 'Series de citas',
+                'ordering': [],
+            },
+        ),
+        migrations.AddField(
+            model_name='cita',
+            name='serie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='citas', to='gestion_citas.seriecita'),
+        ),
+    ]
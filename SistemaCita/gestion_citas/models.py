@@ -43,6 +43,11 @@ class Medico(models.Model):
     telefono = models.CharField(max_length=20)
     # Relación Muchos a Muchos con Especialidad
     especialidades = models.ManyToManyField(Especialidad) 
+    # Nombres de las especialidades separados por coma; copia que mantienen las señales
+    # (signals.py) para que __str__ no consulte la tabla intermedia por cada médico
+    especialidades_texto = models.CharField(max_length=255, blank=True, default='', editable=False)
+    # Última modificación de la agenda (citas u horarios); valida la caché de los turnos libres
+    agenda_actualizada = models.DateTimeField(null=True, blank=True, editable=False)
     
     #Ajuste a la tabla y modelos => 's o => oes
     class Meta:
@@ -53,28 +58,155 @@ class Medico(models.Model):
     def __str__(self):
         nombres = f"{self.usuario.first_name}" if self.usuario.first_name else ""
         apellidos = f" {self.usuario.last_name}" if self.usuario.last_name else ""
-        especialidades = ", ".join(e.nombre for e in self.especialidades.all()) if self.pk else ""
-        if especialidades:
-            return f"Dr(a). {nombres}{apellidos} ({especialidades})"
+        if self.especialidades_texto:
+            return f"Dr(a). {nombres}{apellidos} ({self.especialidades_texto})"
         return f"Dr(a). {nombres}{apellidos}"
 
+# Modelo SerieCita (citas periódicas reservadas juntas, ej. todos los martes 9:00 durante 12 semanas)
+class SerieCita(models.Model):
+    INTERVALOS = [
+        (1, 'Cada semana'),
+        (2, 'Cada 2 semanas'),
+        (4, 'Cada 4 semanas'),
+    ]
+
+    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='series')
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='series')
+    inicio = models.DateTimeField() # Fecha y hora de la primera cita; las demás mantienen la hora local
+    intervalo_semanas = models.PositiveSmallIntegerField(choices=INTERVALOS, default=1)
+    repeticiones = models.PositiveSmallIntegerField()
+    motivo = models.TextField()
+    creada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Serie de citas"
+        verbose_name_plural = "Series de citas"
+        ordering = []
+
+    def __str__(self):
+        return f"Serie {self.pk} - {self.get_intervalo_semanas_display().lower()} x{self.repeticiones}"
+
 # Modelo Cita
 class Cita(models.Model):
+    # Estados de la cita (se guardan como entero pequeño)
+    PENDIENTE = 1
+    CONFIRMADA = 2
+    COMPLETADA = 3
+    CANCELADA = 4
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (CONFIRMADA, 'Confirmada'),
+        (COMPLETADA, 'Completada'),
+        (CANCELADA, 'Cancelada'),
+    ]
+    # Cambios de estado permitidos desde cada estado (Completada es final;
+    # una cita cancelada solo puede volver a Pendiente)
+    TRANSICIONES = {
+        PENDIENTE: {CONFIRMADA, COMPLETADA, CANCELADA},
+        CONFIRMADA: {PENDIENTE, COMPLETADA, CANCELADA},
+        COMPLETADA: set(),
+        CANCELADA: {PENDIENTE},
+    }
+
     id_cita = models.AutoField(primary_key=True)
     fecha_hora = models.DateTimeField() # Un solo campo para fecha y hora
     motivo = models.TextField()
-    estado = models.CharField(max_length=20, default='Pendiente')
+    estado = models.PositiveSmallIntegerField(choices=ESTADOS, default=PENDIENTE)
     
     #Ajuste a la tabla y modelos => 's o =>
     class Meta:
         verbose_name = "Cita"
         verbose_name_plural = "Citas"
-        ordering = ['estado'] #ordenar por nombre
+        # Sin ordenamiento por defecto: cada vista define su propio order_by
+        # para no forzar un ORDER BY en todas las consultas de Cita
+        ordering = []
+        # Un médico no puede tener dos citas pendientes o confirmadas que empiecen a
+        # la misma hora (las reservas se alinean a los turnos del médico, ver
+        # disponibilidad.py). Las completadas son historial y quedan fuera.
+        # La condición va en positivo: los índices filtrados de SQL Server no aceptan NOT
+        constraints = [
+            models.UniqueConstraint(
+                fields=['medico', 'fecha_hora'],
+                condition=models.Q(estado__in=[1, 2]), # Cita.PENDIENTE, Cita.CONFIRMADA
+                name='cita_medico_fecha_activa_uniq',
+                violation_error_message='El médico ya tiene una cita en ese horario.',
+            ),
+        ]
+        # Índices compuestos para las rutas de acceso más usadas
+        indexes = [
+            models.Index(fields=['medico', 'fecha_hora'], name='cita_medico_fecha_idx'), # Agenda del médico
+            models.Index(fields=['paciente', 'fecha_hora'], name='cita_paciente_fecha_idx'), # Citas del paciente
+            models.Index(fields=['estado', 'fecha_hora'], name='cita_estado_fecha_idx'), # Filtros por estado
+            models.Index(fields=['fecha_hora', 'id_cita'], name='cita_fecha_id_idx'), # Paginación por cursor del listado
+        ]
 
     # Relación Uno a Muchos (1:N) con Paciente
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='citas_paciente')
     # Relación Uno a Muchos (1:N) con Medico
     medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='citas_medico')
+    # Serie a la que pertenece la cita, si se reservó como cita periódica
+    serie = models.ForeignKey(SerieCita, on_delete=models.SET_NULL, null=True, blank=True, related_name='citas')
     
     def __str__(self):
-        return f"Cita {self.id_cita} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"Cita {self.id_cita} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M')}"
+
+    def puede_cambiar_a(self, estado):
+        # Mantener el estado actual siempre es válido
+        return estado == self.estado or estado in self.TRANSICIONES.get(self.estado, ())
+
+
+# Modelo HorarioMedico (bloques de atención semanales de cada médico)
+class HorarioMedico(models.Model):
+    DIAS_SEMANA = [
+        (0, 'Lunes'),
+        (1, 'Martes'),
+        (2, 'Miércoles'),
+        (3, 'Jueves'),
+        (4, 'Viernes'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+
+    medico = models.ForeignKey(Medico, on_delete=models.CASCADE, related_name='horarios')
+    dia_semana = models.PositiveSmallIntegerField(choices=DIAS_SEMANA) # 0 = lunes, como date.weekday()
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    duracion_minutos = models.PositiveSmallIntegerField(default=30) # Duración de cada turno
+
+    class Meta:
+        verbose_name = "Horario de médico"
+        verbose_name_plural = "Horarios de médicos"
+        ordering = ['medico', 'dia_semana', 'hora_inicio']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(hora_fin__gt=models.F('hora_inicio')), name='horario_fin_posterior_inicio'),
+            models.CheckConstraint(condition=models.Q(duracion_minutos__gt=0), name='horario_duracion_positiva'),
+        ]
+
+    def __str__(self):
+        return f"{self.medico_id} {self.get_dia_semana_display()} {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M}"
+
+# Índice de búsqueda (tabla auxiliar)
+class TerminoBusqueda(models.Model):
+    # Cada fila es un término normalizado (minúsculas, sin acentos) de un registro buscable.
+    # Las búsquedas por prefijo se resuelven con un rango sobre (tipo, termino) en lugar de LIKE '%...%'
+    TIPOS = [
+        ('paciente', 'Paciente'),
+        ('medico', 'Médico'),
+        ('especialidad', 'Especialidad'),
+        ('cita', 'Cita'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    objeto_id = models.BigIntegerField() # PK del registro indexado
+    termino = models.CharField(max_length=50)
+
+    class Meta:
+        verbose_name = "Término de búsqueda"
+        verbose_name_plural = "Términos de búsqueda"
+        indexes = [
+            models.Index(fields=['tipo', 'termino'], name='busqueda_tipo_termino_idx'), # Búsqueda por prefijo
+            models.Index(fields=['tipo', 'objeto_id'], name='busqueda_tipo_objeto_idx'), # Reindexado de un registro
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}:{self.objeto_id} {self.termino}"
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Opciones de los <select> de los formularios.
+
+- Médicos y especialidades (pocos registros): la lista (pk, etiqueta) se guarda
+  en caché con una versión que las señales incrementan al modificar médicos,
+  usuarios o especialidades (ver signals.py), más un tiempo de vida corto.
+- Pacientes y usuarios (pueden ser decenas de miles): no se listan; el widget
+  AutocompletarSelect pide sugerencias a `sugerencias()` mientras se escribe.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from . import busqueda
+from .models import Especialidad, Medico, Paciente
+
+User = get_user_model()
+
+# Segundos que vive una lista de opciones aunque no cambie su versión
+DURACION_OPCIONES = 60
+# Máximo de sugerencias por búsqueda
+LIMITE_SUGERENCIAS = 20
+# Segundos que se reutiliza la respuesta del autocompletado (compartida por los administradores)
+DURACION_SUGERENCIAS = 15
+
+
+# ==============================
+# LISTAS CACHEADAS Y VERSIONADAS
+# ==============================
+def _clave_version(nombre):
+    return f'gestion_citas:opciones:{nombre}:version'
+
+
+def version_opciones(nombre):
+    # La versión inicial es la hora actual para no reutilizar listas viejas si la clave se pierde
+    return cache.get_or_set(_clave_version(nombre), time.time_ns, None)
+
+
+def invalidar_opciones(*nombres):
+    for nombre in nombres:
+        try:
+            cache.incr(_clave_version(nombre))
+        except ValueError:
+            cache.set(_clave_version(nombre), time.time_ns(), None)
+
+
+def _opciones(nombre, construir):
+    clave = f'gestion_citas:opciones:{nombre}:{version_opciones(nombre)}'
+    return cache.get_or_set(clave, construir, DURACION_OPCIONES)
+
+
+def opciones_medicos():
+    """[(pk, 'Dr(a). Nombre Apellido (Especialidades)'), ...] de todos los médicos."""
+    return _opciones('medicos', lambda: [(medico.pk, str(medico)) for medico in Medico.objects.select_related('usuario')])
+
+
+def opciones_especialidades():
+    """[(pk, nombre), ...] de todas las especialidades."""
+    return _opciones('especialidades', lambda: list(Especialidad.objects.values_list('pk', 'nombre')))
+
+
+def usar_opciones(campo, opciones):
+    """
+    Renderiza un ModelChoiceField con una lista ya calculada en lugar de recorrer
+    su queryset; el queryset se sigue usando para validar el valor enviado.
+    """
+    vacia = [('', campo.empty_label)] if getattr(campo, 'empty_label', None) is not None else []
+    campo.choices = vacia + list(opciones)
+
+
+# ==============================
+# SUGERENCIAS PARA AUTOCOMPLETAR
+# ==============================
+def etiqueta_usuario(usuario):
+    return f"{usuario.username} ({usuario.first_name} {usuario.last_name})"
+
+
+def _sugerir_pacientes(consulta):
+    pacientes = busqueda.filtrar(Paciente.objects.select_related('usuario'), consulta, 'paciente')
+    return [(p.pk, str(p)) for p in pacientes.order_by('usuario__first_name', 'usuario__last_name', 'pk')[:LIMITE_SUGERENCIAS]]
+
+
+def _sugeridor_usuarios(rol):
+    def sugerir(consulta):
+        usuarios = User.objects.filter(rol=rol)
+        # Cada palabra debe ser prefijo del usuario, el nombre o el apellido, igual que
+        # en busqueda.ids_con_prefijo: LIKE 'palabra%' sin comodín inicial ni UPPER()
+        # sobre la columna, así SQL Server puede usar el índice. La intercalación por
+        # defecto de SQL Server (y el LIKE de SQLite) ya ignora mayúsculas
+        for palabra in consulta.split():
+            usuarios = usuarios.filter(
+                Q(username__startswith=palabra) | Q(first_name__startswith=palabra) | Q(last_name__startswith=palabra)
+            )
+        return [(u.pk, etiqueta_usuario(u)) for u in usuarios.order_by('username')[:LIMITE_SUGERENCIAS]]
+    return sugerir
+
+
+# Fuente -> función de búsqueda. Todas son solo para administradores.
+FUENTES = {
+    'paciente': _sugerir_pacientes,
+    'usuario-paciente': _sugeridor_usuarios('paciente'),
+    'usuario-medico': _sugeridor_usuarios('medico'),
+}
+
+
+def sugerencias(fuente, consulta):
+    """[{'id': pk, 'texto': etiqueta}, ...] para la consulta; vacío si tiene menos de 2 caracteres."""
+    if len(consulta.strip()) < 2:
+        return []
+    return [{'id': pk, 'texto': texto} for pk, texto in FUENTES[fuente](consulta)]
@@ -0,0 +1,154 @@
+"""
+Series de citas periódicas (ej. todos los martes 9:00 durante 12 semanas).
+
+Las fechas de la serie se generan con la misma hora local cada
+`intervalo_semanas` semanas y se verifican todas juntas con
+disponibilidad.problemas_turnos (dos consultas, sin importar cuántas sean). La
+reserva toma el mismo bloqueo sobre el médico que ReservaCitaMixin, vuelve a
+verificar y crea las citas con un solo bulk_create.
+
+La serie se modifica (motivo u hora) o se cancela entera con un único UPDATE
+sobre sus citas futuras que siguen activas; las pasadas, completadas o ya
+canceladas no se tocan. Como bulk_create y .update() no disparan señales, aquí
+mismo se indexan las citas para la búsqueda, se marca la agenda del médico y
+se invalida el panel de administración.
+"""
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import busqueda
+from .disponibilidad import problemas_turnos
+from .estadisticas import invalidar_panel_admin
+from .models import Cita, Medico, SerieCita, TerminoBusqueda
+from .signals import marcar_agenda_actualizada
+
+# Tope de citas por serie (un año de citas semanales)
+MAX_REPETICIONES = 52
+
+
+def fechas_serie(inicio, repeticiones, intervalo_semanas=1):
+    """Fechas de la serie: la hora local de `inicio` cada `intervalo_semanas` semanas."""
+    local = timezone.localtime(inicio)
+    return [
+        timezone.make_aware(datetime.combine(local.date() + timedelta(weeks=intervalo_semanas * i), local.time()))
+        for i in range(repeticiones)
+    ]
+
+
+def previsualizar(medico, inicio, repeticiones, intervalo_semanas=1):
+    """[(fecha_hora, mensaje)] de la serie; el mensaje es None si el turno está libre."""
+    fechas = fechas_serie(inicio, repeticiones, intervalo_semanas)
+    problemas = problemas_turnos(medico, fechas)
+    ahora = timezone.now()
+    return [
+        (fecha, "La fecha ya pasó." if fecha < ahora else problemas.get(fecha))
+        for fecha in fechas
+    ]
+
+
+def _mensaje_problemas(problemas):
+    return [
+        f"{timezone.localtime(fecha):%d/%m/%Y %H:%M}: {mensaje}"
+        for fecha, mensaje in sorted(problemas.items())
+    ]
+
+
+def _bloquear_medico(medico_id):
+    list(Medico.objects.select_for_update().filter(pk=medico_id).values_list('pk'))
+
+
+def _reindexar(citas):
+    # Los términos de la cita incluyen la fecha y el motivo
+    TerminoBusqueda.objects.filter(tipo='cita', objeto_id__in=citas.values('pk')).delete()
+    busqueda.indexar_en_lote('cita', citas)
+
+
+def fechas_libres(medico, fechas, omitir_ocupadas=False):
+    """
+    Fechas de `fechas` que se pueden reservar. Lanza ValidationError con todas
+    las que no, salvo con omitir_ocupadas, que las descarta; o si no queda ninguna.
+    """
+    problemas = problemas_turnos(medico, fechas)
+    ahora = timezone.now()
+    problemas.update({fecha: "La fecha ya pasó." for fecha in fechas if fecha < ahora})
+    if problemas and not omitir_ocupadas:
+        raise ValidationError(_mensaje_problemas(problemas))
+    libres = [fecha for fecha in fechas if fecha not in problemas]
+    if not libres:
+        raise ValidationError("Ninguna fecha de la serie está disponible.")
+    return libres
+
+
+def reservar_serie(paciente, medico, inicio, repeticiones, intervalo_semanas, motivo, omitir_ocupadas=False):
+    """
+    Reserva la serie y devuelve (serie, citas creadas). Si alguna fecha no está
+    disponible lanza ValidationError con todas ellas, salvo con omitir_ocupadas,
+    que reserva solo las libres.
+    """
+    fechas = fechas_serie(inicio, repeticiones, intervalo_semanas)
+    with transaction.atomic():
+        # Mismo bloqueo que ReservaCitaMixin: las reservas del médico se serializan
+        _bloquear_medico(medico.pk)
+        libres = fechas_libres(medico, fechas, omitir_ocupadas)
+
+        serie = SerieCita.objects.create(
+            paciente=paciente, medico=medico, inicio=libres[0],
+            intervalo_semanas=intervalo_semanas, repeticiones=len(libres), motivo=motivo,
+        )
+        Cita.objects.bulk_create([
+            Cita(paciente=paciente, medico=medico, serie=serie, fecha_hora=fecha, motivo=motivo)
+            for fecha in libres
+        ])
+        # No todos los motores devuelven los pk de bulk_create: se indexan por serie
+        busqueda.indexar_en_lote('cita', serie.citas.all())
+    marcar_agenda_actualizada(medico.pk)
+    invalidar_panel_admin()
+    return serie, len(libres)
+
+
+def citas_pendientes(serie):
+    """Citas de la serie que todavía se pueden modificar o cancelar."""
+    return serie.citas.filter(
+        fecha_hora__gt=timezone.now(), estado__in=[Cita.PENDIENTE, Cita.CONFIRMADA],
+    )
+
+
+def modificar_serie(serie, motivo, hora):
+    """
+    Cambia el motivo y la hora (`hora` local) de las citas pendientes de la serie
+    con un solo UPDATE. Las citas movidas una por una se corren lo mismo que la
+    serie. Devuelve cuántas citas se modificaron.
+    """
+    inicio = timezone.localtime(serie.inicio)
+    desplazamiento = timezone.make_aware(datetime.combine(inicio.date(), hora)) - serie.inicio
+    with transaction.atomic():
+        _bloquear_medico(serie.medico_id)
+        citas = citas_pendientes(serie)
+        if desplazamiento:
+            nuevas = [fecha + desplazamiento for fecha in citas.values_list('fecha_hora', flat=True)]
+            problemas = problemas_turnos(serie.medico, nuevas, excluir_serie=serie.pk)
+            ahora = timezone.now()
+            problemas.update({fecha: "La fecha ya pasó." for fecha in nuevas if fecha < ahora})
+            if problemas:
+                raise ValidationError(_mensaje_problemas(problemas))
+        modificadas = citas.update(motivo=motivo, fecha_hora=F('fecha_hora') + desplazamiento)
+        serie.motivo, serie.inicio = motivo, serie.inicio + desplazamiento
+        serie.save(update_fields=['motivo', 'inicio'])
+        _reindexar(serie.citas.all())
+    marcar_agenda_actualizada(serie.medico_id)
+    invalidar_panel_admin()
+    return modificadas
+
+
+def cancelar_serie(serie):
+    """Cancela con un solo UPDATE las citas pendientes de la serie; devuelve cuántas."""
+    canceladas = citas_pendientes(serie).update(estado=Cita.CANCELADA)
+    if canceladas:
+        # El índice de búsqueda de citas no incluye el estado
+        marcar_agenda_actualizada(serie.medico_id)
+        invalidar_panel_admin()
+    return canceladas
@@ -0,0 +1,242 @@
+"""Señales que mantienen actualizados el índice de búsqueda (ver busqueda.py), la etiqueta de especialidades y la versión de la agenda de cada médico, y las cachés del panel de administración, de las opciones de los formularios y del directorio de médicos."""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, CharField, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import busqueda
+from .directorio import invalidar_directorio
+from .estadisticas import invalidar_panel_admin
+from .opciones import invalidar_opciones
+from .models import Cita, Especialidad, HorarioMedico, Medico, Paciente
+
+User = get_user_model()
+
+# Campos del usuario que forman parte del índice de pacientes y médicos
+CAMPOS_USUARIO_INDEXADOS = {'first_name', 'last_name', 'username', 'email'}
+# Campos de la cita de los que depende su índice
+CAMPOS_CITA_INDEXADOS = {'fecha_hora', 'motivo', 'medico', 'medico_id', 'paciente', 'paciente_id'}
+# Campos del usuario que se muestran en el directorio de médicos
+CAMPOS_USUARIO_DIRECTORIO = {'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Paciente)
+def indexar_paciente(sender, instance, **kwargs):
+    busqueda.indexar('paciente', instance)
+
+
+@receiver(post_save, sender=Medico)
+def indexar_medico(sender, instance, **kwargs):
+    busqueda.indexar('medico', instance)
+
+
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+def indexar_especialidades_medico(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Medico):
+        busqueda.indexar('medico', instance)
+
+
+@receiver(post_save, sender=Especialidad)
+def indexar_especialidad(sender, instance, **kwargs):
+    busqueda.indexar('especialidad', instance)
+    # El nombre de la especialidad también está en el índice de sus médicos
+    for medico in instance.medico_set.select_related('usuario').prefetch_related('especialidades'):
+        busqueda.indexar('medico', medico)
+
+
+@receiver(post_save, sender=Cita)
+def indexar_cita(sender, instance, update_fields=None, **kwargs):
+    # Guardados parciales que no tocan los datos indexados (ej. solo el estado) no reindexan
+    if update_fields is not None and not CAMPOS_CITA_INDEXADOS & set(update_fields):
+        return
+    busqueda.indexar('cita', instance)
+
+
+@receiver(post_save, sender=User)
+def indexar_usuario(sender, instance, update_fields=None, **kwargs):
+    # Guardados parciales que no tocan el nombre (ej. last_login al iniciar sesión) no reindexan
+    if update_fields is not None and not CAMPOS_USUARIO_INDEXADOS & set(update_fields):
+        return
+    paciente = Paciente.objects.filter(usuario=instance).first()
+    if paciente:
+        busqueda.indexar('paciente', paciente)
+    medico = Medico.objects.filter(usuario=instance).prefetch_related('especialidades').first()
+    if medico:
+        busqueda.indexar('medico', medico)
+
+
+@receiver(post_delete, sender=Paciente)
+def desindexar_paciente(sender, instance, **kwargs):
+    busqueda.desindexar('paciente', instance.pk)
+
+
+@receiver(post_delete, sender=Medico)
+def desindexar_medico(sender, instance, **kwargs):
+    busqueda.desindexar('medico', instance.pk)
+
+
+@receiver(post_delete, sender=Especialidad)
+def desindexar_especialidad(sender, instance, **kwargs):
+    busqueda.desindexar('especialidad', instance.pk)
+
+
+@receiver(post_delete, sender=Cita)
+def desindexar_cita(sender, instance, **kwargs):
+    busqueda.desindexar('cita', instance.pk)
+
+
+
+# ==============================
+# ETIQUETA DE ESPECIALIDADES DEL MÉDICO
+# ==============================
+# Médicos por UPDATE al recalcular la etiqueta
+LOTE_ESPECIALIDADES_TEXTO = 500
+
+
+def actualizar_especialidades_texto(*medicos_ids):
+    """Recalcula Medico.especialidades_texto de los médicos indicados (una lectura de la tabla intermedia)."""
+    medicos_ids = {pk for pk in medicos_ids if pk}
+    if not medicos_ids:
+        return {}
+    nombres = defaultdict(list)
+    relaciones = (
+        Medico.especialidades.through.objects.filter(medico_id__in=medicos_ids)
+        .order_by('especialidad__nombre')
+        .values_list('medico_id', 'especialidad__nombre')
+    )
+    for medico_id, nombre in relaciones:
+        nombres[medico_id].append(nombre)
+    textos = {pk: ", ".join(nombres[pk])[:255] for pk in medicos_ids}
+    # Un UPDATE con CASE por lote; cada médico usa 3 parámetros, lejos del límite de 2100 de SQL Server
+    pks = sorted(textos)
+    for inicio in range(0, len(pks), LOTE_ESPECIALIDADES_TEXTO):
+        lote = pks[inicio:inicio + LOTE_ESPECIALIDADES_TEXTO]
+        Medico.objects.filter(pk__in=lote).update(especialidades_texto=Case(
+            *[When(pk=pk, then=Value(textos[pk])) for pk in lote],
+            output_field=CharField(),
+        ))
+    return textos
+
+
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+def etiqueta_especialidades_medico(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # medico.especialidades.add/remove/clear/set
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.especialidades_texto = actualizar_especialidades_texto(instance.pk)[instance.pk]
+    elif action == 'pre_clear':
+        # especialidad.medico_set.clear(): se recuerdan los médicos antes de borrar la relación
+        instance._medicos_afectados = list(instance.medico_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        actualizar_especialidades_texto(*pk_set)
+    elif action == 'post_clear':
+        actualizar_especialidades_texto(*getattr(instance, '_medicos_afectados', ()))
+
+
+@receiver(post_save, sender=Especialidad)
+def etiqueta_especialidad_renombrada(sender, instance, created, **kwargs):
+    if not created:
+        actualizar_especialidades_texto(*instance.medico_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Especialidad)
+def recordar_medicos_especialidad(sender, instance, **kwargs):
+    # Al borrar la especialidad la relación se elimina en cascada sin m2m_changed
+    instance._medicos_afectados = list(instance.medico_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Especialidad)
+def etiqueta_especialidad_eliminada(sender, instance, **kwargs):
+    actualizar_especialidades_texto(*instance._medicos_afectados)
+
+
+# ==============================
+# VERSIÓN DE LA AGENDA DEL MÉDICO
+# ==============================
+def marcar_agenda_actualizada(*medicos_ids):
+    """Registra que cambió la agenda de los médicos (invalida el ETag de sus turnos libres)."""
+    Medico.objects.filter(pk__in={pk for pk in medicos_ids if pk}).update(agenda_actualizada=timezone.now())
+
+
+@receiver(post_init, sender=Cita)
+def recordar_medico_cita(sender, instance, **kwargs):
+    # Si la cita cambia de médico también hay que marcar la agenda del anterior
+    instance._medico_id_original = instance.medico_id
+
+
+@receiver(post_save, sender=Cita)
+def agenda_cita_guardada(sender, instance, **kwargs):
+    marcar_agenda_actualizada(instance.medico_id, instance._medico_id_original)
+    instance._medico_id_original = instance.medico_id
+
+
+@receiver(post_delete, sender=Cita)
+def agenda_cita_eliminada(sender, instance, **kwargs):
+    marcar_agenda_actualizada(instance.medico_id)
+
+
+@receiver(post_save, sender=HorarioMedico)
+@receiver(post_delete, sender=HorarioMedico)
+def agenda_horario_modificado(sender, instance, **kwargs):
+    marcar_agenda_actualizada(instance.medico_id)
+
+
+# ==============================
+# CACHÉ DEL PANEL DE ADMINISTRACIÓN
+# ==============================
+@receiver(post_save, sender=Cita)
+@receiver(post_delete, sender=Cita)
+@receiver(post_save, sender=Paciente)
+@receiver(post_delete, sender=Paciente)
+def panel_admin_modificado(sender, **kwargs):
+    invalidar_panel_admin()
+
+
+# ==============================
+# CACHÉ DE OPCIONES DE LOS FORMULARIOS
+# ==============================
+@receiver(post_save, sender=Medico)
+@receiver(post_delete, sender=Medico)
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+def opciones_medicos_modificadas(sender, **kwargs):
+    invalidar_opciones('medicos')
+
+
+@receiver(post_save, sender=Especialidad)
+@receiver(post_delete, sender=Especialidad)
+def opciones_especialidades_modificadas(sender, **kwargs):
+    # La etiqueta de los médicos incluye el nombre de sus especialidades
+    invalidar_opciones('especialidades', 'medicos')
+
+
+@receiver(post_save, sender=User)
+def opciones_usuario_modificado(sender, instance, update_fields=None, **kwargs):
+    if instance.rol != 'medico':
+        return
+    if update_fields is not None and not CAMPOS_USUARIO_INDEXADOS & set(update_fields):
+        return
+    invalidar_opciones('medicos')
+
+
+# ==============================
+# CACHÉ DEL DIRECTORIO DE MÉDICOS
+# ==============================
+@receiver(post_save, sender=Medico)
+@receiver(post_delete, sender=Medico)
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+@receiver(post_save, sender=Especialidad)
+@receiver(post_delete, sender=Especialidad)
+def directorio_modificado(sender, **kwargs):
+    invalidar_directorio()
+
+
+@receiver(post_save, sender=User)
+def directorio_usuario_modificado(sender, instance, update_fields=None, **kwargs):
+    if instance.rol != 'medico':
+        return
+    if update_fields is not None and not CAMPOS_USUARIO_DIRECTORIO & set(update_fields):
+        return
+    invalidar_directorio()
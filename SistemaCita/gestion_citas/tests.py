@@ -1,3 +1,745 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.forms import PacienteCitaForm
+from . import busqueda, exportacion, importacion
+from .forms import CitaForm, MedicoForm
+from .opciones import opciones_medicos
+from .disponibilidad import turnos_libres_especialidad, turnos_libres_medico, verificar_disponibilidad
+from .models import Paciente, Medico, Cita, Especialidad, HorarioMedico, TerminoBusqueda
+from .views import CitaListView, PacienteListView, filtrar_citas
+
+User = get_user_model()
+
+
+# ==============================
+# PLANES DE CONSULTA DE CITA
+# ==============================
+@skipUnless(connection.vendor == 'sqlite', "El plan de consulta se valida con EXPLAIN QUERY PLAN de SQLite")
+class CitaIndicesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario_medico = User.objects.create(username='medico1', rol='medico')
+        usuario_paciente = User.objects.create(username='paciente1', rol='paciente')
+        cls.medico = Medico.objects.create(usuario=usuario_medico, matricula='M-0001', telefono='7777-7777')
+        cls.paciente = Paciente.objects.create(usuario=usuario_paciente, telefono='7777-7777', direccion='Calle 1')
+        inicio = timezone.now()
+        Cita.objects.bulk_create([
+            Cita(medico=cls.medico, paciente=cls.paciente, motivo='Control', fecha_hora=inicio + timedelta(days=i))
+            for i in range(20)
+        ])
+
+    def test_agenda_medico_usa_indice(self):
+        # La agenda filtra por médico y ordena por fecha: debe resolverse con el índice compuesto, sin ordenar aparte
+        plan = Cita.objects.filter(medico=self.medico).order_by('fecha_hora').explain()
+        self.assertIn('cita_medico_fecha_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_citas_paciente_usa_indice(self):
+        plan = Cita.objects.filter(paciente__usuario=self.paciente.usuario).order_by('-fecha_hora').explain()
+        self.assertIn('cita_paciente_fecha_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_sin_ordenamiento_por_defecto(self):
+        # Una consulta sin order_by no debe agregar ORDER BY
+        self.assertNotIn('ORDER BY', str(Cita.objects.all().query))
+
+
+# ==============================
+# CONSULTAS DEL LISTADO DE CITAS
+# ==============================
+class CitaListViewConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin1', rol='admin')
+        especialidad = Especialidad.objects.create(nombre='Cardiologia')
+        ahora = timezone.now()
+        citas = []
+        for i in range(10):
+            medico = Medico.objects.create(
+                usuario=User.objects.create(username=f'medico{i}', rol='medico'),
+                matricula=f'M-{i:04d}',
+                telefono='7777-7777',
+            )
+            medico.especialidades.add(especialidad)
+            paciente = Paciente.objects.create(
+                usuario=User.objects.create(username=f'paciente{i}', rol='paciente'),
+                telefono='7777-7777',
+                direccion='Calle 1',
+            )
+            citas += [Cita(medico=medico, paciente=paciente, motivo='Control', fecha_hora=ahora + timedelta(days=j)) for j in range(5)]
+        Cita.objects.bulk_create(citas)
+
+    def test_listado_consultas_constantes(self):
+        self.client.force_login(self.admin)
+        # Usuario, citas con médico y paciente, especialidades precargadas
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('gestion_citas:cita-list'))
+        self.assertEqual(len(response.context['citas']), CitaListView.paginate_by)
+
+
+# ==============================
+# PAGINACIÓN POR CURSOR
+# ==============================
+class PaginacionKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin1', rol='admin')
+        medicos = [
+            Medico.objects.create(
+                usuario=User.objects.create(username=f'medico{i}', rol='medico', first_name='Ana'),
+                matricula=f'M-000{i}',
+                telefono='7777-7777',
+            )
+            for i in range(2)
+        ]
+        cls.pacientes = [
+            Paciente.objects.create(
+                usuario=User.objects.create(username=f'paciente{i}', rol='paciente', first_name=nombre),
+                telefono='7777-7777',
+                direccion='Calle 1',
+            )
+            for i, nombre in enumerate(['Carlos', 'Carla', 'Beatriz', 'Mario', 'Carmen'])
+        ]
+        # Citas de dos médicos comparten fecha_hora para ejercitar el desempate por id
+        ahora = timezone.now()
+        Cita.objects.bulk_create([
+            Cita(medico=medicos[i % 2], paciente=cls.pacientes[i % 5], motivo='Control', fecha_hora=ahora + timedelta(hours=i // 2))
+            for i in range(23)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def recorrer(self, url, nombre, params=None):
+        # Sigue los cursores "siguiente" hasta el final y devuelve todas las filas vistas
+        params = dict(params or {})
+        vistos, paginas = [], 0
+        while True:
+            response = self.client.get(url, params)
+            page = response.context['page_obj']
+            vistos += [obj.pk for obj in response.context[nombre]]
+            paginas += 1
+            if not page.has_next():
+                return vistos, paginas
+            params['despues'] = page.cursor_siguiente
+
+    def test_citas_todas_las_paginas_en_orden(self):
+        with mock.patch.object(CitaListView, 'paginate_by', 5):
+            vistos, paginas = self.recorrer(reverse('gestion_citas:cita-list'), 'citas')
+        esperados = list(Cita.objects.order_by('-fecha_hora', '-id_cita').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(paginas, 5)
+
+    def test_pagina_anterior(self):
+        url = reverse('gestion_citas:cita-list')
+        with mock.patch.object(CitaListView, 'paginate_by', 5):
+            primera = self.client.get(url).context['page_obj']
+            segunda = self.client.get(url, {'despues': primera.cursor_siguiente}).context['page_obj']
+            volver = self.client.get(url, {'antes': segunda.cursor_anterior}).context['page_obj']
+        self.assertEqual([c.pk for c in volver], [c.pk for c in primera])
+        self.assertFalse(volver.has_previous())
+
+    def test_buscar_se_mantiene_entre_paginas(self):
+        with mock.patch.object(PacienteListView, 'paginate_by', 1):
+            vistos, paginas = self.recorrer(reverse('gestion_citas:paciente-list'), 'pacientes', {'buscar': 'car'})
+        self.assertEqual(vistos, [self.pacientes[i].pk for i in (1, 0, 4)])  # Carla, Carlos, Carmen
+        self.assertEqual(paginas, 3)
+
+    def test_cursor_invalido_es_primera_pagina(self):
+        response = self.client.get(reverse('gestion_citas:cita-list'), {'despues': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+# ==============================
+# ÍNDICE DE BÚSQUEDA
+# ==============================
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiologia = Especialidad.objects.create(nombre='Cardiología')
+        cls.medico = Medico.objects.create(
+            usuario=User.objects.create(username='dr_lopez', rol='medico', first_name='Ramón', last_name='López'),
+            matricula='M-0001',
+            telefono='7777-7777',
+        )
+        cls.medico.especialidades.add(cls.cardiologia)
+        cls.jose = Paciente.objects.create(
+            usuario=User.objects.create(username='jperez', rol='paciente', first_name='José', last_name='Pérez'),
+            telefono='7777-7777',
+            direccion='Calle 1',
+        )
+        cls.maria = Paciente.objects.create(
+            usuario=User.objects.create(username='mgomez', rol='paciente', first_name='María', last_name='Gómez'),
+            telefono='7777-7777',
+            direccion='Calle 2',
+        )
+        fecha = timezone.make_aware(datetime(2030, 3, 15, 9, 30))
+        cls.cita = Cita.objects.create(medico=cls.medico, paciente=cls.jose, motivo='Dolor de pecho', fecha_hora=fecha)
+
+    def buscar(self, modelo, consulta, tipo, **kwargs):
+        return set(busqueda.filtrar(modelo.objects.all(), consulta, tipo, **kwargs))
+
+    def test_normalizar_quita_acentos(self):
+        self.assertEqual(busqueda.terminos('José  PÉREZ-Gómez'), ['jose', 'perez', 'gomez'])
+
+    def test_prefijo_y_acentos(self):
+        self.assertEqual(self.buscar(Paciente, 'pere', 'paciente'), {self.jose})
+        self.assertEqual(self.buscar(Paciente, 'MARÍ', 'paciente'), {self.maria})
+
+    def test_prefijo_no_usa_tope_de_intercalacion(self):
+        self.assertNotIn('\uffff', str(busqueda.ids_con_prefijo('paciente', 'pere').query))
+        self.assertEqual(self.buscar(Paciente, 'perez', 'paciente'), {self.jose})
+        self.assertEqual(self.buscar(Paciente, 'perf', 'paciente'), set())
+
+    def test_todas_las_palabras_deben_coincidir(self):
+        self.assertEqual(self.buscar(Paciente, 'jose perez', 'paciente'), {self.jose})
+        self.assertEqual(self.buscar(Paciente, 'jose gomez', 'paciente'), set())
+
+    def test_medico_por_especialidad(self):
+        self.assertEqual(self.buscar(Medico, 'cardio', 'medico'), {self.medico})
+
+    def test_cita_por_fecha_o_persona(self):
+        relaciones = {'medico_id': 'medico', 'paciente_id': 'paciente'}
+        self.assertEqual(self.buscar(Cita, '15/03/2030', 'cita', relaciones=relaciones), {self.cita})
+        self.assertEqual(self.buscar(Cita, 'lopez pecho', 'cita', relaciones=relaciones), {self.cita})
+        self.assertEqual(self.buscar(Cita, 'maria', 'cita', relaciones=relaciones), set())
+
+    def test_indice_se_actualiza_al_guardar(self):
+        usuario = self.maria.usuario
+        usuario.last_name = 'Hernández'
+        usuario.save()
+        self.assertEqual(self.buscar(Paciente, 'hernan', 'paciente'), {self.maria})
+        self.assertEqual(self.buscar(Paciente, 'gomez', 'paciente'), set())
+
+        self.cardiologia.nombre = 'Neumología'
+        self.cardiologia.save()
+        self.assertEqual(self.buscar(Medico, 'neumo', 'medico'), {self.medico})
+
+    def test_cambio_de_estado_no_reindexa(self):
+        self.cita.estado = Cita.CONFIRMADA
+        with CaptureQueriesContext(connection) as consultas:
+            self.cita.save(update_fields=['estado'])
+        self.assertFalse([q for q in consultas.captured_queries if 'terminobusqueda' in q['sql']])
+
+        self.cita.motivo = 'Control de presión'
+        self.cita.save(update_fields=['motivo'])
+        self.assertEqual(self.buscar(Cita, 'presion', 'cita'), {self.cita})
+
+    def test_indice_se_limpia_al_eliminar(self):
+        self.cita.delete()
+        self.assertFalse(TerminoBusqueda.objects.filter(tipo='cita', objeto_id=self.cita.pk).exists())
+
+
+# ==============================
+# DISPONIBILIDAD DE TURNOS
+# ==============================
+class DisponibilidadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.especialidad = Especialidad.objects.create(nombre='Pediatria')
+        cls.medico = Medico.objects.create(
+            usuario=User.objects.create(username='medico1', rol='medico'),
+            matricula='M-0001',
+            telefono='7777-7777',
+        )
+        cls.medico.especialidades.add(cls.especialidad)
+        cls.otro = Medico.objects.create(
+            usuario=User.objects.create(username='medico2', rol='medico'),
+            matricula='M-0002',
+            telefono='7777-7777',
+        )
+        cls.otro.especialidades.add(cls.especialidad)
+        cls.paciente = Paciente.objects.create(
+            usuario=User.objects.create(username='paciente1', rol='paciente'),
+            telefono='7777-7777',
+            direccion='Calle 1',
+        )
+        # Lunes de la semana próxima, de 9:00 a 11:00 en turnos de 30 minutos
+        hoy = timezone.localdate()
+        cls.lunes = hoy + timedelta(days=7 - hoy.weekday())
+        for medico in (cls.medico, cls.otro):
+            HorarioMedico.objects.create(medico=medico, dia_semana=0, hora_inicio=time(9, 0), hora_fin=time(11, 0))
+        cls.cita = Cita.objects.create(medico=cls.medico, paciente=cls.paciente, motivo='Control', fecha_hora=cls.turno(9, 30))
+
+    @classmethod
+    def turno(cls, hora, minuto):
+        return timezone.make_aware(datetime.combine(cls.lunes, time(hora, minuto)))
+
+    def test_turnos_libres_descuentan_citas(self):
+        with self.assertNumQueries(2):  # Horarios y citas del rango
+            libres = turnos_libres_medico(self.medico, self.lunes, self.lunes + timedelta(days=6))
+        self.assertEqual(libres, [self.turno(9, 0), self.turno(10, 0), self.turno(10, 30)])
+
+    def test_turnos_libres_por_especialidad(self):
+        libres = turnos_libres_especialidad(self.especialidad, self.lunes, self.lunes)
+        self.assertEqual(len(libres[self.medico.pk]), 3)
+        self.assertEqual(len(libres[self.otro.pk]), 4)
+
+    def test_cita_cancelada_libera_turno(self):
+        Cita.objects.filter(pk=self.cita.pk).update(estado=Cita.CANCELADA)
+        self.assertIn(self.turno(9, 30), turnos_libres_medico(self.medico, self.lunes, self.lunes))
+
+    def test_rechaza_turno_ocupado_o_fuera_de_horario(self):
+        with self.assertRaises(ValidationError):
+            verificar_disponibilidad(self.medico, self.turno(9, 30))
+        with self.assertRaises(ValidationError):
+            verificar_disponibilidad(self.medico, self.turno(9, 15))  # No coincide con el inicio de un turno
+        with self.assertRaises(ValidationError):
+            verificar_disponibilidad(self.medico, self.turno(12, 0))  # Fuera del horario
+        verificar_disponibilidad(self.medico, self.turno(9, 30), excluir=self.cita.pk)  # Editar la misma cita
+
+    def test_restriccion_unica_en_base_de_datos(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Cita.objects.create(medico=self.medico, paciente=self.paciente, motivo='Control', fecha_hora=self.turno(9, 30))
+
+    def test_formulario_admin_solo_reverifica_si_cambia_el_turno(self):
+        # Citas fuera del horario actual del médico (ej. anteriores a su HorarioMedico)
+        fuera = Cita.objects.create(medico=self.medico, paciente=self.paciente, motivo='Control', fecha_hora=self.turno(12, 0))
+        pasada = Cita.objects.create(medico=self.medico, paciente=self.paciente, motivo='Control', fecha_hora=self.turno(9, 0) - timedelta(days=14))
+
+        def datos(cita, estado, fecha_hora=None):
+            fecha_hora = timezone.localtime(fecha_hora or cita.fecha_hora)
+            return {'medico': self.medico.pk, 'paciente': self.paciente.pk, 'motivo': 'Control anual',
+                    'estado': estado, 'fecha_hora': fecha_hora.strftime('%Y-%m-%dT%H:%M')}
+
+        form = CitaForm(data=datos(fuera, Cita.CONFIRMADA), instance=fuera)
+        self.assertTrue(form.is_valid(), form.errors)
+        form = CitaForm(data=datos(pasada, Cita.COMPLETADA), instance=pasada)
+        self.assertTrue(form.is_valid(), form.errors)
+        form = CitaForm(data=datos(fuera, Cita.CONFIRMADA, self.turno(12, 30)), instance=fuera)
+        self.assertIn('fecha_hora', form.errors)
+
+    def test_formulario_de_paciente_valida_turno(self):
+        datos = {'medico': self.medico.pk, 'motivo': 'Control anual', 'fecha_hora': self.turno(9, 30).strftime('%Y-%m-%dT%H:%M')}
+        form = PacienteCitaForm(data=datos)
+        self.assertFalse(form.is_valid())
+        self.assertIn('fecha_hora', form.errors)
+        datos['fecha_hora'] = self.turno(10, 0).strftime('%Y-%m-%dT%H:%M')
+        self.assertTrue(PacienteCitaForm(data=datos).is_valid())
+
+
+# ==============================
+# MIGRACIÓN DE CITAS DUPLICADAS
+# ==============================
+@override_settings(MIGRATION_MODULES={})
+class MigracionCitasDuplicadasTests(SimpleTestCase):
+    """Aplica las migraciones reales sobre una base SQLite aparte con estados heredados."""
+    databases = {'default'}
+
+    def setUp(self):
+        # La base de los tests se crea sin migraciones: se usa otra conexión en memoria
+        original = connections['default']
+        self.conexion = original.__class__({**original.settings_dict, 'NAME': ':memory:'}, 'default')
+        connections['default'] = self.conexion
+        self.addCleanup(connections.__setitem__, 'default', original)
+        self.addCleanup(self.conexion.close)
+
+    def migrar(self, migracion):
+        executor = MigrationExecutor(self.conexion)
+        destino = [('gestion_citas', migracion)]
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def estados(self, apps):
+        return dict(apps.get_model('gestion_citas', 'Cita').objects.values_list('motivo', 'estado'))
+
+    def test_conserva_completadas_y_confirmadas(self):
+        apps = self.migrar('0007_poblar_terminobusqueda')
+        Usuario = apps.get_model('core', 'Usuario')
+        medico = apps.get_model('gestion_citas', 'Medico').objects.create(
+            usuario=Usuario.objects.create(username='medico1', rol='medico'), matricula='M-1',
+        )
+        paciente = apps.get_model('gestion_citas', 'Paciente').objects.create(
+            usuario=Usuario.objects.create(username='paciente1', rol='paciente'),
+            fecha_nacimiento='1990-01-01',
+        )
+        Cita = apps.get_model('gestion_citas', 'Cita')
+        nueve, diez, once = (timezone.make_aware(datetime(2025, 3, 3, hora)) for hora in (9, 10, 11))
+        for motivo, fecha_hora, estado in [
+            # Historial completado en el mismo turno que una pendiente más antigua
+            ('pendiente_9', nueve, 'Pendiente'),
+            ('completada_9', nueve, 'Completada'),
+            ('atendida_9', nueve, 'atendida'),
+            # La confirmada gana aunque la pendiente sea más antigua
+            ('pendiente_10', diez, 'pendiente'),
+            ('confirmada_10', diez, 'Confirmada'),
+            # Textos que 0008 no reconoce y 0010 normaliza
+            ('pendiente_11', once, ' PENDIENTE '),
+            ('confirmada_11', once, 'CONFIRMADA'),
+        ]:
+            Cita.objects.create(medico=medico, paciente=paciente, fecha_hora=fecha_hora, motivo=motivo, estado=estado)
+
+        self.assertEqual(self.estados(self.migrar('0008_horariomedico_cita_activa_uniq')), {
+            'pendiente_9': 'Pendiente', 'completada_9': 'Completada', 'atendida_9': 'atendida',
+            'pendiente_10': 'Cancelada', 'confirmada_10': 'Confirmada',
+            'pendiente_11': ' PENDIENTE ', 'confirmada_11': 'CONFIRMADA',
+        })
+        self.assertEqual(self.estados(self.migrar('0010_cita_estado_entero')), {
+            'pendiente_9': 1, 'completada_9': 3, 'atendida_9': 3,
+            'pendiente_10': 4, 'confirmada_10': 2,
+            'pendiente_11': 4, 'confirmada_11': 2,
+        })
+
+
+# ==============================
+# ETIQUETA DE ESPECIALIDADES DEL MÉDICO
+# ==============================
+class EspecialidadesTextoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardio = Especialidad.objects.create(nombre='Cardiología')
+        cls.pediatria = Especialidad.objects.create(nombre='Pediatría')
+        cls.medicos = [
+            Medico.objects.create(
+                usuario=User.objects.create(username=f'medico{i}', rol='medico', first_name=f'Medico{i}'),
+                matricula=f'M-{i:04d}',
+                telefono='7777-7777',
+            )
+            for i in range(30)
+        ]
+
+    def texto(self, medico):
+        return Medico.objects.get(pk=medico.pk).especialidades_texto
+
+    def test_sincroniza_desde_el_medico(self):
+        medico = self.medicos[0]
+        medico.especialidades.set([self.pediatria, self.cardio])
+        self.assertEqual(medico.especialidades_texto, 'Cardiología, Pediatría')
+        self.assertEqual(self.texto(medico), 'Cardiología, Pediatría')
+        medico.especialidades.remove(self.cardio)
+        self.assertEqual(self.texto(medico), 'Pediatría')
+        medico.especialidades.clear()
+        self.assertEqual(self.texto(medico), '')
+
+    def test_sincroniza_desde_la_especialidad(self):
+        medico = self.medicos[1]
+        self.cardio.medico_set.add(medico)
+        self.assertEqual(self.texto(medico), 'Cardiología')
+        self.cardio.nombre = 'Cardiología clínica'
+        self.cardio.save()
+        self.assertEqual(self.texto(medico), 'Cardiología clínica')
+        self.cardio.medico_set.clear()
+        self.assertEqual(self.texto(medico), '')
+        self.pediatria.medico_set.add(medico)
+        self.pediatria.delete()
+        self.assertEqual(self.texto(medico), '')
+
+    def test_renombrar_especialidad_un_solo_update(self):
+        self.cardio.medico_set.add(*self.medicos)
+        self.cardio.nombre = 'Cardiología clínica'
+        with CaptureQueriesContext(connection) as consultas:
+            self.cardio.save()
+        updates = [q for q in consultas.captured_queries if q['sql'].startswith('UPDATE "gestion_citas_medico"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual({self.texto(m) for m in self.medicos}, {'Cardiología clínica'})
+
+    def test_formulario_de_reserva_en_una_consulta(self):
+        for medico in self.medicos:
+            medico.especialidades.set([self.cardio])
+        cache.clear()
+        # Una consulta para armar la lista de médicos (luego queda en caché)
+        with self.assertNumQueries(1):
+            html = str(PacienteCitaForm()['medico'])
+        self.assertIn('Dr(a). Medico0 (Cardiología)', html)
+
+
+# ==============================
+# OPCIONES DE LOS FORMULARIOS
+# ==============================
+class OpcionesFormulariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin1', rol='admin')
+        cls.pacientes = [
+            Paciente.objects.create(
+                usuario=User.objects.create(username=f'paciente{i}', rol='paciente', first_name=f'Paciente{i}', last_name='Gómez'),
+                telefono='7777-7777',
+                direccion='Calle 1',
+            )
+            for i in range(40)
+        ]
+        cls.medico = Medico.objects.create(
+            usuario=User.objects.create(username='medico1', rol='medico', first_name='Ana'),
+            matricula='M-0001',
+            telefono='7777-7777',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cita_form_no_lista_pacientes(self):
+        opciones_medicos()  # Lista de médicos ya cacheada
+        with self.assertNumQueries(0):
+            html = str(CitaForm()['paciente'])
+        self.assertIn(f'data-autocompletar="{reverse("gestion_citas:autocompletar", args=["paciente"])}"', html)
+        self.assertNotIn('Paciente0', html)
+        # Con un valor elegido solo se consulta ese paciente
+        with self.assertNumQueries(1):
+            html = str(CitaForm(initial={'paciente': self.pacientes[3].pk})['paciente'])
+        self.assertIn('Paciente3 Gómez', html)
+        self.assertNotIn('Paciente4', html)
+
+    def test_opciones_de_medicos_cacheadas_y_versionadas(self):
+        with self.assertNumQueries(1):
+            opciones_medicos()
+        with self.assertNumQueries(0):
+            self.assertEqual(opciones_medicos(), [(self.medico.pk, 'Dr(a). Ana')])
+        usuario = self.medico.usuario
+        usuario.first_name = 'Ana María'
+        usuario.save()
+        self.assertEqual(opciones_medicos(), [(self.medico.pk, 'Dr(a). Ana María')])
+
+    def test_medico_form_valida_con_opciones_cacheadas(self):
+        especialidad = Especialidad.objects.create(nombre='Cardiología')
+        usuario = User.objects.create(username='medico2', rol='medico')
+        form = MedicoForm(data={'usuario': usuario.pk, 'matricula': 'M-0002', 'telefono': '7777-7777', 'especialidades': [especialidad.pk]})
+        self.assertIn((especialidad.pk, 'Cardiología'), form.fields['especialidades'].choices)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_endpoint_de_sugerencias(self):
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse('gestion_citas:autocompletar', args=['paciente']), {'q': 'pacien gom'}).json()
+        self.assertEqual(len(data['resultados']), 20)
+        data = self.client.get(reverse('gestion_citas:autocompletar', args=['usuario-medico']), {'q': 'med'}).json()
+        self.assertEqual(data['resultados'], [{'id': self.medico.pk, 'texto': 'medico1 (Ana )'}])
+        data = self.client.get(reverse('gestion_citas:autocompletar', args=['usuario-medico']), {'q': 'MED an'}).json()
+        self.assertEqual(data['resultados'], [{'id': self.medico.pk, 'texto': 'medico1 (Ana )'}])
+        self.assertEqual(self.client.get(reverse('gestion_citas:autocompletar', args=['otra']), {'q': 'xx'}).status_code, 404)
+
+    def test_sugerencias_compartidas_entre_administradores(self):
+        url = reverse('gestion_citas:autocompletar', args=['usuario-medico'])
+        self.client.force_login(self.admin)
+        primera = self.client.get(url, {'q': 'med'}).json()
+        User.objects.create(username='medico2', rol='medico')
+        self.client.force_login(User.objects.create(username='admin2', rol='admin'))
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'q': 'med'})
+        self.assertEqual(response.json(), primera)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse([q for q in consultas.captured_queries if "'medico'" in q['sql'] or 'LIKE' in q['sql']])
+
+
+# ==============================
+# GENERADOR DE DATOS SINTÉTICOS
+# ==============================
+class GenerarDatosTests(TestCase):
+    parametros = {'pacientes': 30, 'medicos': 4, 'especialidades': 5, 'citas': 300, 'dias_pasados': 60, 'dias_futuros': 10}
+
+    def generar(self, **kwargs):
+        call_command('generar_datos', stdout=StringIO(), **{**self.parametros, **kwargs})
+
+    def citas(self):
+        return list(
+            Cita.objects.order_by('medico__usuario__username', 'fecha_hora')
+            .values_list('medico__usuario__username', 'paciente__usuario__username', 'fecha_hora', 'estado', 'motivo')
+        )
+
+    def test_volumen_y_datos_derivados(self):
+        self.generar()
+        self.assertEqual(Paciente.objects.count(), 30)
+        self.assertEqual(Medico.objects.count(), 4)
+        self.assertEqual(Cita.objects.count(), 300)
+        self.assertEqual(HorarioMedico.objects.count(), 4 * 5 * 2)
+        # Las citas caen en turnos del horario del médico (días hábiles)
+        self.assertTrue(all(timezone.localtime(c[2]).weekday() < 5 for c in self.citas()))
+        # Lo que normalmente mantienen las señales
+        medico = Medico.objects.prefetch_related('especialidades').first()
+        self.assertEqual(medico.especialidades_texto, ", ".join(e.nombre for e in medico.especialidades.order_by('nombre')))
+        self.assertIsNotNone(medico.agenda_actualizada)
+        paciente = Paciente.objects.select_related('usuario').first()
+        self.assertIn(paciente, busqueda.filtrar(Paciente.objects.all(), paciente.usuario.username, 'paciente'))
+
+    def test_determinista_segun_semilla(self):
+        self.generar(semilla=7)
+        primera = self.citas()
+        User.objects.filter(username__startswith='sint_').delete()
+        self.generar(semilla=7)
+        self.assertEqual(self.citas(), primera)
+        self.generar(semilla=7, prefijo='otro')
+        self.assertEqual(Cita.objects.count(), 600)
+
+    def test_capacidad_insuficiente(self):
+        with self.assertRaises(CommandError):
+            self.generar(citas=10000)
+
+
+# ==============================
+# EXPORTACIÓN DE CITAS (CSV)
+# ==============================
+class ExportacionCitasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generar_datos', stdout=StringIO(),
+            pacientes=20, medicos=3, especialidades=4, citas=200, dias_pasados=30, dias_futuros=10,
+        )
+        cls.admin = User.objects.create(username='admin1', rol='admin')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def exportar(self, **params):
+        response = self.client.get(reverse('gestion_citas:cita-export'), params)
+        self.assertTrue(response.streaming)
+        contenido = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(contenido[1:])))
+
+    def test_lotes_recorren_todas_las_citas_en_orden(self):
+        # Hay citas de distintos médicos a la misma hora: el desempate por id no pierde ni repite filas
+        lotes = list(exportacion.lotes_citas(Cita.objects.all(), lote=7))
+        ids = [fila[0] for filas in lotes for fila in filas]
+        self.assertEqual(ids, list(Cita.objects.order_by('fecha_hora', 'id_cita').values_list('pk', flat=True)))
+        self.assertTrue(all(len(filas) <= 7 for filas in lotes))
+
+    def test_csv_con_los_filtros_del_listado(self):
+        hoy = timezone.localdate()
+        params = {'estado': str(Cita.CONFIRMADA), 'desde': (hoy - timedelta(days=10)).isoformat(), 'hasta': hoy.isoformat()}
+        filas = self.exportar(**params)
+        self.assertEqual(filas[0][:4], ['ID', 'Fecha', 'Hora', 'Estado'])
+        esperadas = filtrar_citas(Cita.objects.all(), params)
+        self.assertEqual(sorted(int(fila[0]) for fila in filas[1:]), sorted(esperadas.values_list('pk', flat=True)))
+        self.assertTrue(all(fila[3] == 'Confirmada' for fila in filas[1:]))
+
+        cita = esperadas.select_related('paciente__usuario').order_by('fecha_hora', 'id_cita').first()
+        local = timezone.localtime(cita.fecha_hora)
+        self.assertEqual(filas[1][1:3], [local.strftime('%d/%m/%Y'), local.strftime('%H:%M')])
+        self.assertEqual(filas[1][4], cita.paciente.usuario.first_name)
+
+        # El listado muestra las mismas citas
+        response = self.client.get(reverse('gestion_citas:cita-list'), params)
+        self.assertLessEqual({c.pk for c in response.context['citas']}, set(esperadas.values_list('pk', flat=True)))
+
+    def test_filtros_invalidos_se_ignoran(self):
+        self.assertEqual(len(self.exportar(desde='ayer', estado='9')), Cita.objects.count() + 1)
+
+    def test_celdas_con_formula(self):
+        Cita.objects.filter(pk=Cita.objects.order_by('fecha_hora', 'id_cita').first().pk).update(motivo='=HYPERLINK("x")')
+        self.assertEqual(self.exportar()[1][-1], "'=HYPERLINK(\"x\")")
+
+    def test_solo_admin(self):
+        self.client.force_login(User.objects.filter(rol='paciente').first())
+        self.assertEqual(self.client.get(reverse('gestion_citas:cita-export')).status_code, 302)
+
+
+# ==============================
+# IMPORTACIÓN DE PACIENTES Y MÉDICOS (CSV)
+# ==============================
+class ImportacionCSVTests(TestCase):
+    encabezado_pacientes = 'username,email,first_name,last_name,password,fecha_nacimiento,telefono,direccion\n'
+    encabezado_medicos = 'username,email,first_name,last_name,password,matricula,telefono,especialidades\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin1', rol='admin', email='admin@ejemplo.com')
+        Especialidad.objects.create(nombre='Cardiología')
+        Especialidad.objects.create(nombre='Pediatría')
+
+    def pacientes(self, n, inicio=0):
+        return self.encabezado_pacientes + ''.join(
+            f'pac{i:04d},pac{i}@ejemplo.com,José,Pérez,ClaveSegura,1990-05-0{1 + i % 9},7777-{i:04d},Calle {i} San Salvador\n'
+            for i in range(inicio, inicio + n)
+        )
+
+    def importar(self, tipo, texto, **kwargs):
+        return importacion.importar(tipo, io.StringIO(texto), **kwargs)
+
+    def test_importa_pacientes(self):
+        resultado = self.importar('paciente', self.pacientes(3))
+        self.assertEqual((resultado.creados, resultado.filas, resultado.errores), (3, 3, []))
+        usuario = User.objects.get(username='pac0001')
+        self.assertEqual(usuario.rol, 'paciente')
+        self.assertTrue(usuario.check_password('ClaveSegura'))
+        self.assertEqual(usuario.paciente.telefono, '7777-0001')
+        self.assertIn(usuario.paciente, busqueda.filtrar(Paciente.objects.all(), 'pac0001', 'paciente'))
+
+    def test_sin_consultas_por_fila(self):
+        with CaptureQueriesContext(connection) as pocas:
+            self.importar('paciente', self.pacientes(4))
+        with CaptureQueriesContext(connection) as muchas:
+            self.importar('paciente', self.pacientes(40, inicio=100))
+        self.assertEqual(len(muchas), len(pocas))
+
+    def test_errores_no_importan_nada(self):
+        texto = self.pacientes(2) + (
+            'ADMIN1,otro@ejemplo.com,Ana,Ruiz,ClaveSegura,1990-01-01,7777-0000,Calle 1 Centro\n'  # username existente
+            'ana2,PAC0@ejemplo.com,Ana,Ruiz,ClaveSegura,1990-01-01,7777-0000,Calle 1 Centro\n'  # correo repetido en el archivo
+            'ana3,ana3@ejemplo.com,Ana,Ruiz,corta,1990-01-01,77770000,Calle 1 Centro\n'  # contraseña y teléfono
+        )
+        resultado = self.importar('paciente', texto)
+        self.assertEqual(resultado.creados, 0)
+        self.assertFalse(User.objects.filter(rol='paciente').exists())
+        self.assertEqual([linea for linea, _ in resultado.errores], [4, 5, 6, 6])
+        self.assertIn('username: Este nombre de usuario ya está en uso.', resultado.errores[0][1])
+
+        resultado = self.importar('paciente', texto, parcial=True)
+        self.assertEqual(resultado.creados, 2)
+        self.assertEqual(Paciente.objects.count(), 2)
+
+    def test_importa_medicos_con_especialidades(self):
+        # Separador ';' (Excel en español); las especialidades van entre comillas
+        texto = self.encabezado_medicos.replace(',', ';') + (
+            'med1;med1@ejemplo.com;Ana;Ruiz;Clave123;M-0001;7777-0001;"pediatria; CARDIOLOGÍA"\n'
+            'med2;med2@ejemplo.com;Luis;Mora;Clave123;m-0001;7777-0002;Cardiología\n'  # matrícula repetida
+            'med3;med3@ejemplo.com;Luis;Mora;Clave123;M-0003;7777-0003;Neurología\n'  # especialidad inexistente
+        )
+        resultado = self.importar('medico', texto, parcial=True)
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual([linea for linea, _ in resultado.errores], [3, 4])
+        medico = Medico.objects.get(matricula='M-0001')
+        self.assertEqual(medico.usuario.rol, 'medico')
+        self.assertEqual(medico.especialidades_texto, 'Cardiología, Pediatría')
+        self.assertEqual(medico.especialidades.count(), 2)
+        self.assertIn(medico, busqueda.filtrar(Medico.objects.all(), 'pediatria', 'medico'))
+
+    def test_faltan_columnas(self):
+        with self.assertRaises(ValidationError):
+            self.importar('medico', self.pacientes(1))
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8-sig', delete=False) as archivo:
+            archivo.write(self.pacientes(3) + 'x,malo,,,,,,\n')
+        self.addCleanup(os.remove, archivo.name)
+        with self.assertRaises(CommandError):
+            call_command('importar_csv', 'paciente', archivo.name, stdout=StringIO(), stderr=StringIO())
+        salida = StringIO()
+        call_command('importar_csv', 'paciente', archivo.name, '--parcial', stdout=salida, stderr=StringIO())
+        self.assertIn('3 de 4 filas importadas', salida.getvalue())
+
+    def test_pagina_de_importacion(self):
+        url = reverse('gestion_citas:importar-csv')
+        self.client.force_login(self.admin)
+        archivo = SimpleUploadedFile('pacientes.csv', ('\ufeff' + self.pacientes(2)).encode('utf-8'), content_type='text/csv')
+        response = self.client.post(url, {'tipo': 'paciente', 'archivo': archivo})
+        self.assertEqual(response.context['resultado'].creados, 2)
+        self.assertContains(response, 'Resultado: 2 de 2 filas importadas')
+
+        self.client.force_login(User.objects.get(username='pac0000'))
+        self.assertRedirects(self.client.get(url), reverse('home'), fetch_redirect_response=False)
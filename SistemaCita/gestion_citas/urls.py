@@ -26,8 +26,13 @@ from .views import (
     CitaCreateView,
     CitaUpdateView,
     CitaDeleteView,
+    CitaExportView,
 
+    #Importacion
+    ImportarCSVView,
 
+    #Autocompletado
+    AutocompletarView,
 )
 
 # agregar un identificador de enrutamiento
@@ -57,5 +62,12 @@ urlpatterns = [
     path('citas/nueva', CitaCreateView.as_view(), name="cita-create"),
     path('citas/editar/<int:pk>/', CitaUpdateView.as_view(), name='cita-update'),
     path('citas/eliminar/<int:pk>/', CitaDeleteView.as_view(), name='cita-delete'),
+    path('citas/exportar/', CitaExportView.as_view(), name='cita-export'),
+
+    #importacion por CSV
+    path('importar/', ImportarCSVView.as_view(), name='importar-csv'),
+
+    #autocompletado de formularios
+    path('autocompletar/<slug:fuente>/', AutocompletarView.as_view(), name='autocompletar'),
 
 ]
@@ -1,17 +1,30 @@
 from django.shortcuts import render # Permite renderizar plantillas HTML y devolverlas como respuesta HTTP
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView # Vistas genéricas de Django para listar, crear, actualizar y eliminar registros
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, View # Vistas genéricas de Django para listar, crear, actualizar y eliminar registros
+from django.http import Http404, JsonResponse # Respuestas JSON del autocompletado
+from django.utils.decorators import method_decorator # Decoradores de funciones en vistas de clase
+from django.core.exceptions import ValidationError # Errores del archivo importado
+import io # Lectura como texto del CSV subido
 from .models import Paciente, Medico, Cita, Especialidad # Importa los modelos definidos en el mismo módulo para ser usados en las vistas
 from django.contrib import messages # Sistema de mensajes de Django (usado para mostrar notificaciones al usuario)
-from django.db.models import Q # Permite construir consultas complejas con operadores lógicos
 
 from django.urls import reverse_lazy # Genera URLs de forma perezosa, útil para evitar dependencias circulares
+from django.utils import timezone # Fechas locales de los filtros de citas
+from datetime import date, datetime, time, timedelta # Rango de fechas de los filtros de citas
 
 
 from .forms import PacienteForm # Formulario del modelo Paciente
 from .forms import MedicoForm # Formulario del modelo Medico
 from .forms import CitaForm # Formulario del modelo Cita
 from .forms import EspecialidadForm # Formulario del modelo Especialidad
+from .forms import ImportarCSVForm # Archivo de la importación por CSV
 from core.mixins import RolRequiredMixin # Mixin personalizado para restringir acceso según el rol del usuario
+from core.mixins import PaginacionKeysetMixin # Paginación por cursor para los listados
+from core.mixins import ReservaCitaMixin # Reserva de turnos con bloqueo del médico
+from core.decorators import cache_por_rol # Caché de respuestas separada por rol
+from . import busqueda # Índice de búsqueda normalizado (sin LIKE '%...%')
+from . import opciones # Sugerencias para los select con autocompletado
+from . import exportacion # Exportación de citas a CSV por lotes
+from . import importacion # Importación de pacientes y médicos desde CSV
 
 
 # ===============================
@@ -19,16 +32,18 @@ from core.mixins import RolRequiredMixin # Mixin personalizado para restringir a
 # ===============================
 
 
-class EspecialidadListView(RolRequiredMixin, ListView): # Muestra la lista de especialidades disponibles
+class EspecialidadListView(RolRequiredMixin, PaginacionKeysetMixin, ListView): # Muestra la lista de especialidades disponibles
  model = Especialidad # Especifica el modelo que se listará
  rol_permitido = 'admin' # Solo los usuarios con rol 'admin' pueden acceder a esta vista
  template_name = 'especialidad/especialidad-list.html' # Plantilla HTML a utilizar
  context_object_name = 'especialidades' # Nombre de la variable que contendrá los datos en la plantilla
+ paginate_by = 24 # Especialidades por página
+ orden_keyset = ('nombre', 'pk') # Orden alfabético, desempate por id
  def get_queryset(self):
         qs = super().get_queryset()
         filtro = self.request.GET.get('buscar', '')
         if filtro:
-            qs = qs.filter(nombre__icontains=filtro)
+            qs = busqueda.filtrar(qs, filtro, 'especialidad')
         return qs
 
  def get_context_data(self, **kwargs):
@@ -65,16 +80,18 @@ class EspecialidadDeleteView(RolRequiredMixin, DeleteView): # Permite eliminar u
 # ===============================
 
 
-class PacienteListView(RolRequiredMixin, ListView): # Muestra todos los pacientes registrados
+class PacienteListView(RolRequiredMixin, PaginacionKeysetMixin, ListView): # Muestra todos los pacientes registrados
  model = Paciente # Modelo a listar
  rol_permitido = 'admin' # Solo administradores pueden acceder
  template_name = 'paciente/paciente-list.html' # Plantilla de la lista de pacientes
  context_object_name = 'pacientes' # Variable de contexto accesible en la plantilla
+ paginate_by = 24 # Pacientes por página
+ orden_keyset = ('usuario__first_name', 'usuario__last_name', 'pk') # Orden por nombre, desempate por id
  def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().select_related('usuario')
         filtro = self.request.GET.get('buscar', '')
         if filtro:
-            qs = qs.filter(usuario_first_nameicontains=filtro) | qs.filter(usuariolast_name_icontains=filtro)
+            qs = busqueda.filtrar(qs, filtro, 'paciente')
         return qs
 
  def get_context_data(self, **kwargs):
@@ -111,29 +128,29 @@ class PacienteDeleteView(RolRequiredMixin, DeleteView): # Permite eliminar un pa
 # ===============================
 
 
-class MedicoListView(RolRequiredMixin, ListView): # Muestra la lista de médicos registrados
+class MedicoListView(RolRequiredMixin, PaginacionKeysetMixin, ListView): # Muestra la lista de médicos registrados
  model = Medico # Modelo a listar
  rol_permitido = 'admin' # Solo admin puede acceder
  template_name = 'medico/medico-list.html' # Plantilla HTML con la lista
  context_object_name = 'medicos' # Nombre de la variable de contexto en la plantilla
-def get_queryset(self):  
-    queryset = super().get_queryset()  # Obtiene todos los registros del modelo  
-    filtro = self.request.GET.get('buscar', '')  # Captura el texto ingresado en el buscador  
-
-    if filtro:  # Si hay texto para filtrar  
-        queryset = queryset.filter(  # Filtra por nombre, apellido o especialidad del médico  
-            Q(usuario__first_name__icontains=filtro) |
-            Q(usuario__last_name__icontains=filtro) |
-            Q(especialidades__nombre__icontains=filtro)
-        )
+ paginate_by = 24 # Médicos por página
+ orden_keyset = ('usuario__first_name', 'usuario__last_name', 'pk') # Orden por nombre, desempate por id
+
+ def get_queryset(self):
+        queryset = super().get_queryset().select_related('usuario').prefetch_related('especialidades')  # Médicos con usuario y especialidades
+        filtro = self.request.GET.get('buscar', '')  # Captura el texto ingresado en el buscador
+
+        if filtro:  # Si hay texto para filtrar
+            # Nombre, apellido, matrícula y especialidades forman parte del índice del médico
+            queryset = busqueda.filtrar(queryset, filtro, 'medico')
 
-    return queryset  # Devuelve la lista filtrada  
+        return queryset  # Devuelve la lista filtrada
 
+ def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)  # Obtiene el contexto base
+        context['filtro'] = self.request.GET.get('buscar', '')  # Mantiene el valor del buscador activo
+        return context  # Devuelve el contexto actualizado
 
-def get_context_data(self, **kwargs):  
-    context = super().get_context_data(**kwargs)  # Obtiene el contexto base  
-    context['filtro'] = self.request.GET.get('buscar', '')  # Mantiene el valor del buscador activo  
-    return context  # Devuelve el contexto actualizado  
 
 class MedicoCreateView(RolRequiredMixin, CreateView): # Permite registrar un nuevo médico
  model = Medico # Modelo asociado
@@ -162,51 +179,71 @@ class MedicoDeleteView(RolRequiredMixin, DeleteView): # Permite eliminar un méd
 # ===============================
 
 
-class CitaListView(RolRequiredMixin, ListView): # Muestra la lista de citas disponibles según el rol
+def filtrar_citas(qs, parametros):
+    """
+    Filtros del listado de citas, compartidos con la exportación: ?buscar= (índice de
+    búsqueda), ?desde= y ?hasta= (fechas AAAA-MM-DD, inclusive) y ?estado=. Un valor
+    inválido se ignora, como un filtro vacío.
+    """
+    filtro = parametros.get('buscar', '')
+    if filtro:
+        # Cada palabra puede coincidir con la fecha/motivo de la cita o con el médico o paciente
+        qs = busqueda.filtrar(qs, filtro, 'cita', relaciones={'medico_id': 'medico', 'paciente_id': 'paciente'})
+    desde, hasta = _leer_fecha(parametros.get('desde')), _leer_fecha(parametros.get('hasta'))
+    if desde:
+        qs = qs.filter(fecha_hora__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if hasta:
+        qs = qs.filter(fecha_hora__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)))
+    estado = parametros.get('estado', '')
+    if estado.isdigit() and int(estado) in dict(Cita.ESTADOS):
+        qs = qs.filter(estado=int(estado))
+    return qs
+
+
+def _leer_fecha(valor):
+    try:
+        return date.fromisoformat(valor or '')
+    except ValueError:
+        return None
+
+
+class CitaListView(RolRequiredMixin, PaginacionKeysetMixin, ListView): # Muestra la lista de citas disponibles según el rol
  model = Cita # Modelo a listar
  template_name = 'cita/cita-list.html' # Plantilla HTML donde se muestran las citas
  context_object_name = 'citas' # Nombre de la variable que contendrá las citas en la plantilla
- 
-
-
- rol_permitido = 'admin' # Solo ciertos roles pueden acceder a esta vista ('admin', 'medico', 'paciente')
-
-
-def get_queryset(self): # Método que filtra las citas según el rol del usuario autenticado
- user = self.request.user # Obtiene el usuario actual de la solicitud
-
-
- if user.rol == 'admin': # Si el usuario es administrador
-  return Cita.objects.all() # Devuelve todas las citas
- elif user.rol == 'medico': # Si el usuario es médico
-  return Cita.objects.filter(medico__usuario=user) # Muestra solo las citas del médico actual
- elif user.rol == 'paciente': # Si el usuario es paciente
-  return Cita.objects.filter(paciente__usuario=user) # Muestra solo las citas del paciente actual
- else:
-  return Cita.objects.none() # Si el rol no es válido, no devuelve resultados
- 
-def get_queryset(self):  
-    from django.db.models import Q  # Permite usar filtros con condiciones OR  
-    qs = super().get_queryset()  # Obtiene todos los registros del modelo  
-    filtro = self.request.GET.get('buscar', '')  # Captura el valor del buscador  
-
-    if filtro:  # Si hay texto de búsqueda  
-        qs = qs.filter(  # Filtra por fecha, médico o paciente  
-            Q(fecha_hora__icontains=filtro) |
-            Q(medico__usuario__first_name__icontains=filtro) |
-            Q(paciente__usuario__first_name__icontains=filtro)
+ rol_permitido = 'admin' # Solo el administrador puede acceder a esta vista
+ paginate_by = 30 # Citas por página
+ orden_keyset = ('-fecha_hora', '-id_cita') # Más recientes primero, desempate por id
+
+ def get_queryset(self): # Citas con médico, paciente y especialidades precargados (sin consultas por fila)
+        qs = (
+            super().get_queryset()
+            .select_related('medico__usuario', 'paciente__usuario')
+            .prefetch_related('medico__especialidades')
         )
-    return qs  # Devuelve los resultados filtrados  
+        return filtrar_citas(qs, self.request.GET)  # Búsqueda, rango de fechas y estado
+
+ def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)  # Obtiene el contexto base
+        context['filtro'] = self.request.GET.get('buscar', '')  # Mantiene el texto del buscador
+        context['desde'] = self.request.GET.get('desde', '')  # Mantiene el rango de fechas
+        context['hasta'] = self.request.GET.get('hasta', '')
+        context['estado'] = self.request.GET.get('estado', '')  # Mantiene el estado elegido
+        context['estados'] = Cita.ESTADOS
+        return context  # Devuelve el contexto actualizado
 
 
-def get_context_data(self, **kwargs):  
-    context = super().get_context_data(**kwargs)  # Obtiene el contexto base  
-    context['filtro'] = self.request.GET.get('buscar', '')  # Mantiene el texto del buscador  
-    return context  # Devuelve el contexto actualizado  
+class CitaExportView(RolRequiredMixin, View): # Descarga en CSV las citas del listado con los mismos filtros
+ rol_permitido = 'admin' # Reportes solo para el administrador
+ http_method_names = ['get']
 
+ def get(self, request):
+        citas = filtrar_citas(Cita.objects.all(), request.GET)
+        nombre = f"citas_{timezone.localtime():%Y%m%d_%H%M}.csv"
+        return exportacion.respuesta_csv(citas, nombre)  # Se genera por lotes mientras se descarga
 
 
-class CitaCreateView(RolRequiredMixin, CreateView): # Permite crear una nueva cita médica
+class CitaCreateView(RolRequiredMixin, ReservaCitaMixin, CreateView): # Permite crear una nueva cita médica
  model = Cita # Modelo asociado
  rol_permitido = 'admin' # Solo el admin puede crear citas manualmente
  form_class = CitaForm # Formulario usado para la creación
@@ -214,7 +251,7 @@ class CitaCreateView(RolRequiredMixin, CreateView): # Permite crear una nueva ci
  success_url = reverse_lazy('gestion_citas:cita-list') # Redirección al listado de citas tras crear
 
 
-class CitaUpdateView(RolRequiredMixin, UpdateView): # Permite modificar una cita existente
+class CitaUpdateView(RolRequiredMixin, ReservaCitaMixin, UpdateView): # Permite modificar una cita existente
  model = Cita # Modelo asociado
  rol_permitido = 'admin' # Solo admin puede modificar
  form_class = CitaForm # Formulario para la edición
@@ -226,4 +263,53 @@ class CitaDeleteView(RolRequiredMixin, DeleteView): # Permite eliminar una cita
  model = Cita # Modelo asociado
  rol_permitido = 'admin' # Solo admin puede eliminar
  template_name = 'cita/cita-delete.html' # Plantilla HTML para confirmar la eliminación
- success_url = reverse_lazy('gestion_citas:cita-list') # Redirección al listado tras eliminar
\ No newline at end of file
+ success_url = reverse_lazy('gestion_citas:cita-list') # Redirección al listado tras eliminar
+
+
+# ===============================
+# IMPORTACIÓN DE PACIENTES Y MÉDICOS (CSV)
+# ===============================
+class ImportarCSVView(RolRequiredMixin, View): # Sube un CSV de pacientes o médicos y muestra el resultado
+ rol_permitido = 'admin' # Solo el administrador importa
+ template_name = 'importacion/importar.html'
+ max_filas = 5000 # Con más filas el cálculo de contraseñas excede el tiempo de una solicitud: usar importar_csv
+ max_errores = 100 # Errores que se muestran en la página
+
+ def get(self, request):
+        return render(request, self.template_name, {'form': ImportarCSVForm(), 'columnas': self.columnas()})
+
+ def post(self, request):
+        form = ImportarCSVForm(request.POST, request.FILES)
+        contexto = {'form': form, 'columnas': self.columnas()}
+        if form.is_valid():
+            tipo = form.cleaned_data['tipo']
+            archivo = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+            try:
+                if sum(1 for _ in archivo) - 1 > self.max_filas:
+                    raise ValidationError(f"El archivo tiene más de {self.max_filas} filas: use manage.py importar_csv.")
+                archivo.seek(0)
+                resultado = importacion.importar(tipo, archivo, parcial=form.cleaned_data['parcial'])
+            except (ValidationError, UnicodeDecodeError) as e:
+                form.add_error('archivo', e if isinstance(e, ValidationError) else "El archivo debe estar en UTF-8.")
+            else:
+                contexto.update(resultado=resultado, errores=resultado.errores[:self.max_errores])
+        return render(request, self.template_name, contexto)
+
+ def columnas(self):
+        return {tipo: importacion.columnas(tipo) for tipo in importacion.FORMULARIOS}
+
+
+# ===============================
+# AUTOCOMPLETADO DE FORMULARIOS (JSON)
+# ===============================
+class AutocompletarView(RolRequiredMixin, View): # Sugerencias para los select con AutocompletarSelect
+ rol_permitido = 'admin' # Los formularios que lo usan son de administración
+ http_method_names = ['get']
+
+ # Se pide en cada tecla: la respuesta se comparte entre los administradores por unos segundos
+ @method_decorator(cache_por_rol(opciones.DURACION_SUGERENCIAS, por_usuario=False))
+ def get(self, request, fuente):
+        if fuente not in opciones.FUENTES:
+            raise Http404("Fuente de autocompletado desconocida")
+        # ?q=texto -> {"resultados": [{"id": 1, "texto": "..."}]}
+        return JsonResponse({'resultados': opciones.sugerencias(fuente, request.GET.get('q', ''))})
@@ -0,0 +1,47 @@
+from django import forms  # Widgets base de Django
+from django.urls import reverse  # URL del endpoint de búsqueda
+
+
+# ==============================
+# SELECT CON AUTOCOMPLETADO
+# ==============================
+class AutocompletarSelect(forms.Select):
+    """
+    Select que solo renderiza la opción elegida; el resto se busca con el
+    endpoint JSON `autocompletar` (ver opciones.py) mientras se escribe.
+    Evita cargar y enviar al navegador todos los registros del queryset.
+    """
+    autocompletar = True  # Las plantillas lo usan para renderizar el widget en lugar de recorrer las opciones
+
+    class Media:
+        js = ['core/js/autocompletar.js']
+
+    def __init__(self, fuente, attrs=None):
+        super().__init__(attrs)
+        self.fuente = fuente  # Clave de opciones.FUENTES
+
+    @property
+    def url(self):
+        return reverse('gestion_citas:autocompletar', args=[self.fuente])
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = self.url
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Solo se consulta el registro elegido (o ninguno) en lugar de todo el queryset
+        iterador = self.choices
+        elegidos = [v for v in value if str(v).isdigit()]
+        opciones = [('', '-- Escribe para buscar --')]
+        if elegidos and hasattr(iterador, 'queryset'):
+            campo = iterador.field
+            opciones += [
+                (campo.prepare_value(obj), campo.label_from_instance(obj))
+                for obj in iterador.queryset.filter(pk__in=elegidos)
+            ]
+        self.choices = opciones
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterador
@@ -7,6 +7,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SistemaCitas.settings')
+    # Los tests usan el perfil test (SQLite en memoria) salvo que se elija otro
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_ENTORNO', 'test')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: